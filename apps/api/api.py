@@ -1,5 +1,8 @@
 import os # Cache-busting comment
-from flask import Flask, request, jsonify
+import time
+_module_load_started = time.perf_counter()
+from flask import Flask, request, jsonify, g, has_app_context
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
 import json
 import subprocess
@@ -7,7 +10,6 @@ import sys
 from dotenv import load_dotenv
 import logging
 from datetime import datetime, timedelta, timezone
-import threading
 from google.api_core import exceptions as google_exceptions
 import tenacity
 from functools import wraps
@@ -22,6 +24,12 @@ load_dotenv()
 
 import data_manager
 import notification_service # Import the new notification service
+import session_ingest
+import putt_codes
+import response_cache
+import background_jobs
+import scheduler
+import coach_features
 from utils import get_camera_index_from_config
 import sqlalchemy
 
@@ -31,14 +39,109 @@ try:
 except Exception as e:
     logger.warning(f"Could not configure Gemini API. AI Coach will be disabled. Error: {e}")
 
+class ApiJSONProvider(DefaultJSONProvider):
+    """Serializes lazily decoded putt lists as the JSON string clients read from sessions.putt_list."""
+
+    @staticmethod
+    def default(o):
+        if isinstance(o, putt_codes.LazyPuttList):
+            return o.to_json()
+        return DefaultJSONProvider.default(o)
+
 app = Flask(__name__)
+app.json = ApiJSONProvider(app)
 # Set up CORS, allowing for multiple origins from an environment variable
 allowed_origins = [origin.strip() for origin in os.environ.get("ALLOWED_ORIGINS", "http://localhost:5173,https://www.proofofputt.com").split(',')]
 CORS(app, resources={r"/*": {"origins": allowed_origins, "allow_headers": "Content-Type", "supports_credentials": True}})
 
-# Initialize database and create default user once when the app starts
-with app.app_context():
-    data_manager.initialize_database()
+# Hot GET responses are cached per resource version and revalidated with ETags; see response_cache.
+# They render on the primary, where the versions are read, so replica lag cannot cache a stale body.
+cache = response_cache.ResponseCache(data_manager.get_resource_versions, render_context=data_manager.primary_reads)
+
+# Real-time pushes (e.g. unread notification counts) when flask-socketio is installed
+try:
+    from websocket_handler import create_websocket_handler
+    websocket_handler = create_websocket_handler(app)
+    data_manager.add_unread_count_listener(websocket_handler.push_unread_count)
+except ImportError as e:
+    websocket_handler = None
+    logger.warning(f"WebSocket support unavailable, clients will poll for unread counts: {e}")
+
+# Schema migrations and seeding run once per deploy via `python manage.py migrate`, not on import,
+# so booting a worker never touches the database. The engine is created lazily after fork.
+BOOT_METRICS = {
+    "pid": os.getpid(),
+    "module_load_ms": round((time.perf_counter() - _module_load_started) * 1000, 1),
+    "worker_boot_ms": None,
+}
+logger.info(f"API module loaded in {BOOT_METRICS['module_load_ms']} ms (pid {BOOT_METRICS['pid']}).")
+
+def record_worker_boot(boot_ms):
+    """Called by the gunicorn post_worker_init hook with the time from fork to ready."""
+    BOOT_METRICS["pid"] = os.getpid()
+    BOOT_METRICS["worker_boot_ms"] = round(boot_ms, 1)
+
+# --- Request-scoped database connection ---
+# Every data_manager call made while handling a request shares one pooled connection and one
+# transaction, so a request pays for a single checkout (and pre-ping) however many queries it runs.
+
+def _request_connection(read_only=False):
+    """
+    Returns the current app context's connection, checking one out and beginning its transaction on first use.
+    Read-only calls get a separate replica connection, unless this request has already written on the primary.
+    """
+    if not has_app_context():
+        return None
+    if read_only and not ('db_conn' in g and g.db_conn.info.get('wrote')):
+        if 'db_read_conn' not in g:
+            g.db_read_conn = data_manager.get_read_connection().connect()
+        return g.db_read_conn
+    if 'db_conn' not in g:
+        g.db_conn = data_manager.get_db_connection().connect()
+        g.db_conn.begin()
+    return g.db_conn
+
+data_manager.set_connection_provider(_request_connection)
+
+@app.after_request
+def _finish_request_transaction(response):
+    """Commits the request's work before the response is sent, or rolls it back on an error status."""
+    read_conn = g.pop('db_read_conn', None)
+    if read_conn is not None:
+        read_conn.close()
+    conn = g.pop('db_conn', None)
+    if conn is None:
+        return response
+    try:
+        if response.status_code < 400:
+            conn.commit()
+        else:
+            conn.rollback()
+    except Exception as e:
+        app.logger.error(f"Failed to commit request transaction: {e}", exc_info=True)
+        conn.rollback()
+        response = jsonify({"error": "An unexpected server error occurred."})
+        response.status_code = 500
+    finally:
+        conn.close()
+    return response
+
+@app.teardown_appcontext
+def _close_request_connection(exception):
+    """Releases a connection the request did not finish, e.g. after an unhandled error or outside a request."""
+    read_conn = g.pop('db_read_conn', None)
+    if read_conn is not None:
+        read_conn.close()
+    conn = g.pop('db_conn', None)
+    if conn is None:
+        return
+    try:
+        if exception is None:
+            conn.commit()
+        else:
+            conn.rollback()
+    finally:
+        conn.close()
 
 @app.route('/')
 def home():
@@ -67,125 +170,145 @@ def test_user():
 
 @app.route('/health')
 def health_check():
-    return jsonify({"status": "healthy", "timestamp": datetime.now(timezone.utc).isoformat()})
+    return jsonify({
+        "status": "healthy",
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "boot": BOOT_METRICS,
+        "db_pool": data_manager.get_pool_stats(),
+        "response_cache": cache.stats,
+        "background_jobs": background_jobs.get_stats(),
+        "scheduler": scheduler.get_stats()
+    })
+
+def _read_session_upload():
+    """
+    Decodes a desktop upload body. Clients may send Content-Encoding gzip/deflate/zstd and
+    Content-Type application/msgpack; plain JSON still works. Size limits are in session_ingest.
+    """
+    if request.content_length and request.content_length > session_ingest.MAX_UPLOAD_BYTES:
+        raise session_ingest.UploadTooLarge(f"Upload exceeds {session_ingest.MAX_UPLOAD_BYTES} bytes")
+    return session_ingest.decode_upload(request.stream, request.mimetype, request.headers.get('Content-Encoding'))
 
 @app.route('/sessions/submit', methods=['POST'])
 def submit_desktop_session():
     """Endpoint for desktop application to submit session data"""
     try:
-        payload = request.get_json()
-        
-        if not payload:
-            return jsonify({"error": "No data provided"}), 400
-            
-        session_data = payload.get('session_data')
-        verification = payload.get('verification')
-        source = payload.get('source', 'unknown')
-        version = payload.get('version', 'unknown')
+        payload = _read_session_upload()
+        source = payload.get('source', 'unknown') if isinstance(payload, dict) else 'unknown'
+        version = payload.get('version', 'unknown') if isinstance(payload, dict) else 'unknown'
         
-        if not session_data or not verification:
-            return jsonify({"error": "Missing session_data or verification"}), 400
-            
-        logger.info(f"Received desktop session from {source} v{version}")
-        logger.info(f"Session ID: {session_data['metadata']['session_id']}")
-        logger.info(f"Player ID: {session_data['metadata']['player_id']}")
-        logger.info(f"Putt entries: {len(session_data['putt_log_entries'])}")
+        # A retry of a session we already stored gets the stored result without reprocessing
+        key = session_ingest.upload_key(payload)
+        existing = data_manager.get_session_by_id(*key) if key else None
+        if existing:
+            logger.info(f"Desktop session {key[0]} for player {key[1]} already processed; returning stored result")
+            return jsonify({"success": True, "duplicate": True, **session_ingest.stored_session_result(existing)})
         
-        # Verify data integrity
-        expected_count = verification['classification_count']
-        actual_count = session_data['session_summary']['total_putts']
+        # Validate and process session data using existing SessionReporter
+        prepared = session_ingest.prepare_desktop_session(payload)
         
-        if expected_count != actual_count:
-            logger.warning(f"Data integrity mismatch: expected {expected_count}, got {actual_count}")
-            
-        # Process session data using existing SessionReporter
-        putt_log_entries = []
-        for entry in session_data['putt_log_entries']:
-            # Filter to only classification entries (MAKE/MISS)
-            if entry['classification'] in ['MAKE', 'MISS']:
-                putt_log_entries.append(entry)
+        logger.info(f"Received desktop session from {source} v{version}")
+        logger.info(f"Session ID: {prepared['session_id']}")
+        logger.info(f"Player ID: {prepared['player_id']}")
+        logger.info(f"Putt entries: {prepared['putts_processed']}")
         
-        if putt_log_entries:
-            from session_reporter import SessionReporter
-            
-            # Process with SessionReporter (same as backend processing)
-            reporter = SessionReporter(putt_log_entries)
-            reporter.process_data()
-            
-            # Store in database using existing data_manager functions
-            player_id = session_data['metadata']['player_id']
-            
-            # Create statistics dictionary from reporter attributes
-            session_stats = {
-                'total_putts': reporter.total_putts,
-                'total_makes': reporter.total_makes,
-                'total_misses': reporter.total_misses,
-                'best_streak': reporter.max_consecutive_makes,
-                'fastest_21_makes': reporter.fastest_21_makes if reporter.fastest_21_makes != float('inf') else None,
-                'putts_per_minute': reporter.putts_per_minute,
-                'makes_per_minute': reporter.makes_per_minute,
-                'most_makes_in_60_seconds': reporter.most_makes_in_60_seconds,
-                'session_duration': reporter.session_duration,
-                'makes_by_category': reporter.makes_by_category,
-                'misses_by_category': reporter.misses_by_category,
-                'source': 'desktop',
-                'session_id': session_data['metadata']['session_id'],
-                'submitted_at': datetime.now(timezone.utc).isoformat()
-            }
-            
-            # Format session data for save_session function
-            session_save_data = {
-                'player_id': player_id,
-                'start_time': session_data['metadata']['start_time'],
-                'end_time': session_data['metadata'].get('end_time'),
-                'status': 'completed',
-                'total_putts': session_stats.get('total_putts', 0),
-                'total_makes': session_stats.get('total_makes', 0),
-                'total_misses': session_stats.get('total_misses', 0),
-                'best_streak': session_stats.get('best_streak', 0),
-                'fastest_21_makes': session_stats.get('fastest_21_makes'),
-                'putts_per_minute': session_stats.get('putts_per_minute', 0),
-                'makes_per_minute': session_stats.get('makes_per_minute', 0),
-                'most_makes_in_60_seconds': session_stats.get('most_makes_in_60_seconds', 0),
-                'session_duration': session_stats.get('session_duration', 0),
-                'putt_list': json.dumps(putt_log_entries),
-                'makes_by_category': json.dumps(session_stats.get('makes_by_category', {})),
-                'misses_by_category': json.dumps(session_stats.get('misses_by_category', {}))
-            }
-            
+        if prepared['row']:
             # Store session using existing save_session function
-            data_manager.save_session(session_save_data)
-            success = True
-            
-            if success:
-                logger.info(f"Desktop session {session_data['metadata']['session_id']} processed successfully")
-                return jsonify({
-                    "success": True,
-                    "session_id": session_data['metadata']['session_id'],
-                    "putts_processed": len(putt_log_entries),
-                    "statistics": session_stats
-                })
-            else:
-                return jsonify({"error": "Failed to store session results"}), 500
+            data_manager.save_session(prepared['row'])
+            logger.info(f"Desktop session {prepared['session_id']} processed successfully")
+            return jsonify({
+                "success": True,
+                "session_id": prepared['session_id'],
+                "putts_processed": prepared['putts_processed'],
+                "statistics": prepared['statistics']
+            })
         else:
             logger.info("No classified putts in session, storing metadata only")
             return jsonify({
                 "success": True,
-                "session_id": session_data['metadata']['session_id'],
+                "session_id": prepared['session_id'],
                 "putts_processed": 0,
                 "message": "Session received but no putts classified"
             })
             
+    except session_ingest.UploadTooLarge as e:
+        return jsonify({"error": str(e)}), 413
+    except session_ingest.UnsupportedUpload as e:
+        return jsonify({"error": str(e)}), 415
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         logger.error(f"Error processing desktop session: {e}", exc_info=True)
         return jsonify({"error": "Internal server error"}), 500
 
+@app.route('/sessions/submit/batch', methods=['POST'])
+def submit_desktop_sessions_batch():
+    """
+    Endpoint for a desktop client catching up on a backlog: {"sessions": [<single submit payload>, ...]},
+    in any of the encodings /sessions/submit accepts.
+    Sessions are validated and reported in a worker pool, saved in one transaction, and each
+    player's stats are recalculated once. Returns one result per session, in order.
+    """
+    try:
+        payload = _read_session_upload()
+        uploads = payload.get('sessions') if isinstance(payload, dict) else None
+        if not isinstance(uploads, list) or not uploads:
+            return jsonify({"error": "Expected a non-empty 'sessions' list"}), 400
+        if len(uploads) > session_ingest.MAX_BATCH_SESSIONS:
+            return jsonify({"error": f"At most {session_ingest.MAX_BATCH_SESSIONS} sessions per batch"}), 413
+
+        logger.info(f"Received batch of {len(uploads)} desktop sessions from {payload.get('source', 'unknown')} v{payload.get('version', 'unknown')}")
+        # Sessions stored by an earlier attempt are answered from the database, not reprocessed
+        keys = [session_ingest.upload_key(upload) for upload in uploads]
+        stored = data_manager.get_sessions_by_external_ids([key for key in keys if key])
+        new_indexes = [index for index, key in enumerate(keys) if key not in stored]
+        prepared_sessions = dict(zip(new_indexes, session_ingest.prepare_desktop_sessions([uploads[index] for index in new_indexes])))
+
+        results = []
+        rows_to_save = []
+        for index, key in enumerate(keys):
+            if index not in prepared_sessions:
+                results.append({
+                    "index": index, "status": "duplicate", "saved_session_id": stored[key]['session_id'],
+                    **session_ingest.stored_session_result(stored[key])
+                })
+                continue
+            prepared = prepared_sessions[index]
+            if 'error' in prepared:
+                results.append({"index": index, "status": "rejected", "error": prepared['error']})
+                continue
+            result = {"index": index, "session_id": prepared['session_id'], "putts_processed": prepared['putts_processed']}
+            if prepared['row']:
+                result["status"] = "saved"
+                rows_to_save.append((result, prepared['row']))
+            else:
+                result["status"] = "skipped"
+                result["message"] = "Session received but no putts classified"
+            results.append(result)
+
+        saved_ids = data_manager.save_sessions([row for _, row in rows_to_save])
+        for (result, _), saved_id in zip(rows_to_save, saved_ids):
+            result["saved_session_id"] = saved_id
+
+        summary = {status: sum(1 for result in results if result["status"] == status) for status in ("saved", "duplicate", "skipped", "rejected")}
+        logger.info(f"Desktop batch processed: {summary}")
+        return jsonify({"success": summary["rejected"] == 0, **summary, "results": results}), 200
+    except session_ingest.UploadTooLarge as e:
+        return jsonify({"error": str(e)}), 413
+    except session_ingest.UnsupportedUpload as e:
+        return jsonify({"error": str(e)}), 415
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error processing desktop session batch: {e}", exc_info=True)
+        return jsonify({"error": "Internal server error"}), 500
+
 @app.route('/sessions/<session_id>/verify', methods=['GET'])
 def verify_session(session_id):
     """Verify that a session was processed correctly"""
     try:
-        # Check if session exists in database
-        session_info = data_manager.get_session_by_id(session_id)
+        # Indexed lookup by the desktop session id, optionally scoped to the player
+        session_info = data_manager.get_session_by_id(session_id, request.args.get('player_id', type=int))
         
         if session_info:
             return jsonify({
@@ -250,10 +373,14 @@ def subscription_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+@background_jobs.handler("daily_ai_chat")
+def _daily_ai_chat_job(payload):
+    _create_daily_ai_chat_if_needed(payload['player_id'])
+
 def _create_daily_ai_chat_if_needed(player_id):
     """
     Checks if a daily AI chat should be created for a subscribed player and creates it.
-    This is intended to be run asynchronously (e.g., in a thread) to not block API responses.
+    Runs as a "daily_ai_chat" background job, enqueued at most once per player per day by /login.
     """
     with app.app_context():
         # Check subscription status
@@ -267,8 +394,11 @@ def _create_daily_ai_chat_if_needed(player_id):
             return
 
         # Check for data to analyze - don't create a chat if there's nothing to talk about.
+        # Only the summary columns are read; the model sees a compact feature summary, not raw putts.
         stats = data_manager.get_player_stats(player_id)
-        sessions = data_manager.get_sessions_for_player(player_id)
+        sessions = data_manager.get_sessions_for_player(
+            player_id, limit=coach_features.TREND_SESSIONS + 1, fields=data_manager.SUMMARY_SESSION_FIELDS
+        )
         if not stats or not sessions:
             app.logger.info(f"Skipping daily AI chat for player {player_id}: no stats or sessions.")
             return
@@ -276,28 +406,20 @@ def _create_daily_ai_chat_if_needed(player_id):
         # All checks passed, create the conversation
         try:
             model = genai.GenerativeModel('gemini-1.5-flash-latest')
-            recent_sessions = sessions[:2]
             player_name = player_info.get('name', f'Player {player_id}')
-            
-            initial_prompt = f'''As a PhD-level putting coach, provide a comprehensive initial analysis for {player_name}.
-Please ensure the response is well-formatted for readability, using line breaks and bullet points as specified.
-
-1.  **Career Skills Evaluation:** Based on these career stats, highlight one key accomplishment and provide one specific, actionable recommendation for improvement. Career Stats: {json.dumps(stats, indent=2)}
-2.  **Recent Performance Summary:** Compare their two most recent sessions. Focus on changes in makes, misses, and makes per minute to identify short-term trends. Recent Sessions: {json.dumps(recent_sessions, indent=2)}
-3.  **Putting Trends Analysis:** Analyze the 'classification' data within the sessions to identify any patterns (e.g., 'MISS - RETURN: Entry RAMP_ROI - Exit RAMP_ROI'). Provide an insight based on this data.
-
-Keep the entire response concise and encouraging.'''
-            initial_response = _generate_content_with_retry(model, initial_prompt)
-            title_prompt = f"Create a very short, descriptive title (5 words or less) for a conversation that starts with this analysis: {initial_response.text}"
-            title_response = _generate_content_with_retry(model, title_prompt)
-            title = title_response.text.strip().replace('"', '') if title_response and title_response.text else "AI Coach Analysis"
-            initial_history = [{'role': 'model', 'parts': [initial_response.text]}]
+            summary = coach_features.build_summary(stats, sessions, data_manager.get_putt_analytics(player_id))
+            # One model call returns both the title and the analysis; unchanged summaries are served from cache
+            title, analysis = coach_features.generate_insight(
+                lambda prompt: _generate_content_with_retry(model, prompt).text, player_name, summary
+            )
+            initial_history = [{'role': 'model', 'parts': [analysis]}]
             new_conversation_id = data_manager.create_conversation(player_id, title, initial_history)
 
             notification_service.create_in_app_notification(player_id, 'AI_COACH_INSIGHT', 'Your AI Coach has a new insight for you!', {'conversation_id': new_conversation_id, 'title': title}, f'/coach/{new_conversation_id}')
             app.logger.info(f"Created daily AI chat {new_conversation_id} for player {player_id}.")
         except Exception as e:
             app.logger.error(f"Failed to auto-create daily AI chat for player {player_id}: {e}", exc_info=True)
+            raise  # Lets the job queue record the failure and retry
 
 # --- Auth & Player Routes ---
 
@@ -313,20 +435,20 @@ def login():
     if not email or not password:
         return jsonify({"error": "Invalid credentials"}), 401
     try:
-        player_id, player_name, player_email, stats, sessions, timezone, subscription_status = data_manager.login_with_email_password(email, password)
+        player_id, player_name, player_email, player_timezone, subscription_status = data_manager.login_with_email_password(email, password)
         app.logger.info(f"Login result for {email}: player_id={player_id}")
         if player_id is not None:
-            # Asynchronously trigger the daily AI chat creation check
-            thread = threading.Thread(target=_create_daily_ai_chat_if_needed, args=(player_id,))
-            thread.start()
+            # The daily AI chat check runs on the background job queue, once per player per day
+            background_jobs.enqueue(
+                "daily_ai_chat", {"player_id": player_id},
+                dedupe_key=f"daily_ai_chat:{player_id}:{datetime.now(timezone.utc).date().isoformat()}"
+            )
 
             return jsonify({
                 "player_id": player_id, 
                 "name": player_name,
                 "email": player_email,
-                "stats": stats,
-                "sessions": sessions,
-                "timezone": timezone,
+                "timezone": player_timezone,
                 "subscription_status": subscription_status,
                 "is_new_user": False
             }), 200
@@ -349,17 +471,15 @@ def register():
         return jsonify({"error": "Email, password, and name cannot be empty"}), 400
     try:
         player_id, player_name = data_manager.register_player(email, password, name)
-        # After registering, log them in to get the full data object
-        player_id, player_name, player_email, stats, sessions, timezone, subscription_status = data_manager.login_with_email_password(email, password)
+        # After registering, log them in to get the same identity object as /login
+        player_id, player_name, player_email, player_timezone, subscription_status = data_manager.login_with_email_password(email, password)
         if player_id is not None:
             
             return jsonify({
                 "player_id": player_id,
                 "name": player_name,
                 "email": player_email,
-                "stats": stats,
-                "sessions": sessions,
-                "timezone": timezone,
+                "timezone": player_timezone,
                 "subscription_status": subscription_status,
                 "is_new_user": True
             }), 201
@@ -371,23 +491,53 @@ def register():
         app.logger.error(f"Registration failed: {e}", exc_info=True)
         return jsonify({"error": "An internal error occurred during registration."}), 500
 
+def _parse_player_data_fields(value):
+    """
+    Splits /player/<id>/data's `fields` into (sections, session fields). Entries are "stats",
+    "sessions" or "sessions.<field>"; session fields of None mean all of them.
+    """
+    if not value:
+        return {'stats', 'sessions'}, None
+    sections, session_fields, all_session_fields = set(), [], False
+    for entry in (part.strip() for part in value.split(',')):
+        if not entry:
+            continue
+        section, _, field = entry.partition('.')
+        if section not in ('stats', 'sessions') or (field and section != 'sessions'):
+            raise ValueError(f"Unknown field: {entry}")
+        sections.add(section)
+        if field:
+            session_fields.append(field)
+        elif section == 'sessions':
+            all_session_fields = True
+    if all_session_fields or not session_fields:
+        return sections, None
+    return sections, data_manager.parse_session_fields(','.join(session_fields))
+
 @app.route('/player/<int:player_id>/data', methods=['GET'])
+@cache.cached_get(lambda player_id: [f"player_{player_id}"])
 def get_player_data(player_id):
-    """Endpoint to refresh all player data."""
+    """
+    Endpoint to refresh all player data: identity, stats and recent sessions.
+    `?fields=` narrows the response, e.g. `fields=stats` or `fields=sessions.total_putts,sessions.total_makes`;
+    "sessions" alone returns every session field. Without it, everything is returned.
+    """
     try:
-        player_info = data_manager.get_player_info(player_id)
+        sections, session_fields = _parse_player_data_fields(request.args.get('fields'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    try:
+        # Read identity fresh: this body is cached under the player's version, which another worker may have bumped.
+        player_info = data_manager.get_player_info(player_id, use_cache=False)
         if not player_info:
             return jsonify({"error": "Player not found"}), 404
-        
-        stats = data_manager.get_player_stats(player_id)
-        sessions = data_manager.get_sessions_for_player(player_id, limit=25)
-        
-        # This structure should match the login response for consistency
-        return jsonify({
-            **player_info,
-            "stats": stats,
-            "sessions": sessions
-        }), 200
+
+        response = dict(player_info)
+        if 'stats' in sections:
+            response["stats"] = data_manager.get_player_stats(player_id)
+        if 'sessions' in sections:
+            response["sessions"] = data_manager.get_sessions_for_player(player_id, limit=25, fields=session_fields)
+        return jsonify(response), 200
     except Exception as e:
         app.logger.error(f"Error refreshing data for player {player_id}: {e}", exc_info=True)
         return jsonify({"error": "An internal error occurred."}), 500
@@ -417,6 +567,7 @@ def update_player_profile(player_id):
 
 @app.route('/player/<int:player_id>/career-stats', methods=['GET'])
 @subscription_required
+@cache.cached_get(lambda player_id: [f"player_{player_id}"])
 def get_career_stats(player_id):
     app.logger.info(f"Attempting to get career stats for player_id: {player_id}")
     try:
@@ -430,28 +581,46 @@ def get_career_stats(player_id):
         app.logger.error(f"Error getting career stats for player {player_id}: {e}", exc_info=True)
         return jsonify({"error": "An internal error occurred."}), 500
 
+@app.route('/player/<int:player_id>/putt-analytics', methods=['GET'])
+@subscription_required
+def get_putt_analytics(player_id):
+    try:
+        analytics = data_manager.get_putt_analytics(player_id)
+        return jsonify(analytics), 200
+    except Exception as e:
+        app.logger.error(f"Error getting putt analytics for player {player_id}: {e}", exc_info=True)
+        return jsonify({"error": "An internal error occurred."}), 500
+
 @app.route('/player/<int:player_id>/sessions', methods=['GET'])
 @subscription_required
 def get_player_sessions(player_id):
     try:
-        # Get pagination parameters from query string
+        # Pass `cursor` (the previous page's next_cursor) to page without OFFSET scans;
+        # `page` is still accepted for clients that page by number.
         page = int(request.args.get('page', 1))
         limit = int(request.args.get('limit', 25))
-        offset = (page - 1) * limit
+        cursor = request.args.get('cursor')
+        offset = 0 if cursor else (page - 1) * limit
+        # `fields` projects the session columns, e.g. fields=start_time,total_putts,total_makes;
+        # putt_list and the category breakdowns are only read when named (or when fields is omitted).
+        fields = data_manager.parse_session_fields(request.args.get('fields'))
         
-        sessions = data_manager.get_sessions_for_player(player_id, limit=limit, offset=offset)
+        session_page = data_manager.get_sessions_page(player_id, limit=limit, cursor=cursor, offset=offset, fields=fields)
         
-        # Get total count for pagination
-        total_sessions = data_manager.get_player_session_count(player_id) if hasattr(data_manager, 'get_player_session_count') else len(sessions)
+        # Total count comes from the maintained player_stats row rather than a COUNT per request
+        total_sessions = data_manager.get_player_session_count(player_id)
         total_pages = max(1, (total_sessions + limit - 1) // limit)  # Ceiling division
         
         return jsonify({
-            "sessions": sessions,
+            "sessions": session_page["sessions"],
+            "next_cursor": session_page["next_cursor"],
             "current_page": page,
             "total_pages": total_pages,
             "total_sessions": total_sessions,
             "limit": limit
         }), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         app.logger.error(f"Error getting sessions for player {player_id}: {e}", exc_info=True)
         return jsonify({"error": "An internal error occurred."}), 500
@@ -551,10 +720,10 @@ def submit_session_to_duel(duel_id):
 
 # --- Leaderboard Routes ---
 @app.route('/leaderboards', methods=['GET'])
+@cache.cached_get(lambda: [data_manager.LEADERBOARDS_RESOURCE], cache_control='public, no-cache')
 def get_leaderboards():
     try:
-        leaderboard_data = data_manager.get_all_time_leaderboards()
-        return jsonify(leaderboard_data), 200
+        return jsonify(data_manager.get_all_time_leaderboards())
     except Exception as e:
         app.logger.error(f"Error generating leaderboards: {e}", exc_info=True)
         return jsonify({"error": "An internal error occurred while generating the leaderboards."}), 500
@@ -626,8 +795,20 @@ def create_league():
 @app.route('/leagues/<int:league_id>', methods=['GET'])
 @subscription_required
 def get_league_details(league_id):
+    # e.g. ?include=members to skip rounds; an empty value returns only the league header
+    include_param = request.args.get('include')
+    include = None
+    if include_param is not None:
+        include = [section.strip() for section in include_param.split(',') if section.strip()]
+        unknown = set(include) - set(data_manager.LEAGUE_DETAIL_SECTIONS)
+        if unknown:
+            return jsonify({"error": f"Unknown include section(s): {', '.join(sorted(unknown))}."}), 400
+    return _league_details_response(league_id=league_id, include=include)
+
+@cache.cached_get(lambda league_id, include: [f"league_{league_id}"])
+def _league_details_response(league_id, include):
     try:
-        details = data_manager.get_league_details(league_id)
+        details = data_manager.get_league_details(league_id, include=include)
         if details:
             return jsonify(details), 200
         else:
@@ -646,6 +827,25 @@ def get_league_leaderboard(league_id):
         app.logger.error(f"Error generating leaderboard for league {league_id}: {e}", exc_info=True)
         return jsonify({"error": "An internal error occurred."}), 500
 
+@app.route('/leagues/rounds/<int:round_id>/submit', methods=['POST'])
+@subscription_required
+def submit_session_to_league_round(round_id):
+    data = request.get_json()
+    player_id = data.get('player_id')
+    session_id = data.get('session_id')
+
+    if not all([player_id, session_id]):
+        return jsonify({"error": "Player ID and session ID are required."}), 400
+
+    try:
+        result = data_manager.submit_session_to_league_round(round_id, player_id, session_id)
+        return jsonify(result), 200
+    except ValueError as ve:
+        return jsonify({"error": str(ve)}), 400
+    except Exception as e:
+        app.logger.error(f"Error submitting session to league round {round_id} for player {player_id}: {e}", exc_info=True)
+        return jsonify({"error": "An internal error occurred."}), 500
+
 @app.route('/leagues/<int:league_id>/settings', methods=['PUT'])
 @subscription_required
 def update_league_settings(league_id):
@@ -687,6 +887,7 @@ def delete_league(league_id):
 
 # --- Notifications Routes ---
 @app.route('/notifications/<int:player_id>/unread_count', methods=['GET'])
+@app.route('/notifications/<int:player_id>/unread-count', methods=['GET'])
 @subscription_required
 def get_unread_notification_count(player_id):
     try:
@@ -703,13 +904,50 @@ def get_notifications(player_id):
     try:
         limit = request.args.get('limit', 20, type=int)
         offset = request.args.get('offset', 0, type=int)
+        cursor = request.args.get('cursor')
         
-        notifications = data_manager.get_notifications_for_player(player_id, limit, offset)
-        return jsonify({"notifications": notifications}), 200
+        notification_page = data_manager.get_notifications_page(player_id, limit=limit, cursor=cursor, offset=offset)
+        return jsonify(notification_page), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         app.logger.error(f"Error getting notifications for player {player_id}: {e}", exc_info=True)
         return jsonify({"error": "An internal error occurred."}), 500
 
+@app.route('/notifications/<int:notification_id>/read', methods=['POST'])
+@subscription_required
+def mark_notification_read(notification_id):
+    player_id = request.get_json().get('player_id')
+    try:
+        if not data_manager.mark_notification_read(notification_id, player_id):
+            return jsonify({"error": "Notification not found or already read."}), 404
+        return jsonify({"success": True, "unread_count": data_manager.get_unread_notification_count(player_id)}), 200
+    except Exception as e:
+        app.logger.error(f"Error marking notification {notification_id} read for player {player_id}: {e}", exc_info=True)
+        return jsonify({"error": "An internal error occurred."}), 500
+
+@app.route('/notifications/<int:player_id>/read-all', methods=['POST'])
+@subscription_required
+def mark_all_notifications_read(player_id):
+    try:
+        updated = data_manager.mark_all_notifications_read(player_id)
+        return jsonify({"success": True, "updated": updated, "unread_count": 0}), 200
+    except Exception as e:
+        app.logger.error(f"Error marking all notifications read for player {player_id}: {e}", exc_info=True)
+        return jsonify({"error": "An internal error occurred."}), 500
+
+@app.route('/notifications/<int:notification_id>', methods=['DELETE'])
+@subscription_required
+def delete_notification(notification_id):
+    player_id = request.get_json().get('player_id')
+    try:
+        if not data_manager.delete_notification(notification_id, player_id):
+            return jsonify({"error": "Notification not found."}), 404
+        return jsonify({"success": True}), 200
+    except Exception as e:
+        app.logger.error(f"Error deleting notification {notification_id} for player {player_id}: {e}", exc_info=True)
+        return jsonify({"error": "An internal error occurred."}), 500
+
 # --- Session Management Routes ---
 @app.route('/start-session', methods=['POST'])
 @subscription_required
@@ -868,7 +1106,10 @@ def get_fundraisers():
     """Get all active fundraisers."""
     if request.method == 'OPTIONS':
         return '', 200
-    
+    return _fundraisers_response()
+
+@cache.cached_get(lambda: [data_manager.FUNDRAISERS_RESOURCE], cache_control='public, no-cache')
+def _fundraisers_response():
     try:
         fundraisers = data_manager.get_fundraisers()
         return jsonify(fundraisers), 200
@@ -953,6 +1194,10 @@ def create_pledge(fundraiser_id):
         return jsonify({"error": "An internal error occurred."}), 500
 
 if __name__ == "__main__":
+    # Local development has no separate deploy step, so bring the schema up to date here.
+    data_manager.initialize_database()
+    background_jobs.start()
+    scheduler.start()
     # Note: debug=True is great for development but should be False in production.
     # The host='0.0.0.0' makes the server accessible from other devices on the network.
     app.run(host='0.0.0.0', port=5001, debug=True)
@@ -0,0 +1,51 @@
+"""
+Cooperative (gevent) serving mode for high-concurrency connections.
+
+    GUNICORN_WORKER_CLASS=gevent gunicorn -c gunicorn.conf.py api:app
+
+Each gunicorn worker then serves up to GUNICORN_WORKER_CONNECTIONS requests at once on greenlets,
+so long-polling clients and slow outbound calls (the AI coach, email) wait without pinning a worker.
+The route handlers are unchanged: patch() makes the blocking calls they already make cooperative.
+  - sockets, sleeps, locks and threads via gevent's monkey patching (HTTP clients such as SendGrid's),
+  - PostgreSQL queries via psycogreen, so psycopg2 waits yield to other greenlets; requests waiting
+    for a pooled connection also yield, since SQLAlchemy's pool locks are patched,
+  - Gemini's gRPC channel via grpc's gevent integration.
+For the websocket transport, use GUNICORN_WORKER_CLASS=geventwebsocket.gunicorn.workers.GeventWebSocketWorker.
+
+patch() must run before anything else is imported, so gunicorn.conf.py calls it at load time,
+before the preloaded app is imported in the master.
+"""
+
+import logging
+
+logger = logging.getLogger('debug_logger')
+
+WORKER_CLASSES = ("gevent", "geventwebsocket.gunicorn.workers.GeventWebSocketWorker")
+
+_patched = False
+
+
+def is_async_worker(worker_class):
+    return worker_class in WORKER_CLASSES
+
+
+def patch():
+    """Makes blocking I/O in this process cooperative. Idempotent."""
+    global _patched
+    if _patched:
+        return
+    from gevent import monkey
+    monkey.patch_all()
+
+    try:
+        from psycogreen.gevent import patch_psycopg
+        patch_psycopg()
+    except ImportError:
+        logger.warning("psycogreen is not installed; PostgreSQL queries will block each gevent worker.")
+
+    try:
+        from grpc.experimental import gevent as grpc_gevent
+        grpc_gevent.init_gevent()
+    except ImportError:
+        pass  # No gRPC client installed, so nothing to integrate
+    _patched = True
@@ -0,0 +1,174 @@
+"""
+Bounded background job queue for slow side effects that should not run on the request path.
+
+Jobs are persisted in the background_jobs table by data_manager.enqueue_job, so queued work survives
+a restart, and an optional dedupe key (e.g. one daily AI chat per player per day) makes repeated
+enqueues a no-op. Each process runs a fixed pool of worker threads fed from a bounded in-memory queue:
+newly committed jobs are handed to it directly, and a poller picks up anything the queue had no room
+for, jobs left by a previous process, and jobs whose worker died. Workers claim a job in the database
+before running it, so a job runs once even when several processes see it.
+
+Handlers are registered per job type with @handler("type") and receive the job's payload.
+"""
+
+import logging
+import os
+import queue
+import threading
+import time
+import traceback
+from datetime import datetime
+
+import data_manager
+
+logger = logging.getLogger('debug_logger')
+
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", "2"))
+JOB_QUEUE_SIZE = int(os.environ.get("JOB_QUEUE_SIZE", "100"))
+JOB_POLL_SECONDS = int(os.environ.get("JOB_POLL_SECONDS", "30"))
+JOB_TIMEOUT_SECONDS = int(os.environ.get("JOB_TIMEOUT_SECONDS", "600"))
+JOB_MAX_ATTEMPTS = int(os.environ.get("JOB_MAX_ATTEMPTS", "3"))
+JOB_RETENTION_DAYS = int(os.environ.get("JOB_RETENTION_DAYS", "7"))
+
+_handlers = {}
+_queue = None
+_started_pid = None
+_start_lock = threading.Lock()
+_stats_lock = threading.Lock()  # stats are updated from every worker thread
+
+stats = {
+    "enqueued": 0, "deduplicated": 0, "deferred": 0, "completed": 0, "failed": 0, "retried": 0,
+    "wait_ms_max": 0.0, "wait_ms_total": 0.0, "run_ms_max": 0.0, "run_ms_total": 0.0,
+}
+
+
+def handler(job_type):
+    """Registers the decorated function(payload) as the handler for `job_type`."""
+    def decorator(fn):
+        _handlers[job_type] = fn
+        return fn
+    return decorator
+
+
+def enqueue(job_type, payload=None, dedupe_key=None):
+    """
+    Persists a job and returns its id, or None if `dedupe_key` was already used. When called inside
+    a request the job is committed with the request's transaction and only then handed to a worker.
+    """
+    start()
+    job_id = data_manager.enqueue_job(job_type, payload=payload, dedupe_key=dedupe_key)
+    _count("enqueued" if job_id is not None else "deduplicated")
+    return job_id
+
+
+def _count(name):
+    with _stats_lock:
+        stats[name] += 1
+
+
+def _observe(name, ms):
+    """Adds one `name`_ms sample (wait or run time) to the running total and maximum."""
+    with _stats_lock:
+        stats[f"{name}_ms_total"] += ms
+        stats[f"{name}_ms_max"] = max(stats[f"{name}_ms_max"], ms)
+
+
+def _dispatch(job_id):
+    """Hands a committed job to this process's workers; when the queue is full the poller takes it later."""
+    if _queue is None:
+        return
+    try:
+        _queue.put_nowait(job_id)
+    except queue.Full:
+        _count("deferred")
+
+
+def start():
+    """Starts this process's workers and poller. Idempotent, and restarts them in a forked child."""
+    global _queue, _started_pid
+    if _started_pid == os.getpid():
+        return
+    with _start_lock:
+        if _started_pid == os.getpid():
+            return
+        _queue = queue.Queue(maxsize=JOB_QUEUE_SIZE)
+        if _started_pid is None:
+            data_manager.add_job_listener(_dispatch)
+        _started_pid = os.getpid()
+        for index in range(JOB_WORKERS):
+            threading.Thread(target=_work, name=f"job-worker-{index}", daemon=True).start()
+        threading.Thread(target=_poll, name="job-poller", daemon=True).start()
+    logger.info(f"Background jobs started with {JOB_WORKERS} workers (pid {_started_pid}).")
+
+
+def _work():
+    while True:
+        job_id = _queue.get()
+        try:
+            run_job(job_id)
+        except Exception as e:
+            logger.error(f"Background job {job_id} could not be run: {e}", exc_info=True)
+        finally:
+            _queue.task_done()
+
+
+def _poll():
+    while True:
+        try:
+            poll_once()
+        except Exception as e:
+            logger.error(f"Background job poll failed: {e}", exc_info=True)
+        time.sleep(JOB_POLL_SECONDS)
+
+
+def poll_once():
+    """Requeues stalled jobs, prunes old ones, and fills the in-memory queue from the persisted backlog."""
+    requeued = data_manager.requeue_stale_jobs(JOB_TIMEOUT_SECONDS)
+    if requeued:
+        logger.warning(f"Requeued {requeued} background jobs that exceeded {JOB_TIMEOUT_SECONDS}s.")
+    data_manager.prune_finished_jobs(JOB_RETENTION_DAYS)
+    room = JOB_QUEUE_SIZE - _queue.qsize()
+    if room > 0:
+        for job_id in data_manager.get_queued_job_ids(room):
+            _dispatch(job_id)
+
+
+def run_job(job_id):
+    """Claims and runs one job, recording its outcome. Returns False if the job was not claimed."""
+    job = data_manager.claim_job(job_id)
+    if job is None:
+        return False
+    _observe("wait", max(0.0, (datetime.utcnow() - job['created_at'].replace(tzinfo=None)).total_seconds() * 1000))
+
+    started = time.perf_counter()
+    job_handler = _handlers.get(job['job_type'])
+    try:
+        if job_handler is None:
+            raise LookupError(f"No handler registered for job type '{job['job_type']}'")
+        job_handler(job['payload'])
+    except Exception as e:
+        retry = job['attempts'] < JOB_MAX_ATTEMPTS and not isinstance(e, LookupError)
+        logger.error(f"Background job {job_id} ({job['job_type']}) failed on attempt {job['attempts']}: {e}", exc_info=True)
+        data_manager.finish_job(job_id, error=traceback.format_exc(limit=5), retry=retry)
+        _count("retried" if retry else "failed")
+    else:
+        data_manager.finish_job(job_id)
+        _count("completed")
+    _observe("run", (time.perf_counter() - started) * 1000)
+    return True
+
+
+def get_stats():
+    """Queue depth, persisted job counts by status, and wait/run latency for /health."""
+    with _stats_lock:
+        snapshot = dict(stats)
+    finished = snapshot["completed"] + snapshot["failed"] + snapshot["retried"]
+    return {
+        **{key: round(value, 1) for key, value in snapshot.items() if not key.endswith("_total")},
+        "workers": JOB_WORKERS if _started_pid == os.getpid() else 0,
+        "queue_depth": _queue.qsize() if _queue is not None else 0,
+        "queue_capacity": JOB_QUEUE_SIZE,
+        "persisted": data_manager.get_job_counts(),
+        "wait_ms_avg": round(snapshot["wait_ms_total"] / finished, 1) if finished else None,
+        "run_ms_avg": round(snapshot["run_ms_total"] / finished, 1) if finished else None,
+    }
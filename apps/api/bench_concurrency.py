@@ -0,0 +1,115 @@
+"""
+Measures how many concurrent slow requests gunicorn serves with sync and gevent workers.
+
+    python bench_concurrency.py                              # sync vs gevent, 2 workers, 200 clients
+    python bench_concurrency.py --clients 500 --delay 1.0
+    python bench_concurrency.py --url http://localhost:5001/health --clients 200
+
+Each client holds one request open against an endpoint that waits `delay` seconds, standing in
+for a long-polling client or a slow Gemini call. By default the script serves its own endpoint
+with each worker class in turn; with --url it loads an already running server instead.
+Reports wall time, failures, latency percentiles, throughput and, for the bench endpoint, how many
+requests were effectively served at once.
+"""
+
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+DELAY_SECONDS = float(os.environ.get("BENCH_DELAY_SECONDS", "0.5"))
+
+
+def app(environ, start_response):
+    """Bench endpoint: waits like a slow outbound call, cooperatively under gevent."""
+    time.sleep(DELAY_SECONDS)
+    start_response("200 OK", [("Content-Type", "text/plain")])
+    return [b"ok"]
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _request(url, timeout):
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            response.read()
+        return (time.perf_counter() - started) * 1000
+    except Exception:
+        return None
+
+
+def load(url, clients, timeout):
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as executor:
+        results = list(executor.map(lambda _: _request(url, timeout), range(clients)))
+    wall = time.perf_counter() - started
+    latencies = sorted(result for result in results if result is not None)
+    return {
+        "wall_s": round(wall, 2),
+        "ok": len(latencies),
+        "failed": clients - len(latencies),
+        "p50_ms": round(statistics.median(latencies)) if latencies else None,
+        "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1]) if latencies else None,
+        "req_per_s": round(len(latencies) / wall, 1),
+    }
+
+
+def _serve(worker_class, workers, delay):
+    port = _free_port()
+    env = {**os.environ, "BENCH_DELAY_SECONDS": str(delay)}
+    server = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-k", worker_class, "-w", str(workers), "--worker-connections", "1000",
+         "-b", f"127.0.0.1:{port}", "--log-level", "warning",
+         "--pythonpath", os.path.dirname(os.path.abspath(__file__)), "bench_concurrency:app"],
+        # Run outside this directory so gunicorn does not pick up the API's gunicorn.conf.py
+        cwd=tempfile.gettempdir(), env=env
+    )
+    deadline = time.time() + 15
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.2):
+                break
+        except OSError:
+            time.sleep(0.1)
+    return server, f"http://127.0.0.1:{port}/"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark concurrent-connection capacity.")
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--delay", type=float, default=DELAY_SECONDS)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--url", help="load an already running server instead of the bench endpoint")
+    args = parser.parse_args()
+
+    if args.url:
+        print(f"{args.url}: {load(args.url, args.clients, args.timeout)}")
+        return
+
+    print(f"{args.clients} clients, {args.workers} workers, {args.delay}s per request")
+    for worker_class in ("sync", "gevent"):
+        server, url = _serve(worker_class, args.workers, args.delay)
+        try:
+            result = load(url, args.clients, args.timeout)
+            # Requests completing per second times how long each one waits: how many are served at once
+            result["served_at_once"] = round(result["req_per_s"] * args.delay, 1)
+            print(f"  {worker_class:<7} {result}")
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Benchmarks player search against a generated local SQLite database.
+
+    python bench_player_search.py              # 100,000 players
+    python bench_player_search.py --players 20000
+
+Reports the time to build the in-process search index and per-query latency for short
+(prefix-only) and longer (trigram) terms, next to the unindexed LIKE scan it replaces.
+"""
+
+import argparse
+import os
+import random
+import statistics
+import string
+import tempfile
+import time
+
+import sqlalchemy
+
+import player_search
+
+
+def _percentiles(samples_ms):
+    ordered = sorted(samples_ms)
+    return statistics.median(ordered), ordered[int(len(ordered) * 0.95) - 1]
+
+
+def _timed(function, terms):
+    samples = []
+    for term in terms:
+        started = time.perf_counter()
+        function(term)
+        samples.append((time.perf_counter() - started) * 1000)
+    return _percentiles(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark player search.")
+    parser.add_argument("--players", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    syllables = ["al", "ber", "cas", "dan", "el", "fi", "gor", "han", "is", "jo", "ka", "li", "mar", "no", "pet", "ra", "sam", "ti", "vic", "zo"]
+
+    def random_name():
+        return " ".join("".join(rng.choice(syllables) for _ in range(rng.randint(2, 3))).capitalize() for _ in range(2))
+
+    players = []
+    for player_id in range(1, args.players + 1):
+        name = random_name()
+        players.append((player_id, name, f"{name.replace(' ', '.').lower()}{player_id}@example.com"))
+
+    engine = sqlalchemy.create_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'search_bench.db')}")
+    with engine.begin() as conn:
+        conn.execute(sqlalchemy.text("CREATE TABLE players (player_id INTEGER PRIMARY KEY, name TEXT, email TEXT)"))
+        conn.execute(sqlalchemy.text("INSERT INTO players VALUES (:player_id, :name, :email)"),
+                     [{"player_id": p, "name": n, "email": e} for p, n, e in players])
+
+    index = player_search.PlayerSearchIndex()
+    started = time.perf_counter()
+    with engine.connect() as conn:
+        index.load(conn.execute(sqlalchemy.text("SELECT player_id, name, email FROM players")))
+    print(f"Indexed {len(index):,} players in {(time.perf_counter() - started):.2f} s")
+
+    term_sets = {
+        "2-char prefix": ["".join(rng.choice(string.ascii_lowercase) for _ in range(2)) for _ in range(args.queries)],
+        "4-char substring": [rng.choice(players)[1].lower().replace(" ", "")[1:5] for _ in range(args.queries)],
+        "8-char substring": [rng.choice(players)[2][2:10] for _ in range(args.queries)],
+    }
+
+    with engine.connect() as conn:
+        def like_scan(term):
+            return conn.execute(
+                sqlalchemy.text("SELECT player_id, name, email FROM players WHERE (name LIKE :term OR email LIKE :term) AND player_id != 1 LIMIT 10"),
+                {"term": f"%{term}%"}
+            ).fetchall()
+
+        print(f"{'terms':<18}{'index p50':>12}{'index p95':>12}{'LIKE p50':>12}{'LIKE p95':>12}   (ms)")
+        for label, terms in term_sets.items():
+            index_p50, index_p95 = _timed(lambda term: index.search(term, exclude_player_id=1), terms)
+            scan_p50, scan_p95 = _timed(like_scan, terms)
+            print(f"{label:<18}{index_p50:>12.3f}{index_p95:>12.3f}{scan_p50:>12.3f}{scan_p95:>12.3f}")
+
+    started = time.perf_counter()
+    for player_id, name, email in players[:1000]:
+        index.add(player_id, name + " Jr", email)
+    print(f"1,000 incremental updates in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Feature extraction and prompting for AI coach insights.
+
+A player's history is condensed into a small, fixed-size summary (career rates, the latest session's
+deltas against the sessions before it, the most common miss patterns, and make rates per hole quadrant)
+instead of sending raw stats and putt lists to the model. Summaries are rounded so small changes do not
+alter them, and generated insights are cached by a hash of the summary and prompt, so an unchanged
+history never costs a second model call. The title is requested in the same call as the analysis.
+
+The model is any callable taking a prompt string and returning the response text, so a local stub
+can stand in for it.
+"""
+
+import hashlib
+import json
+import logging
+import os
+
+import response_cache
+
+logger = logging.getLogger('debug_logger')
+
+TREND_SESSIONS = 10  # the latest session is compared with the mean of up to this many before it
+TOP_MISS_PATTERNS = 3
+QUADRANTS = ("TOP", "RIGHT", "LOW", "LEFT")
+PROMPT_VERSION = 1  # bump when the prompt changes so cached insights are not reused
+COACH_CACHE_TTL_SECONDS = int(os.environ.get("COACH_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+DEFAULT_TITLE = "AI Coach Analysis"
+
+_cache = None
+
+
+def _accuracy(makes, putts):
+    return round(100.0 * (makes or 0) / putts, 1) if putts else None
+
+
+def _session_features(session):
+    return {
+        "putts": session.get('total_putts') or 0,
+        "accuracy": _accuracy(session.get('total_makes'), session.get('total_putts')),
+        "mpm": round(session.get('makes_per_minute') or 0.0, 2),
+        "best_streak": session.get('best_streak') or 0,
+    }
+
+
+def _trend(sessions):
+    """The latest session's features and their change from the mean of the sessions before it."""
+    if not sessions:
+        return None
+    latest = _session_features(sessions[0])
+    previous = [_session_features(session) for session in sessions[1:TREND_SESSIONS + 1]]
+    deltas = {}
+    for feature, value in latest.items():
+        earlier = [features[feature] for features in previous if features[feature] is not None]
+        if value is not None and earlier:
+            deltas[feature] = round(value - sum(earlier) / len(earlier), 2)
+    return {"latest": latest, "vs_previous": deltas, "compared_sessions": len(previous)}
+
+
+def _top_misses(analytics):
+    """The most frequent (ramp entry, miss detail) patterns with their share of all misses."""
+    patterns = [
+        (count, f"{entry} / {detail}")
+        for entry, details in (analytics or {}).get('misses_by_entry', {}).items()
+        for detail, count in details.items()
+    ]
+    total = sum(count for count, _ in patterns)
+    return [
+        {"pattern": pattern, "count": count, "share": round(100.0 * count / total, 1)}
+        for count, pattern in sorted(patterns, reverse=True)[:TOP_MISS_PATTERNS]
+    ]
+
+
+def _quadrant_rates(stats):
+    """Share of career makes that entered each hole quadrant, in percent."""
+    overview = stats.get('makes_overview') or {}
+    counts = {quadrant: (overview.get(quadrant) or {}).get('sum') or 0 for quadrant in QUADRANTS}
+    total = sum(counts.values())
+    return {quadrant: round(100.0 * count / total, 1) if total else 0.0 for quadrant, count in counts.items()}
+
+
+def build_summary(stats, sessions, analytics=None):
+    """
+    Condenses career stats (data_manager.get_player_stats), recent sessions (newest first; only the
+    summary columns are read) and putt analytics (data_manager.get_putt_analytics) into a fixed-size dict.
+    """
+    return {
+        "career": {
+            "makes": stats.get('sum_makes') or 0,
+            "accuracy": round(stats.get('avg_accuracy') or 0.0, 1),
+            "mpm": round(stats.get('avg_mpm') or 0.0, 2),
+            "best_streak": stats.get('high_best_streak') or 0,
+            "fastest_21_seconds": round(stats.get('low_fastest_21') or 0.0, 1) or None,
+        },
+        "trend": _trend(sessions),
+        "top_misses": _top_misses(analytics),
+        "make_quadrants": _quadrant_rates(stats),
+    }
+
+
+def _compact(value):
+    return json.dumps(value, sort_keys=True, separators=(',', ':'))
+
+
+def build_prompt(player_name, summary):
+    return f'''As a PhD-level putting coach, write a short initial analysis for {player_name}.
+Start with one line "Title: <5 words or less>", then the analysis, using line breaks and bullet points:
+1. Career: one key accomplishment and one specific, actionable recommendation.
+2. Recent trend: what the latest session's changes against the previous ones say (latest, vs_previous).
+3. Patterns: one insight from the top miss patterns (ramp entry / miss detail) and the make quadrant rates (% of makes).
+Keep it concise and encouraging. Player summary (JSON): {_compact(summary)}'''
+
+
+def parse_titled_response(text):
+    """Splits a response that starts with a "Title:" line into (title, analysis)."""
+    text = (text or "").strip()
+    first_line, _, rest = text.partition("\n")
+    if first_line.lower().lstrip("#* ").startswith("title:"):
+        title = first_line.split(":", 1)[1].strip().strip('*"').strip()
+        return title or DEFAULT_TITLE, rest.strip()
+    return DEFAULT_TITLE, text
+
+
+def _get_cache():
+    global _cache
+    if _cache is None:
+        _cache = response_cache.create_backend(prefix="pop:coach:")
+    return _cache
+
+
+def generate_insight(generate, player_name, summary):
+    """
+    Returns (title, analysis) for a summary, from the cache when the same prompt was answered before.
+    `generate(prompt)` returns the model's response text.
+    """
+    prompt = build_prompt(player_name, summary)
+    key = hashlib.sha1(f"{PROMPT_VERSION}|{prompt}".encode()).hexdigest()
+    cached = _get_cache().get(key)
+    if cached is not None:
+        return tuple(json.loads(cached))
+
+    title, analysis = parse_titled_response(generate(prompt))
+    if analysis:
+        _get_cache().set(key, json.dumps([title, analysis]), COACH_CACHE_TTL_SECONDS)
+    logger.info(f"Generated coach insight from a {len(prompt)}-character prompt.")
+    return title, analysis
@@ -1,5 +1,15 @@
 import os
+import base64
+import contextvars
+import inspect
+import io
+import csv
 import logging
+import threading
+import time
+import zlib
+from contextlib import contextmanager, nullcontext
+from functools import wraps
 import sqlalchemy
 import json
 import bcrypt
@@ -7,448 +17,284 @@ from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime, timedelta, timezone
 import pytz # Import pytz for timezone handling
 from sqlalchemy.exc import IntegrityError, OperationalError
+import putt_codes
+import player_search
 
 logger = logging.getLogger('debug_logger')
 
-# Global connector and connection pool to be initialized once.
+# Global connector and connection pool to be initialized once per process.
 connector = None
 pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+# Optional read replica (DATABASE_READ_URL), built lazily per process like the primary pool.
+read_pool = None
+_read_pool_pid = None
+# Connections per process pool (SQLAlchemy's defaults unless set); raise them for the gevent serving mode.
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT_SECONDS = int(os.environ.get("DB_POOL_TIMEOUT_SECONDS", "30"))
+# Pool checkouts since this process built its engine; each checkout on PostgreSQL also pays a pre-ping.
+_pool_stats = {"checkouts": 0, "connects": 0}
+# Set by the web layer to hand out its request-scoped connection (see set_connection_provider).
+_connection_provider = None
+
+# Per-session analytics are derived once in save_session and stored as typed columns on
+# `sessions`, so career stats are plain SQL aggregates instead of re-parsing putt_list.
+MAKE_QUADRANTS = ["TOP", "RIGHT", "LOW", "LEFT"]
+MISS_CATEGORIES = ["RETURN", "CATCH", "TIMEOUT"]
+STREAK_THRESHOLDS = [3, 7, 10, 15, 21, 50, 100]
+
+SESSION_ANALYTICS_COLUMNS = {
+    **{f"makes_{quadrant.lower()}": "INTEGER" for quadrant in MAKE_QUADRANTS},
+    **{f"misses_{category.lower()}": "INTEGER" for category in MISS_CATEGORIES},
+    **{f"streaks_{threshold}": "INTEGER" for threshold in STREAK_THRESHOLDS},
+    "accuracy": "REAL",
+}
+SESSION_ANALYTICS_COLUMNS_DDL = ",\n                ".join(
+    f"{column} {col_type}" for column, col_type in SESSION_ANALYTICS_COLUMNS.items()
+)
 
 def get_db_connection():
     """
-    Initializes a connection pool. Uses a PostgreSQL database if DATABASE_URL is set,
-    otherwise falls back to a local SQLite database file.
+    Returns this process's connection pool, creating it on first use. Uses a PostgreSQL database
+    if DATABASE_URL is set, otherwise falls back to a local SQLite database file.
+    Creating the engine does not connect, and a pool inherited across fork() (e.g. gunicorn --preload)
+    is discarded in the child without touching the parent's connections, so workers never share sockets.
     """
-    global pool
-    if pool:
+    global pool, _pool_pid
+    if pool is not None and _pool_pid == os.getpid():
         return pool
 
-    db_url = os.environ.get("DATABASE_URL")
+    with _pool_lock:
+        if pool is not None and _pool_pid == os.getpid():
+            return pool
+        if pool is not None:
+            pool.dispose(close=False)
+
+        db_url = os.environ.get("DATABASE_URL")
+
+        if db_url:
+            logger.info(f"DATABASE_URL found. Creating database engine for process {os.getpid()}.")
+            # Add pool_pre_ping to handle dropped connections, common in serverless environments.
+            pool = sqlalchemy.create_engine(
+                db_url,
+                pool_pre_ping=True,
+                pool_recycle=300, # Recycle connections every 5 minutes
+                # In the gevent serving mode many requests share a worker's pool; size it with these.
+                pool_size=DB_POOL_SIZE,
+                max_overflow=DB_MAX_OVERFLOW,
+                pool_timeout=DB_POOL_TIMEOUT_SECONDS
+            )
+        else:
+            db_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "proofofputt_data.db")
+            logger.warning(f"DATABASE_URL not set. Falling back to local SQLite DB: {db_path}")
+            pool = sqlalchemy.create_engine(f"sqlite:///{db_path}")
+        _pool_pid = os.getpid()
+        _pool_stats.update(checkouts=0, connects=0)
+        sqlalchemy.event.listen(pool, "checkout", lambda *args: _count_pool_event("checkouts"))
+        sqlalchemy.event.listen(pool, "connect", lambda *args: _count_pool_event("connects"))
+        sqlalchemy.event.listen(pool, "commit", _run_after_commit)
+        sqlalchemy.event.listen(pool, "rollback", _discard_after_commit)
+        if os.environ.get("DATABASE_READ_URL"):
+            sqlalchemy.event.listen(pool, "before_cursor_execute", _mark_write)
+            sqlalchemy.event.listen(pool, "checkin", _clear_write_mark)
+
+    return pool
 
-    if db_url:
-        logger.info("DATABASE_URL found. Connecting to PostgreSQL database.")
-        # Add pool_pre_ping to handle dropped connections, common in serverless environments.
-        pool = sqlalchemy.create_engine(
-            db_url,
-            pool_pre_ping=True,
-            pool_recycle=300 # Recycle connections every 5 minutes
+def get_read_connection():
+    """
+    Returns this process's read replica pool when DATABASE_READ_URL is set, otherwise the primary pool.
+    Only functions marked @read_only use it, and only when the caller has not just written (see _use_replica).
+    """
+    global read_pool, _read_pool_pid
+    read_url = os.environ.get("DATABASE_READ_URL")
+    if not read_url:
+        return get_db_connection()
+    if read_pool is not None and _read_pool_pid == os.getpid():
+        return read_pool
+
+    with _pool_lock:
+        if read_pool is not None and _read_pool_pid == os.getpid():
+            return read_pool
+        if read_pool is not None:
+            read_pool.dispose(close=False)
+
+        logger.info(f"DATABASE_READ_URL found. Creating read replica engine for process {os.getpid()}.")
+        if not os.environ.get("RESPONSE_CACHE_URL"):
+            logger.warning("RESPONSE_CACHE_URL is not set, so read-your-writes after a session save only holds on the worker that saved it.")
+        read_pool = sqlalchemy.create_engine(
+            read_url, pool_pre_ping=True, pool_recycle=300,
+            pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW, pool_timeout=DB_POOL_TIMEOUT_SECONDS
         )
-    else:
-        db_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "proofofputt_data.db")
-        logger.warning(f"DATABASE_URL not set. Falling back to local SQLite DB: {db_path}")
-        pool = sqlalchemy.create_engine(f"sqlite:///{db_path}")
+        _read_pool_pid = os.getpid()
+        _pool_stats.update(replica_checkouts=0)
+        sqlalchemy.event.listen(read_pool, "checkout", lambda *args: _count_pool_event("replica_checkouts"))
 
-    return pool
+    return read_pool
 
+def _mark_write(conn, cursor, statement, parameters, context, executemany):
+    """Flags the connection once it runs anything but a SELECT, so the request keeps reading from the primary."""
+    if statement.lstrip()[:6].upper() != "SELECT":
+        conn.info['wrote'] = True
 
-def initialize_database():
-    """Creates the database tables if they don't exist and ensures the default user is present."""
-    pool = get_db_connection()
-    db_type = pool.dialect.name
+def _clear_write_mark(dbapi_connection, connection_record):
+    connection_record.info.pop('wrote', None)
 
-    with pool.connect() as conn:
-        player_id_type = "SERIAL PRIMARY KEY" if db_type == "postgresql" else "INTEGER PRIMARY KEY"
-        session_id_type = "SERIAL PRIMARY KEY" if db_type == "postgresql" else "INTEGER PRIMARY KEY"
-        timestamp_type = "TIMESTAMP WITH TIME ZONE" if db_type == "postgresql" else "DATETIME"
-        default_timestamp = "CURRENT_TIMESTAMP" if db_type == "postgresql" else "CURRENT_TIMESTAMP"
-
-        with conn.begin() as trans: # Use a single transaction for the entire setup
-            conn.execute(sqlalchemy.text(f'''
-                    CREATE TABLE IF NOT EXISTS players (
-                        player_id {player_id_type},
-                        email TEXT UNIQUE NOT NULL,
-                        name TEXT NOT NULL,
-                        password_hash TEXT NOT NULL,
-                        created_at {timestamp_type} DEFAULT {default_timestamp},
-                        subscription_status TEXT DEFAULT 'free',
-                        zaprite_subscription_id TEXT,
-                        timezone TEXT DEFAULT 'UTC',
-                        x_url TEXT,
-                        tiktok_url TEXT,
-                        website_url TEXT,
-                        notification_preferences TEXT,
-                        calibration_data TEXT
-                    )
-            '''))
-
-            if db_type == "sqlite":
-                columns_to_add = {
-                    "x_url": "TEXT",
-                    "tiktok_url": "TEXT",
-                    "website_url": "TEXT",
-                    "notification_preferences": "TEXT",
-                    "calibration_data": "TEXT"
-                }
-                for column, col_type in columns_to_add.items():
-                    try:
-                        conn.execute(sqlalchemy.text(f"ALTER TABLE players ADD COLUMN {column} {col_type}"))
-                        logger.info(f"Added column '{column}' to 'players' table.")
-                    except OperationalError as e:
-                        if "duplicate column name" in str(e).lower():
-                            logger.info(f"Column '{column}' already exists in 'players' table. Skipping.")
-                        else:
-                            logger.error(f"Error adding column '{column}' to 'players' table: {e}")
-
-            elif db_type == "postgresql":
-                # Check if the column exists first to avoid a failing statement within the transaction
-                inspector = sqlalchemy.inspect(conn)
-                columns = [c['name'] for c in inspector.get_columns('players')]
-                if 'calibration_data' not in columns:
-                    conn.execute(sqlalchemy.text("ALTER TABLE players ADD COLUMN calibration_data TEXT"))
-                    logger.info("Migration: Added column 'calibration_data' to 'players' table.")
-                else:
-                    logger.info("Migration: Column 'calibration_data' already exists in 'players' table. Skipping.")
-
-            conn.execute(sqlalchemy.text(f'''
-                    CREATE TABLE IF NOT EXISTS sessions (
-                        session_id {session_id_type},
-                        player_id INTEGER NOT NULL,
-                        start_time {timestamp_type} DEFAULT {default_timestamp},
-                        end_time {timestamp_type},
-                        status TEXT,
-                        total_putts INTEGER,
-                        total_makes INTEGER,
-                        total_misses INTEGER,
-                        best_streak INTEGER,
-                        fastest_21_makes REAL,
-                        putts_per_minute REAL,
-                        makes_per_minute REAL,
-                        most_makes_in_60_seconds INTEGER,
-                        session_duration REAL,
-                        putt_list TEXT,
-                        makes_by_category TEXT,
-                        misses_by_category TEXT,
-                        FOREIGN KEY (player_id) REFERENCES players (player_id) ON DELETE CASCADE
-                    )
-            '''))
-
-            conn.execute(sqlalchemy.text(f'''
-                    CREATE TABLE IF NOT EXISTS leagues (
-                        league_id {session_id_type},
-                        creator_id INTEGER NOT NULL,
-                        name TEXT NOT NULL,
-                        description TEXT,
-                        privacy_type TEXT NOT NULL DEFAULT 'private',
-                        status TEXT NOT NULL DEFAULT 'registering',
-                        settings TEXT,
-                        start_time {timestamp_type},
-                        created_at {timestamp_type} DEFAULT {default_timestamp},
-                        FOREIGN KEY (creator_id) REFERENCES players (player_id) ON DELETE CASCADE
-                    )
-            '''))
-
-            # Password reset tokens table
-            conn.execute(sqlalchemy.text(f'''
-                    CREATE TABLE IF NOT EXISTS password_reset_tokens (
-                        token_id {session_id_type},
-                        player_id INTEGER NOT NULL,
-                        token TEXT UNIQUE NOT NULL,
-                        expires_at {timestamp_type} NOT NULL,
-                        used BOOLEAN DEFAULT FALSE,
-                        created_at {timestamp_type} DEFAULT {default_timestamp},
-                        FOREIGN KEY (player_id) REFERENCES players (player_id) ON DELETE CASCADE
-                    )
-            '''))
-
-            # Fundraisers table
-            conn.execute(sqlalchemy.text(f'''
-                    CREATE TABLE IF NOT EXISTS fundraisers (
-                        fundraiser_id {session_id_type},
-                        creator_id INTEGER NOT NULL,
-                        title TEXT NOT NULL,
-                        description TEXT,
-                        charity_name TEXT NOT NULL,
-                        charity_wallet_address TEXT,
-                        target_amount REAL,
-                        current_amount REAL DEFAULT 0,
-                        sat_per_putt INTEGER DEFAULT 100,
-                        start_date {timestamp_type},
-                        end_date {timestamp_type},
-                        status TEXT DEFAULT 'active',
-                        created_at {timestamp_type} DEFAULT {default_timestamp},
-                        FOREIGN KEY (creator_id) REFERENCES players (player_id) ON DELETE CASCADE
-                    )
-            '''))
-
-            # Pledges table
-            conn.execute(sqlalchemy.text(f'''
-                    CREATE TABLE IF NOT EXISTS pledges (
-                        pledge_id {session_id_type},
-                        fundraiser_id INTEGER NOT NULL,
-                        pledger_id INTEGER NOT NULL,
-                        amount_per_putt INTEGER NOT NULL,
-                        max_amount REAL,
-                        total_pledged REAL DEFAULT 0,
-                        total_paid REAL DEFAULT 0,
-                        status TEXT DEFAULT 'active',
-                        created_at {timestamp_type} DEFAULT {default_timestamp},
-                        FOREIGN KEY (fundraiser_id) REFERENCES fundraisers (fundraiser_id) ON DELETE CASCADE,
-                        FOREIGN KEY (pledger_id) REFERENCES players (player_id) ON DELETE CASCADE
-                    )
-            '''))
-
-            if db_type == "sqlite":
-                league_columns_to_add = {
-                    "name": "TEXT",
-                    "description": "TEXT",
-                    "privacy_type": "TEXT",
-                    "status": "TEXT",
-                    "settings": "TEXT",
-                    "start_time": "DATETIME",
-                    "final_notifications_sent": "BOOLEAN"
-                }
-                for column, col_type in league_columns_to_add.items():
-                    try:
-                        conn.execute(sqlalchemy.text(f"ALTER TABLE leagues ADD COLUMN {column} {col_type} DEFAULT ''"))
-                        logger.info(f"Added column '{column}' to 'leagues' table.")
-                    except OperationalError as e:
-                        if "duplicate column name" in str(e).lower():
-                            logger.info(f"Column '{column}' already exists in 'leagues' table. Skipping.")
-                        else:
-                            logger.error(f"Error adding column '{column}' to 'leagues' table: {e}")
-
-            conn.execute(sqlalchemy.text(f'''
-                    CREATE TABLE IF NOT EXISTS league_members (
-                        member_id INTEGER,
-                        league_id INTEGER NOT NULL,
-                        player_id INTEGER NOT NULL,
-                        status TEXT DEFAULT 'active',
-                        created_at {timestamp_type} DEFAULT {default_timestamp},
-                        PRIMARY KEY (league_id, player_id),
-                        FOREIGN KEY (league_id) REFERENCES leagues (league_id) ON DELETE CASCADE,
-                        FOREIGN KEY (player_id) REFERENCES players (player_id) ON DELETE CASCADE
-                    )
-            '''))
-
-            conn.execute(sqlalchemy.text(f'''
-                    CREATE TABLE IF NOT EXISTS league_rounds (
-                        round_id {session_id_type},
-                        league_id INTEGER NOT NULL,
-                        round_number INTEGER NOT NULL,
-                        status TEXT DEFAULT 'scheduled',
-                        start_time {timestamp_type},
-                        end_time {timestamp_type},
-                        FOREIGN KEY (league_id) REFERENCES leagues (league_id) ON DELETE CASCADE
-                    )
-            '''))
+def _count_pool_event(name):
+    _pool_stats[name] = _pool_stats.get(name, 0) + 1
 
-            if db_type == "sqlite":
-                round_columns_to_add = {
-                    "round_number": "INTEGER",
-                    "status": "TEXT"
-                }
-                for column, col_type in round_columns_to_add.items():
-                    try:
-                        conn.execute(sqlalchemy.text(f"ALTER TABLE league_rounds ADD COLUMN {column} {col_type}"))
-                        logger.info(f"Added column '{column}' to 'league_rounds' table.")
-                    except OperationalError as e:
-                        if "duplicate column name" in str(e).lower():
-                            logger.info(f"Column '{column}' already exists in 'league_rounds' table. Skipping.")
-                        else:
-                            logger.error(f"Error adding column '{column}' to 'league_rounds' table: {e}")
-
-            conn.execute(sqlalchemy.text(f'''
-                    CREATE TABLE IF NOT EXISTS league_round_submissions (
-                        submission_id {session_id_type},
-                        round_id INTEGER NOT NULL,
-                        player_id INTEGER NOT NULL,
-                        session_id INTEGER NOT NULL,
-                        score INTEGER NOT NULL,
-                        points_awarded INTEGER NOT NULL,
-                        submitted_at {timestamp_type} DEFAULT {default_timestamp},
-                        FOREIGN KEY (player_id) REFERENCES players (player_id) ON DELETE CASCADE,
-                        FOREIGN KEY (session_id) REFERENCES sessions (session_id) ON DELETE CASCADE,
-                        FOREIGN KEY (round_id) REFERENCES league_rounds (round_id) ON DELETE CASCADE
-                    )
-            '''))
-
-            if db_type == "sqlite":
-                submission_columns_to_add = {
-                    "player_id": "INTEGER",
-                    "session_id": "INTEGER",
-                    "score": "INTEGER",
-                    "points_awarded": "INTEGER",
-                    "submitted_at": "DATETIME"
-                }
-                for column, col_type in submission_columns_to_add.items():
-                    try:
-                        conn.execute(sqlalchemy.text(f"ALTER TABLE league_round_submissions ADD COLUMN {column} {col_type}"))
-                        logger.info(f"Added column '{column}' to 'league_round_submissions' table.")
-                    except OperationalError as e:
-                        if "duplicate column name" in str(e).lower():
-                            logger.info(f"Column '{column}' already exists in 'league_round_submissions' table. Skipping.")
-                        else:
-                            logger.error(f"Error adding column '{column}' to 'league_round_submissions' table: {e}")
-
-            conn.execute(sqlalchemy.text(f'''
-                    CREATE TABLE IF NOT EXISTS player_stats (
-                        player_id INTEGER PRIMARY KEY,
-                        total_makes INTEGER DEFAULT 0,
-                        total_misses INTEGER DEFAULT 0,
-                        total_putts INTEGER DEFAULT 0,
-                        best_streak INTEGER DEFAULT 0,
-                        fastest_21_makes REAL DEFAULT 0,
-                        total_duration REAL DEFAULT 0,
-                        last_updated {timestamp_type} DEFAULT {default_timestamp},
-                        FOREIGN KEY (player_id) REFERENCES players (player_id) ON DELETE CASCADE
-                    )
-            '''))
-            
-            # Add missing columns for existing player_stats tables
-            if db_type == "postgresql":
-                inspector = sqlalchemy.inspect(conn)
-                if inspector.has_table('player_stats'):
-                    existing_columns = [c['name'] for c in inspector.get_columns('player_stats')]
-                    missing_columns = {
-                        'total_makes': 'INTEGER DEFAULT 0',
-                        'total_misses': 'INTEGER DEFAULT 0',
-                        'best_streak': 'INTEGER DEFAULT 0',
-                        'total_duration': 'REAL DEFAULT 0',
-                        'last_updated': f'{timestamp_type} DEFAULT {default_timestamp}'
-                    }
-                    for col_name, col_def in missing_columns.items():
-                        if col_name not in existing_columns:
-                            try:
-                                conn.execute(sqlalchemy.text(f'ALTER TABLE player_stats ADD COLUMN {col_name} {col_def}'))
-                                logger.info(f"Added column '{col_name}' to 'player_stats' table.")
-                            except Exception as e:
-                                logger.error(f"Error adding column '{col_name}' to 'player_stats' table: {e}")
-
-            conn.execute(sqlalchemy.text(f'''
-                    CREATE TABLE IF NOT EXISTS coach_conversations (
-                        conversation_id {session_id_type},
-                        player_id INTEGER NOT NULL,
-                        last_updated {timestamp_type} DEFAULT {default_timestamp},
-                        FOREIGN KEY (player_id) REFERENCES players (player_id) ON DELETE CASCADE
-                    )
-            '''))
-
-            conn.execute(sqlalchemy.text(f'''
-                    CREATE TABLE IF NOT EXISTS duels (
-                        duel_id {session_id_type},
-                        creator_id INTEGER NOT NULL,
-                        invited_player_id INTEGER NOT NULL,
-                        status TEXT DEFAULT 'pending',
-                        settings TEXT,
-                        creator_submitted_session_id INTEGER,
-                        invited_submitted_session_id INTEGER,
-                        winner_id INTEGER,
-                        created_at {timestamp_type} DEFAULT {default_timestamp},
-                        FOREIGN KEY (creator_id) REFERENCES players (player_id) ON DELETE CASCADE,
-                        FOREIGN KEY (invited_player_id) REFERENCES players (player_id) ON DELETE CASCADE,
-                        FOREIGN KEY (creator_submitted_session_id) REFERENCES sessions (session_id),
-                        FOREIGN KEY (invited_submitted_session_id) REFERENCES sessions (session_id),
-                        FOREIGN KEY (winner_id) REFERENCES players (player_id)
-                    )
-            '''))
+def reset_db_connection():
+    """
+    Drops this process's reference to the connection pool without closing connections that may
+    belong to a parent process. Call from a post-fork hook; the next get_db_connection() builds a fresh pool.
+    """
+    global pool, _pool_pid, read_pool, _read_pool_pid
+    with _pool_lock:
+        for engine in (pool, read_pool):
+            if engine is not None:
+                engine.dispose(close=False)
+        pool = None
+        _pool_pid = None
+        read_pool = None
+        _read_pool_pid = None
+
+def get_pool_stats():
+    """Returns this process's pool checkout and new-connection counts, plus connections currently checked out."""
+    stats = {"pid": os.getpid(), **_pool_stats, "checked_out": None, "read_replica": bool(os.environ.get("DATABASE_READ_URL"))}
+    if pool is not None and _pool_pid == os.getpid() and hasattr(pool.pool, "checkedout"):
+        stats["checked_out"] = pool.pool.checkedout()
+    return stats
+
+def set_connection_provider(provider):
+    """
+    Registers a callable that returns the caller's unit-of-work connection, or None if there is none.
+    Functions called without an explicit `conn` use the provided connection instead of checking out their own,
+    so the API serves each request from one pooled connection and one transaction.
+    Inside @read_only functions it is called with read_only=True and may return a replica connection instead.
+    """
+    global _connection_provider
+    _connection_provider = provider
 
-            if db_type == "sqlite":
-                try:
-                    duel_table_info = conn.execute(sqlalchemy.text("PRAGMA table_info(duels)")).mappings().fetchall()
-                    duel_column_names = [col['name'] for col in duel_table_info]
-                    duel_columns_to_add = {
-                        "invitation_expiry_minutes": "INTEGER",
-                        "session_duration_limit_minutes": "INTEGER",
-                        "invitation_expires_at": "DATETIME"
-                    }
-                    for column, col_type in duel_columns_to_add.items():
-                        if column not in duel_column_names:
-                            conn.execute(sqlalchemy.text(f"ALTER TABLE duels ADD COLUMN {column} {col_type}"))
-                            logger.info(f"Migration: Added column '{column}' to 'duels' table.")
-                    if 'time_limit_minutes' in duel_column_names:
-                        logger.info("Migration: Found obsolete 'time_limit_minutes' column in 'duels' table. Dropping it.")
-                        conn.execute(sqlalchemy.text("ALTER TABLE duels DROP COLUMN time_limit_minutes"))
-                        logger.info("Migration: Successfully dropped 'time_limit_minutes' column.")
-                except Exception as e:
-                    logger.warning(f"A non-critical error occurred during 'duels' table migration. This is often safe to ignore. Error: {e}")
-
-            conn.execute(sqlalchemy.text(f'''
-                    CREATE TABLE IF NOT EXISTS notifications (
-                        id {session_id_type},
-                        player_id INTEGER NOT NULL,
-                        email_sent BOOLEAN DEFAULT FALSE,
-                        FOREIGN KEY (player_id) REFERENCES players (player_id) ON DELETE CASCADE
-                    )
-            '''))
+@contextmanager
+def _connect(conn=None):
+    """
+    Yields `conn`, else the provider's connection, else a new pooled connection that is closed on exit.
+    Borrowed connections are left open for their owner to commit or roll back.
+    Inside a @read_only function the connection comes from the read replica when one is configured.
+    """
+    replica = conn is None and _use_replica()
+    if conn is None and _connection_provider is not None:
+        conn = _connection_provider(read_only=True) if replica else _connection_provider()
+    if conn is not None:
+        yield conn
+        return
+    with (get_read_connection() if replica else get_db_connection()).connect() as own_conn:
+        yield own_conn
 
-            if db_type == "sqlite":
-                notification_columns_to_add = {
-                    "email_sent": "BOOLEAN"
-                }
-                for column, col_type in notification_columns_to_add.items():
-                    try:
-                        conn.execute(sqlalchemy.text(f"ALTER TABLE notifications ADD COLUMN {column} {col_type}"))
-                        logger.info(f"Added column '{column}' to 'notifications' table.")
-                    except OperationalError as e:
-                        if "duplicate column name" in str(e).lower():
-                            logger.info(f"Column '{column}' already exists in 'notifications' table. Skipping.")
-                        else:
-                            logger.error(f"Error adding column '{column}' to 'notifications' table: {e}")
-
-            conn.execute(sqlalchemy.text(f'''
-                    CREATE TABLE IF NOT EXISTS fundraisers (
-                        fundraiser_id {session_id_type},
-                        creator_id INTEGER NOT NULL,
-                        title TEXT NOT NULL,
-                        description TEXT,
-                        charity_name TEXT NOT NULL,
-                        charity_wallet_address TEXT,
-                        target_amount REAL,
-                        current_amount REAL DEFAULT 0,
-                        sat_per_putt INTEGER DEFAULT 100,
-                        start_date {timestamp_type},
-                        end_date {timestamp_type},
-                        status TEXT DEFAULT 'active',
-                        created_at {timestamp_type} DEFAULT {default_timestamp},
-                        FOREIGN KEY (creator_id) REFERENCES players (player_id) ON DELETE CASCADE
-                    )
-            '''))
-
-            conn.execute(sqlalchemy.text(f'''
-                    CREATE TABLE IF NOT EXISTS pledges (
-                        pledge_id {session_id_type},
-                        fundraiser_id INTEGER NOT NULL,
-                        pledger_id INTEGER NOT NULL,
-                        amount_per_putt INTEGER NOT NULL,
-                        max_amount REAL,
-                        total_pledged REAL DEFAULT 0,
-                        total_paid REAL DEFAULT 0,
-                        status TEXT DEFAULT 'active',
-                        created_at {timestamp_type} DEFAULT {default_timestamp},
-                        FOREIGN KEY (fundraiser_id) REFERENCES fundraisers (fundraiser_id) ON DELETE CASCADE,
-                        FOREIGN KEY (pledger_id) REFERENCES players (player_id) ON DELETE CASCADE
-                    )
-            '''))
+def _begin(conn):
+    """Begins a transaction on `conn` unless one is already open, in which case its owner commits it."""
+    return nullcontext() if conn.in_transaction() else conn.begin()
 
-            if db_type == "sqlite":
-                fundraiser_columns_to_add = {
-                    "last_notified_milestone": "INTEGER",
-                    "conclusion_notification_sent": "BOOLEAN"
-                }
-                for column, col_type in fundraiser_columns_to_add.items():
-                    try:
-                        conn.execute(sqlalchemy.text(f"ALTER TABLE fundraisers ADD COLUMN {column} {col_type} DEFAULT 0"))
-                        logger.info(f"Added column '{column}' to 'fundraisers' table.")
-                    except OperationalError as e:
-                        if "duplicate column name" in str(e).lower():
-                            logger.info(f"Column '{column}' already exists in 'fundraisers' table. Skipping.")
-                        else:
-                            logger.error(f"Error adding column '{column}' to 'fundraisers' table: {e}")
-
-            conn.execute(sqlalchemy.text(f'''
-                    CREATE TABLE IF NOT EXISTS player_relationships (
-                        follower_id INTEGER NOT NULL,
-                        followed_id INTEGER NOT NULL,
-                        created_at {timestamp_type} DEFAULT {default_timestamp},
-                        PRIMARY KEY (follower_id, followed_id),
-                        FOREIGN KEY (follower_id) REFERENCES players (player_id) ON DELETE CASCADE,
-                        FOREIGN KEY (followed_id) REFERENCES players (player_id) ON DELETE CASCADE
-                    )
-            '''))
+def _after_commit(conn, callback):
+    """
+    Runs `callback` once the transaction on `conn` commits and drops it on rollback, so in-process
+    caches and indexes only ever reflect committed data.
+    """
+    conn.info.setdefault('after_commit', []).append(callback)
+
+def _run_after_commit(conn):
+    for callback in conn.info.pop('after_commit', []):
+        try:
+            callback()
+        except Exception as e:
+            logger.error(f"After-commit callback failed: {e}", exc_info=True)
+
+def _discard_after_commit(conn):
+    conn.info.pop('after_commit', None)
+
+
+# Reads marked @read_only go to the replica unless the player they concern wrote within the
+# replication lag allowance. Recent writers are marked in the shared cache (RESPONSE_CACHE_URL), so
+# every worker sees them. Without it the markers are per process, and a player's next request on
+# another worker may read the replica before their write has reached it.
+REPLICA_LAG_SECONDS = float(os.environ.get("DATABASE_READ_LAG_SECONDS", "5"))
+_write_markers = None  # response_cache backend: player_id -> marker that expires after REPLICA_LAG_SECONDS
+_read_scope = contextvars.ContextVar("read_scope", default=None)
+_primary_reads = contextvars.ContextVar("primary_reads", default=False)
+
+def read_only(player_arg=None):
+    """
+    Marks a function as read-only so the connections it opens may come from the read replica.
+    `player_arg` names the parameter holding the player the data belongs to; reads for a player
+    who has just written are served by the primary so they see their own writes.
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not os.environ.get("DATABASE_READ_URL") or _primary_reads.get():
+                return func(*args, **kwargs)
+            player_id = signature.bind_partial(*args, **kwargs).arguments.get(player_arg) if player_arg else None
+            token = _read_scope.set({"player_id": player_id})
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _read_scope.reset(token)
+        return wrapper
+    return decorator
+
+@contextmanager
+def primary_reads():
+    """
+    Serves @read_only functions from the primary inside the block. The response cache renders under it,
+    so a body is never older than the resource versions (read on the primary) that its ETag is built from.
+    """
+    token = _primary_reads.set(True)
+    try:
+        yield
+    finally:
+        _primary_reads.reset(token)
+
+def _get_write_markers():
+    global _write_markers
+    if _write_markers is None:
+        import response_cache  # imports Flask, which scripts that never use a replica do not need
+        _write_markers = response_cache.create_backend(prefix="pop:writer:")
+    return _write_markers
+
+def _note_player_write(player_id):
+    if not os.environ.get("DATABASE_READ_URL"):
+        return
+    _get_write_markers().set(str(player_id), b"1", max(1, round(REPLICA_LAG_SECONDS)))
+
+def _use_replica():
+    scope = _read_scope.get()
+    if scope is None:
+        return False
+    player_id = scope["player_id"]
+    return player_id is None or _get_write_markers().get(str(player_id)) is None
+
+def initialize_database():
+    """
+    Applies any pending schema migrations and ensures the default user is present.
+    On an up-to-date database this is a single schema version check.
+    """
+    import migrations  # migrations imports this module for its data backfills
+
+    if migrations.run_migrations(get_db_connection()):
+        seed_default_user()
+
+def seed_default_user():
+    """Creates the default 'POP' player if missing and keeps it on an active subscription."""
+    pool = get_db_connection()
+    db_type = pool.dialect.name
 
-            # --- Create Default User Logic ---
+    with pool.connect() as conn:
+        with conn.begin():
             pop_user = conn.execute(
-                sqlalchemy.text("SELECT player_id, subscription_status FROM players WHERE email = :email"),
+                sqlalchemy.text("SELECT player_id, subscription_status, password_hash FROM players WHERE email = :email"),
                 {"email": "pop@proofofputt.com"}
             ).mappings().first()
 
@@ -456,24 +302,16 @@ def initialize_database():
                 logger.info("Default user 'pop@proofofputt.com' not found. Creating...")
                 password_hash = bcrypt.hashpw("passwordpop123".encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
                 
+                insert_sql = "INSERT INTO players (email, name, password_hash, timezone) VALUES (:email, :name, :password_hash, :timezone)"
                 if db_type == "postgresql":
-                    insert_sql = "INSERT INTO players (email, name, password_hash, timezone) VALUES (:email, :name, :password_hash, :timezone) RETURNING player_id"
-                    result = conn.execute(sqlalchemy.text(insert_sql), {
-                        "email": "pop@proofofputt.com",
-                        "name": "POP",
-                        "password_hash": password_hash,
-                        "timezone": "UTC"
-                    })
-                    player_id = result.scalar()
-                else:
-                    insert_sql = "INSERT INTO players (email, name, password_hash, timezone) VALUES (:email, :name, :password_hash, :timezone)"
-                    result = conn.execute(sqlalchemy.text(insert_sql), {
-                        "email": "pop@proofofputt.com",
-                        "name": "POP",
-                        "password_hash": password_hash,
-                        "timezone": "UTC"
-                    })
-                    player_id = result.lastrowid
+                    insert_sql += " RETURNING player_id"
+                result = conn.execute(sqlalchemy.text(insert_sql), {
+                    "email": "pop@proofofputt.com",
+                    "name": "POP",
+                    "password_hash": password_hash,
+                    "timezone": "UTC"
+                })
+                player_id = result.scalar() if db_type == "postgresql" else result.lastrowid
                 
                 # Initialize player stats with zeros
                 conn.execute(sqlalchemy.text('''
@@ -490,25 +328,25 @@ def initialize_database():
                 
                 pop_user = {'player_id': player_id, 'subscription_status': 'free'}
                 logger.info(f"Registered new default player 'POP' with ID {player_id}.")
-# create_default_session_if_needed(player_id, conn) - Removed as requested
 
-            else:
-                logger.info(f"Default user {pop_user['player_id']} found. Ensuring password hash is bcrypt compatible.")
+            elif not (pop_user['password_hash'] or '').startswith('$2'):
+                logger.info(f"Default user {pop_user['player_id']} has a non-bcrypt password hash. Rehashing.")
                 hashed_password = bcrypt.hashpw("passwordpop123".encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
                 conn.execute(sqlalchemy.text('''
                     UPDATE players SET password_hash = :password_hash
                     WHERE player_id = :player_id
                 '''), {"password_hash": hashed_password, "player_id": pop_user['player_id']})
-# create_default_session_if_needed(pop_user['player_id'], conn) - Removed as requested
             
-            if pop_user and pop_user['subscription_status'] != 'active':
+            if pop_user['subscription_status'] != 'active':
                 logger.info(f"Upgrading default user {pop_user['player_id']} to 'active' subscription status.")
                 conn.execute(sqlalchemy.text('''
                     UPDATE players SET subscription_status = 'active'
                     WHERE player_id = :player_id
                 '''), {"player_id": pop_user['player_id']})
+                _bump_resource_version(conn, _player_resource(pop_user['player_id']))
+                invalidate_player_info(pop_user['player_id'], conn)
 
-def register_player(email, password, name):
+def register_player(email, password, name, conn=None):
     """Registers a new player with a hashed password."""
     if not email or not password or not name:
         raise ValueError("Email, password, and name cannot be empty.")
@@ -517,8 +355,8 @@ def register_player(email, password, name):
     password_hash = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
     db_type = pool.dialect.name
 
-    with pool.connect() as conn:
-        with conn.begin() as trans:
+    with _connect(conn) as conn:
+        with _begin(conn):
             try:
                 insert_sql = "INSERT INTO players (email, name, password_hash, timezone) VALUES (LOWER(:email), :name, :password_hash, :timezone)"
                 if db_type == "postgresql":
@@ -548,62 +386,28 @@ def register_player(email, password, name):
                     <p>Log in now and start tracking your putting sessions!</p>"""
                 send_email(email, subject, html_content)
 
+                _queue_search_update(conn, player_id, {"name": name, "email": email.lower()})
                 logger.info(f"Registered new player '{name}' with ID {player_id}.")
                 return player_id, name
             except IntegrityError as e:
                 raise ValueError("A player with this email already exists.")
 
-def login_with_email_password(email, password):
-    """Authenticates a player with email and password."""
-    pool = get_db_connection()
-    with pool.connect() as conn:
+def login_with_email_password(email, password, conn=None):
+    """
+    Authenticates a player with email and password. Returns (player_id, name, email, timezone,
+    subscription_status), or a tuple of Nones when the credentials do not match.
+    """
+    with _connect(conn) as conn:
         result = conn.execute(
             sqlalchemy.text("SELECT player_id, name, email, password_hash, timezone, subscription_status FROM players WHERE LOWER(email) = LOWER(:email)"),
             {"email": email.lower()}
         ).mappings().first()
 
         if result and bcrypt.checkpw(password.encode('utf-8'), result['password_hash'].encode('utf-8')):
-            player_id = result['player_id']
-            stats = get_player_stats(player_id)
-            sessions = get_sessions_for_player(player_id, limit=25)
-            return player_id, result['name'], result['email'], stats, sessions, result['timezone'], result['subscription_status']
-        
-        return None, None, None, None, None, None, None
-
-def _aggregate_session_makes(s_makes_by_cat, career_stats):
-    """Helper to aggregate makes from a single session into career stats."""
-    s_makes_overview_counts = {cat: 0 for cat in ["TOP", "RIGHT", "LOW", "LEFT"]}
-    for cat, count in s_makes_by_cat.items():
-        # Detailed aggregation
-        if cat not in career_stats["makes_detailed"]:
-            career_stats["makes_detailed"][cat] = {"high": 0, "sum": 0}
-        career_stats["makes_detailed"][cat]["high"] = max(career_stats["makes_detailed"][cat]["high"], count)
-        career_stats["makes_detailed"][cat]["sum"] += count
+            # Identity only; stats and sessions are fetched separately through /player/<id>/data
+            return result['player_id'], result['name'], result['email'], result['timezone'], result['subscription_status']
         
-        # Tally for session overview
-        if "TOP" in cat: s_makes_overview_counts["TOP"] += count
-        if "RIGHT" in cat: s_makes_overview_counts["RIGHT"] += count
-        if "LOW" in cat: s_makes_overview_counts["LOW"] += count
-        if "LEFT" in cat: s_makes_overview_counts["LEFT"] += count
-    
-    # Update career overview with this session's totals
-    for cat, count in s_makes_overview_counts.items():
-        career_stats["makes_overview"][cat]["sum"] += count
-        career_stats["makes_overview"][cat]["high"] = max(career_stats["makes_overview"][cat]["high"], count)
-
-def _aggregate_session_misses(putt_list, career_stats):
-    """Helper to aggregate detailed misses from a single session's putt list."""
-    s_misses_detailed = {}
-    for putt in [p for p in putt_list if p.get('Putt Classification') == 'MISS']:
-        detail = putt.get('Putt Detailed Classification', 'UNKNOWN').replace('MISS - ', '')
-        s_misses_detailed[detail] = s_misses_detailed.get(detail, 0) + 1
-    
-    for detail, count in s_misses_detailed.items():
-        if detail not in career_stats["misses_detailed"]:
-            career_stats["misses_detailed"][detail] = {"low": float('inf'), "high": 0, "sum": 0}
-        career_stats["misses_detailed"][detail]["low"] = min(career_stats["misses_detailed"][detail]["low"], count)
-        career_stats["misses_detailed"][detail]["high"] = max(career_stats["misses_detailed"][detail]["high"], count)
-        career_stats["misses_detailed"][detail]["sum"] += count
+        return None, None, None, None, None
 
 def safe_divide(numerator, denominator, default=0):
     """Safely divide two numbers, returning default if denominator is 0 or None."""
@@ -621,14 +425,387 @@ def safe_value(value, default=0):
         return default
     return value
 
-def get_player_stats(player_id):
+def _putt_fields(putt):
+    """Returns (classification, detailed_classification) for a stored putt, which may be a raw
+    desktop log entry or a SessionReporter 'Putt ...' record."""
+    classification = putt.get('Putt Classification') or putt.get('classification') or ''
+    detailed = putt.get('Putt Detailed Classification') or putt.get('detailed_classification') or ''
+    return classification.upper(), detailed
+
+def _load_json_field(value, default):
+    """Decodes a JSON text column, passing through values that are already decoded."""
+    if value is None or value == '':
+        return default
+    if isinstance(value, (list, dict)):
+        return value
+    try:
+        return json.loads(value)
+    except (json.JSONDecodeError, TypeError):
+        return default
+
+def _make_quadrant(category):
+    """
+    Returns the hole quadrant of a make category such as 'HOLE: TOP - LEFT' (hole entry, then ramp entry).
+    Only the hole entry part is considered, so the ramp side never counts as a quadrant.
+    """
+    hole_entry = category.split(':', 1)[1] if ':' in category else category
+    hole_entry = hole_entry.split(' - ', 1)[0].strip().upper()
+    return hole_entry if hole_entry in MAKE_QUADRANTS else None
+
+def compute_session_analytics(session_data):
+    """
+    Derives the per-session analytics stored alongside a session: make quadrant counts,
+    miss category counts, streak-bucket counts, accuracy, and the detailed make/miss
+    category counts written to session_category_counts.
+    Returns a (columns, category_counts) tuple, where category_counts is a list of
+    (kind, category, count) tuples.
+    """
+    putt_list = _load_json_field(session_data.get('putt_list'), [])
+    makes_detailed = {}
+    misses_detailed = {}
+    misses_overview = {category: 0 for category in MISS_CATEGORIES}
+    streaks = {threshold: 0 for threshold in STREAK_THRESHOLDS}
+
+    if putt_list:
+        current_streak = 0
+        for putt in putt_list:
+            classification, detailed = _putt_fields(putt)
+            if classification == 'MAKE':
+                current_streak += 1
+                category = detailed.replace('MAKE - ', '').strip()
+                makes_detailed[category] = makes_detailed.get(category, 0) + 1
+            elif classification == 'MISS':
+                for threshold in STREAK_THRESHOLDS:
+                    if current_streak >= threshold:
+                        streaks[threshold] += 1
+                current_streak = 0
+                detail = (detailed or 'UNKNOWN').replace('MISS - ', '')
+                misses_detailed[detail] = misses_detailed.get(detail, 0) + 1
+                for category in MISS_CATEGORIES:
+                    if category in detail.upper():
+                        misses_overview[category] += 1
+                        break
+        for threshold in STREAK_THRESHOLDS:
+            if current_streak >= threshold:
+                streaks[threshold] += 1
+    else:
+        # Sessions without a putt list still carry the reporter's category summaries.
+        makes_detailed = dict(_load_json_field(session_data.get('makes_by_category'), {}))
+        for category, count in _load_json_field(session_data.get('misses_by_category'), {}).items():
+            if category.upper() in misses_overview:
+                misses_overview[category.upper()] = count or 0
+
+    makes_overview = {quadrant: 0 for quadrant in MAKE_QUADRANTS}
+    for category, count in makes_detailed.items():
+        quadrant = _make_quadrant(category)
+        if quadrant:
+            makes_overview[quadrant] += count
+
+    total_makes = safe_value(session_data.get('total_makes'))
+    total_misses = safe_value(session_data.get('total_misses'))
+
+    columns = {f"makes_{quadrant.lower()}": count for quadrant, count in makes_overview.items()}
+    columns.update({f"misses_{category.lower()}": count for category, count in misses_overview.items()})
+    columns.update({f"streaks_{threshold}": count for threshold, count in streaks.items()})
+    columns["accuracy"] = safe_divide(total_makes, total_makes + total_misses) * 100
+
+    category_counts = [('MAKE', category, count) for category, count in makes_detailed.items() if count]
+    category_counts += [('MISS', detail, count) for detail, count in misses_detailed.items() if count]
+    return columns, category_counts
+
+def _store_session_analytics(conn, session_id, player_id, columns, category_counts):
+    """Writes pre-computed analytics for a session. Expects to run inside a transaction."""
+    set_clause = ", ".join(f"{column} = :{column}" for column in columns)
+    conn.execute(
+        sqlalchemy.text(f"UPDATE sessions SET {set_clause} WHERE session_id = :session_id"),
+        {**columns, "session_id": session_id}
+    )
+    conn.execute(
+        sqlalchemy.text("DELETE FROM session_category_counts WHERE session_id = :session_id"),
+        {"session_id": session_id}
+    )
+    _insert_session_category_counts(conn, session_id, player_id, category_counts)
+
+def _insert_session_category_counts(conn, session_id, player_id, category_counts):
+    """Bulk-inserts the detailed make/miss counts for a session."""
+    if not category_counts:
+        return
+    conn.execute(
+        sqlalchemy.text("""
+            INSERT INTO session_category_counts (session_id, player_id, kind, category, count)
+            VALUES (:session_id, :player_id, :kind, :category, :count)
+        """),
+        [
+            {"session_id": session_id, "player_id": player_id, "kind": kind, "category": category, "count": count}
+            for kind, category, count in category_counts
+        ]
+    )
+
+def _backfill_session_analytics_batch(conn, batch_size):
+    rows = conn.execute(
+        sqlalchemy.text("""
+            SELECT session_id, player_id, total_makes, total_misses,
+                   putt_list, makes_by_category, misses_by_category
+            FROM sessions
+            WHERE makes_top IS NULL
+            LIMIT :batch_size
+        """),
+        {"batch_size": batch_size}
+    ).mappings().fetchall()
+    for row in rows:
+        columns, category_counts = compute_session_analytics(row)
+        _store_session_analytics(conn, row['session_id'], row['player_id'], columns, category_counts)
+    return len(rows)
+
+def backfill_session_analytics(batch_size=200, conn=None):
+    """
+    Computes analytics columns for sessions saved before they existed and returns the number processed.
+    Works in batches with one transaction per batch, or entirely within the caller's transaction when `conn` is given.
+    """
+    processed = 0
+    while True:
+        if conn is not None:
+            batch_count = _backfill_session_analytics_batch(conn, batch_size)
+        else:
+            with get_db_connection().connect() as batch_conn:
+                with batch_conn.begin():
+                    batch_count = _backfill_session_analytics_batch(batch_conn, batch_size)
+        processed += batch_count
+        if batch_count < batch_size:
+            break
+    if processed:
+        logger.info(f"Backfilled analytics for {processed} sessions.")
+    return processed
+
+PUTT_COLUMNS = ["session_id", "putt_index", "player_id", "putt_time", "classification", "detail", "entry_roi", "exit_roi"]
+
+def _encode_putt_rows(session_id, player_id, putt_list):
+    """Encodes a session's putt list into rows for the putts table."""
+    return [
+        {**putt_codes.encode_putt(putt, index), "session_id": session_id, "player_id": player_id}
+        for index, putt in enumerate(putt_list, start=1)
+    ]
+
+def _bulk_insert_putts(conn, putt_rows):
+    """
+    Inserts encoded putts in one round trip: COPY on PostgreSQL, executemany elsewhere.
+    Expects to run inside a transaction.
+    """
+    if not putt_rows:
+        return
+    if conn.dialect.name == "postgresql":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in putt_rows:
+            writer.writerow(["" if row[column] is None else row[column] for column in PUTT_COLUMNS])
+        buffer.seek(0)
+        with conn.connection.cursor() as cursor:
+            cursor.copy_expert(f"COPY putts ({', '.join(PUTT_COLUMNS)}) FROM STDIN WITH (FORMAT csv)", buffer)
+    else:
+        conn.execute(
+            sqlalchemy.text(f"INSERT INTO putts ({', '.join(PUTT_COLUMNS)}) VALUES ({', '.join(':' + column for column in PUTT_COLUMNS)})"),
+            putt_rows
+        )
+
+def _backfill_putts_batch(conn, last_session_id, batch_size):
+    rows = conn.execute(
+        sqlalchemy.text("""
+            SELECT s.session_id, s.player_id, s.putt_list
+            FROM sessions s
+            WHERE s.session_id > :last_session_id
+              AND s.putt_list IS NOT NULL
+              AND NOT EXISTS (SELECT 1 FROM putts p WHERE p.session_id = s.session_id)
+            ORDER BY s.session_id
+            LIMIT :batch_size
+        """),
+        {"last_session_id": last_session_id, "batch_size": batch_size}
+    ).mappings().fetchall()
+    putt_rows = []
+    for row in rows:
+        putt_rows.extend(_encode_putt_rows(row['session_id'], row['player_id'], _load_json_field(row['putt_list'], [])))
+    _bulk_insert_putts(conn, putt_rows)
+    return [row['session_id'] for row in rows]
+
+def backfill_putts(batch_size=100, conn=None):
+    """
+    Populates the putts table from the putt_list of sessions saved before it existed.
+    Walks the sessions in session_id order, one transaction per batch (or within the caller's
+    transaction when `conn` is given), and returns the number of sessions processed.
+    """
+    processed = 0
+    last_session_id = 0
+    while True:
+        if conn is not None:
+            session_ids = _backfill_putts_batch(conn, last_session_id, batch_size)
+        else:
+            with get_db_connection().connect() as batch_conn:
+                with batch_conn.begin():
+                    session_ids = _backfill_putts_batch(batch_conn, last_session_id, batch_size)
+        processed += len(session_ids)
+        if len(session_ids) < batch_size:
+            break
+        last_session_id = session_ids[-1]
+    if processed:
+        logger.info(f"Backfilled putts for {processed} sessions.")
+    return processed
+
+def _pack_putt_list_field(value):
+    """Returns the packed putt_data for a putt_list value, or None if it is missing or not a list."""
+    putt_list = _load_json_field(value, None)
+    return putt_codes.pack_putt_list(putt_list) if isinstance(putt_list, list) else None
+
+def _backfill_putt_data_batch(conn, last_session_id, batch_size):
+    rows = conn.execute(
+        sqlalchemy.text("""
+            SELECT session_id, putt_list
+            FROM sessions
+            WHERE session_id > :last_session_id
+              AND putt_list IS NOT NULL
+              AND putt_data IS NULL
+            ORDER BY session_id
+            LIMIT :batch_size
+        """),
+        {"last_session_id": last_session_id, "batch_size": batch_size}
+    ).mappings().fetchall()
+    packed = []
+    for row in rows:
+        putt_data = _pack_putt_list_field(row['putt_list'])
+        if putt_data is not None:
+            packed.append({"session_id": row['session_id'], "putt_data": putt_data})
+    if packed:
+        conn.execute(
+            sqlalchemy.text("UPDATE sessions SET putt_data = :putt_data WHERE session_id = :session_id"),
+            packed
+        )
+    return [row['session_id'] for row in rows], len(packed)
+
+def backfill_putt_data(batch_size=200):
+    """
+    Packs sessions' JSON putt_list into putt_data, keeping putt_list (see clear_packed_putt_lists).
+    Rows whose putt_list is not a JSON array are left as they are. Walks the sessions in session_id
+    order, committing each batch, and returns the number of sessions packed.
+    Run with `python manage.py backfill-putt-data`.
+    """
+    packed = 0
+    last_session_id = 0
+    while True:
+        with get_db_connection().connect() as conn:
+            with conn.begin():
+                session_ids, batch_packed = _backfill_putt_data_batch(conn, last_session_id, batch_size)
+        packed += batch_packed
+        if len(session_ids) < batch_size:
+            break
+        last_session_id = session_ids[-1]
+    if packed:
+        logger.info(f"Packed putt lists for {packed} sessions.")
+    return packed
+
+def _clear_packed_putt_lists_batch(conn, last_session_id, batch_size):
+    rows = conn.execute(
+        sqlalchemy.text("""
+            SELECT session_id, putt_list, putt_data
+            FROM sessions
+            WHERE session_id > :last_session_id
+              AND putt_list IS NOT NULL
+              AND putt_data IS NOT NULL
+            ORDER BY session_id
+            LIMIT :batch_size
+        """),
+        {"last_session_id": last_session_id, "batch_size": batch_size}
+    ).mappings().fetchall()
+    verified = [
+        {"session_id": row['session_id']} for row in rows
+        if putt_codes.matches_packed(_load_json_field(row['putt_list'], None), row['putt_data'])
+    ]
+    if verified:
+        conn.execute(
+            sqlalchemy.text("UPDATE sessions SET putt_list = NULL WHERE session_id = :session_id"),
+            verified
+        )
+    return [row['session_id'] for row in rows], len(verified)
+
+def clear_packed_putt_lists(batch_size=200):
+    """
+    Clears the JSON putt_list of sessions whose putt_data holds the same putts, once backfill_putt_data
+    has run. Lists with fields the packed format does not keep, or that do not match, are left in place.
+    Commits each batch and returns (sessions cleared, sessions kept).
+    Run with `python manage.py clear-putt-lists`.
+    """
+    cleared = kept = 0
+    last_session_id = 0
+    while True:
+        with get_db_connection().connect() as conn:
+            with conn.begin():
+                session_ids, batch_cleared = _clear_packed_putt_lists_batch(conn, last_session_id, batch_size)
+        cleared += batch_cleared
+        kept += len(session_ids) - batch_cleared
+        if len(session_ids) < batch_size:
+            break
+        last_session_id = session_ids[-1]
+    if cleared or kept:
+        logger.info(f"Cleared packed putt lists for {cleared} sessions, kept {kept} that did not verify.")
+    return cleared, kept
+
+@read_only(player_arg="player_id")
+def get_putt_analytics(player_id, conn=None):
+    """
+    Putt-level analytics computed in the database from the putts table:
+    miss reasons broken down by ramp entry, and the hole quadrant distribution of makes per session.
+    """
+    with _connect(conn) as conn:
+        miss_rows = conn.execute(
+            sqlalchemy.text("""
+                SELECT entry_roi, detail, COUNT(*) AS count
+                FROM putts
+                WHERE player_id = :player_id AND classification = :miss
+                GROUP BY entry_roi, detail
+            """),
+            {"player_id": player_id, "miss": putt_codes.CLASSIFICATION_CODES["MISS"]}
+        ).mappings().fetchall()
+
+        quadrant_rows = conn.execute(
+            sqlalchemy.text("""
+                SELECT p.session_id, s.start_time, p.exit_roi, COUNT(*) AS count
+                FROM putts p
+                JOIN sessions s ON p.session_id = s.session_id
+                WHERE p.player_id = :player_id AND p.classification = :make
+                GROUP BY p.session_id, s.start_time, p.exit_roi
+                ORDER BY s.start_time, p.session_id
+            """),
+            {"player_id": player_id, "make": putt_codes.CLASSIFICATION_CODES["MAKE"]}
+        ).mappings().fetchall()
+
+    misses_by_entry = {}
+    for row in miss_rows:
+        entry = putt_codes.ROI_NAMES.get(row['entry_roi'], 'UNKNOWN')
+        misses_by_entry.setdefault(entry, {})[putt_codes.DETAIL_NAMES.get(row['detail'], 'UNKNOWN')] = row['count']
+
+    make_quadrants_by_session = []
+    for row in quadrant_rows:
+        if not make_quadrants_by_session or make_quadrants_by_session[-1]['session_id'] != row['session_id']:
+            start_time = row['start_time']
+            make_quadrants_by_session.append({
+                "session_id": row['session_id'],
+                "start_time": start_time.isoformat() if isinstance(start_time, datetime) else start_time,
+                "quadrants": {}
+            })
+        quadrant = putt_codes.ROI_NAMES.get(row['exit_roi'], 'UNKNOWN').replace('HOLE_', '')
+        make_quadrants_by_session[-1]['quadrants'][quadrant] = row['count']
+
+    return {
+        "misses_by_entry": misses_by_entry,
+        "make_quadrants_by_session": make_quadrants_by_session
+    }
+
+@read_only(player_arg="player_id")
+def get_player_stats(player_id, conn=None):
     """
     Aggregates and calculates comprehensive career statistics for a player.
-    This function replaces the previous simpler version with improved error handling.
+    Every number comes from SQL aggregates over the pre-computed session analytics,
+    so the cost does not grow with the size of each session's putt list.
     """
-    pool = get_db_connection()
-    with pool.connect() as conn:
-        player_info = get_player_info(player_id)
+    with _connect(conn) as conn:
+        player_info = get_player_info(player_id, conn)
         if not player_info:
             return None
 
@@ -639,56 +816,80 @@ def get_player_stats(player_id):
         ).mappings().first()
         base_stats = dict(base_stats_result) if base_stats_result else {}
 
-        sessions = get_sessions_for_player(player_id)
-        
+        aggregate_columns = [
+            "MAX(total_makes) AS high_makes",
+            "MAX(putts_per_minute) AS high_ppm",
+            "MAX(makes_per_minute) AS high_mpm",
+            "MAX(most_makes_in_60_seconds) AS high_most_in_60",
+            "MAX(session_duration) AS high_duration",
+            "SUM(session_duration) AS sum_duration",
+            "MAX(accuracy) AS high_accuracy",
+        ]
+        for column in SESSION_ANALYTICS_COLUMNS:
+            if column != "accuracy":
+                aggregate_columns += [f"MAX({column}) AS high_{column}", f"SUM({column}) AS sum_{column}", f"MIN({column}) AS low_{column}"]
+        totals = conn.execute(
+            sqlalchemy.text(f"SELECT {', '.join(aggregate_columns)} FROM sessions WHERE player_id = :id"),
+            {"id": player_id}
+        ).mappings().first() or {}
+
+        category_rows = conn.execute(
+            sqlalchemy.text("""
+                SELECT kind, category, SUM(count) AS sum, MAX(count) AS high, MIN(count) AS low
+                FROM session_category_counts
+                WHERE player_id = :id
+                GROUP BY kind, category
+            """),
+            {"id": player_id}
+        ).mappings().fetchall()
+
         career_stats = {
             "player_id": player_id,
             "player_name": player_info.get('name', 'Unknown Player'),
             "is_subscribed": player_info.get('subscription_status') == 'active',
-            "high_makes": 0,
+            "high_makes": safe_value(totals.get('high_makes')),
             "sum_makes": base_stats.get('total_makes', 0),
             "high_best_streak": base_stats.get('best_streak', 0),
             "low_fastest_21": base_stats.get('fastest_21_makes', 0),  # Default to 0 instead of None
-            "high_ppm": 0.0,
+            "high_ppm": safe_value(totals.get('high_ppm'), 0.0),
             "avg_ppm": 0.0,
-            "high_mpm": 0.0,
+            "high_mpm": safe_value(totals.get('high_mpm'), 0.0),
             "avg_mpm": 0.0,
-            "high_most_in_60": 0,
-            "high_duration": 0.0,
-            "sum_duration": 0.0,
-            "high_accuracy": 0.0,
+            "high_most_in_60": safe_value(totals.get('high_most_in_60')),
+            "high_duration": safe_value(totals.get('high_duration'), 0.0),
+            "sum_duration": safe_value(totals.get('sum_duration'), 0.0),
+            "high_accuracy": safe_value(totals.get('high_accuracy'), 0.0),
             "avg_accuracy": 0.0,
-            "consecutive": {str(c): {"high": 0, "sum": 0} for c in [3, 7, 10, 15, 21, 50, 100]},
-            "makes_overview": {cat: {"high": 0, "sum": 0} for cat in ["TOP", "RIGHT", "LOW", "LEFT"]},
+            "consecutive": {
+                str(threshold): {
+                    "high": safe_value(totals.get(f'high_streaks_{threshold}')),
+                    "sum": safe_value(totals.get(f'sum_streaks_{threshold}')),
+                } for threshold in STREAK_THRESHOLDS
+            },
+            "makes_overview": {
+                quadrant: {
+                    "high": safe_value(totals.get(f'high_makes_{quadrant.lower()}')),
+                    "sum": safe_value(totals.get(f'sum_makes_{quadrant.lower()}')),
+                } for quadrant in MAKE_QUADRANTS
+            },
             "makes_detailed": {},
-            "misses_overview": {cat: {"low": 0, "high": 0, "sum": 0} for cat in ["RETURN", "CATCH", "TIMEOUT"]},  # Initialize low to 0 instead of inf
+            "misses_overview": {
+                category: {
+                    "low": safe_value(totals.get(f'low_misses_{category.lower()}')),
+                    "high": safe_value(totals.get(f'high_misses_{category.lower()}')),
+                    "sum": safe_value(totals.get(f'sum_misses_{category.lower()}')),
+                } for category in MISS_CATEGORIES
+            },
             "misses_detailed": {},
         }
 
-        total_duration_seconds = 0
-        for session in sessions:
-            s_makes = session.get('total_makes', 0) or 0
-            s_misses = session.get('total_misses', 0) or 0
-            duration = session.get('session_duration', 0) or 0
-
-            career_stats["high_makes"] = max(career_stats["high_makes"], s_makes)
-            career_stats["high_ppm"] = max(career_stats["high_ppm"], session.get('putts_per_minute', 0) or 0)
-            career_stats["high_mpm"] = max(career_stats["high_mpm"], session.get('makes_per_minute', 0) or 0)
-            career_stats["high_most_in_60"] = max(career_stats["high_most_in_60"], session.get('most_makes_in_60_seconds', 0) or 0)
-            career_stats["high_duration"] = max(career_stats["high_duration"], duration)
-            total_duration_seconds += duration
-
-            if (s_makes + s_misses) > 0:
-                s_accuracy = (s_makes / (s_makes + s_misses)) * 100
-                career_stats["high_accuracy"] = max(career_stats["high_accuracy"], s_accuracy)
-
-            if session.get('putt_list'):
-                try:
-                    putt_list = json.loads(session['putt_list'])
-                    _aggregate_session_misses(putt_list, career_stats)
-                except (json.JSONDecodeError, TypeError): pass
+        for row in category_rows:
+            if row['kind'] == 'MAKE':
+                career_stats["makes_detailed"][row['category']] = {"high": row['high'], "sum": row['sum']}
+            else:
+                career_stats["misses_detailed"][row['category']] = {"low": row['low'], "high": row['high'], "sum": row['sum']}
 
-        career_stats["sum_duration"] = safe_value(total_duration_seconds)
+        total_duration_seconds = career_stats["sum_duration"]
         total_putts = safe_value(base_stats.get('total_putts', 0))
         total_makes = safe_value(base_stats.get('total_makes', 0))
         
@@ -702,125 +903,124 @@ def get_player_stats(player_id):
         fastest_21 = base_stats.get('fastest_21_makes')
         career_stats["low_fastest_21"] = safe_value(fastest_21, 0)
 
-        # Final cleanup for JSON compatibility
-        for detail in career_stats.get("misses_detailed", {}).values():
-            if detail["low"] == float('inf'):
-                detail["low"] = 0  # Use 0 instead of None for new players
-        for category in career_stats.get("misses_overview", {}).values():
-            if category["low"] == float('inf'):
-                category["low"] = 0  # Use 0 instead of None for new players
-
         return career_stats
 
-def recalculate_player_stats(player_id):
+def _recalculate_player_stats(conn, player_id):
+    """Recomputes the player_stats row with a single aggregate query. Expects to run inside a transaction."""
+    totals = conn.execute(
+        sqlalchemy.text("""
+            SELECT COALESCE(SUM(total_makes), 0) AS total_makes,
+                   COALESCE(SUM(total_misses), 0) AS total_misses,
+                   COALESCE(SUM(total_putts), 0) AS total_putts,
+                   COALESCE(MAX(best_streak), 0) AS best_streak,
+                   COALESCE(MIN(CASE WHEN fastest_21_makes > 0 THEN fastest_21_makes END), 0) AS fastest_21,
+                   COALESCE(SUM(session_duration), 0) AS total_duration,
+                   COUNT(*) AS total_sessions
+            FROM sessions
+            WHERE player_id = :player_id
+        """),
+        {"player_id": player_id}
+    ).mappings().first()
+
+    stats = {key: safe_value(totals[key]) for key in totals.keys()}
+    conn.execute(
+        sqlalchemy.text("""
+            UPDATE player_stats 
+            SET total_makes = :total_makes, 
+                total_misses = :total_misses, 
+                total_putts = :total_putts,
+                best_streak = :best_streak, 
+                fastest_21_makes = :fastest_21, 
+                total_duration = :total_duration,
+                total_sessions = :total_sessions,
+                last_updated = :current_time
+            WHERE player_id = :player_id
+        """),
+        {**stats, "player_id": player_id, "current_time": datetime.utcnow()}
+    )
+    logger.info(f"Recalculated stats for player {player_id}: {stats['total_makes']} makes, {stats['total_putts']} putts, fastest_21: {stats['fastest_21']}")
+
+    return {
+        "total_makes": stats['total_makes'],
+        "total_putts": stats['total_putts'],
+        "fastest_21": stats['fastest_21'],
+        "total_duration": stats['total_duration'],
+        "total_sessions": stats['total_sessions']
+    }
+
+def recalculate_player_stats(player_id, conn=None):
     """
     Recalculates and updates player stats in the database, handling N/A and division by zero issues.
-    This should be called to clean up any existing problematic data.
+    Pass `conn` to run inside the caller's transaction (as save_session does).
     """
-    pool = get_db_connection()
-    with pool.connect() as conn:
-        # Get all sessions for the player
-        sessions_result = conn.execute(
-            sqlalchemy.text("""
-                SELECT total_putts, total_makes, total_misses, best_streak, 
-                       fastest_21_makes, session_duration, putt_list
-                FROM sessions 
-                WHERE player_id = :player_id 
-                ORDER BY start_time
-            """),
-            {"player_id": player_id}
-        ).mappings().fetchall()
-        
-        if not sessions_result:
-            # No sessions - set all to zero
-            conn.execute(
-                sqlalchemy.text("""
-                    UPDATE player_stats 
-                    SET total_makes = 0, total_misses = 0, total_putts = 0,
-                        best_streak = 0, fastest_21_makes = 0, total_duration = 0.0,
-                        last_updated = :current_time
-                    WHERE player_id = :player_id
-                """),
-                {"player_id": player_id, "current_time": datetime.utcnow()}
-            )
-            conn.commit()
-            return
-            
-        # Calculate aggregated stats
-        total_makes = 0
-        total_misses = 0  
-        total_putts = 0
-        best_streak = 0
-        total_duration = 0.0
-        make_timestamps = []  # For fastest 21 calculation
-        
-        for session in sessions_result:
-            total_makes += safe_value(session.get('total_makes', 0))
-            total_misses += safe_value(session.get('total_misses', 0))
-            total_putts += safe_value(session.get('total_putts', 0))
-            best_streak = max(best_streak, safe_value(session.get('best_streak', 0)))
-            total_duration += safe_value(session.get('session_duration', 0))
-            
-            # Extract make timestamps for fastest 21 calculation
-            if session.get('putt_list'):
-                try:
-                    putt_list = json.loads(session['putt_list'])
-                    for putt in putt_list:
-                        if putt.get('Putt Classification') == 'MAKE':
-                            timestamp = safe_value(putt.get('current_frame_time', 0))
-                            if timestamp > 0:
-                                make_timestamps.append(timestamp)
-                except (json.JSONDecodeError, TypeError, KeyError):
-                    continue
-        
-        # Calculate fastest 21 makes
-        fastest_21 = 0
-        if len(make_timestamps) >= 21:
-            make_timestamps.sort()
-            fastest_21_times = []
-            for i in range(len(make_timestamps) - 20):
-                time_span = make_timestamps[i + 20] - make_timestamps[i]
-                if time_span > 0:
-                    fastest_21_times.append(time_span)
-            fastest_21 = min(fastest_21_times) if fastest_21_times else 0
-        
-        # Update player stats with safe values
-        conn.execute(
-            sqlalchemy.text("""
-                UPDATE player_stats 
-                SET total_makes = :total_makes, 
-                    total_misses = :total_misses, 
-                    total_putts = :total_putts,
-                    best_streak = :best_streak, 
-                    fastest_21_makes = :fastest_21, 
-                    total_duration = :total_duration,
-                    last_updated = :current_time
-                WHERE player_id = :player_id
-            """),
-            {
-                "player_id": player_id,
-                "total_makes": total_makes,
-                "total_misses": total_misses, 
-                "total_putts": total_putts,
-                "best_streak": best_streak,
-                "fastest_21": fastest_21,
-                "total_duration": total_duration,
-                "current_time": datetime.utcnow()
-            }
-        )
-        conn.commit()
-        logger.info(f"Recalculated stats for player {player_id}: {total_makes} makes, {total_putts} putts, fastest_21: {fastest_21}")
-        
-        return {
-            "total_makes": total_makes,
-            "total_putts": total_putts, 
-            "fastest_21": fastest_21,
-            "total_duration": total_duration
-        }
+    with _connect(conn) as conn:
+        with _begin(conn):
+            return _recalculate_player_stats(conn, player_id)
+
+def encode_cursor(sort_value, row_id):
+    """Packs the last row's (sort value, id) into an opaque, URL-safe page cursor."""
+    if isinstance(sort_value, datetime):
+        sort_value = sort_value.isoformat()
+    payload = json.dumps([sort_value, row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+def _decode_cursor(conn, cursor):
+    """Unpacks a page cursor into bind parameters. Raises ValueError for malformed cursors."""
+    try:
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        row_id = int(row_id)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+    # SQLite compares the stored text as-is; PostgreSQL needs a real timestamp.
+    if sort_value is not None and conn.dialect.name == "postgresql":
+        sort_value = datetime.fromisoformat(sort_value)
+    return {"cursor_value": sort_value, "cursor_id": row_id}
+
+# Columns a session list may return, in response order. The heavy ones hold the per-putt and
+# per-category detail and are only read when a caller asks for them.
+SESSION_FIELDS = (
+    'session_id', 'start_time', 'end_time', 'status', 'total_putts', 'total_makes', 'total_misses',
+    'best_streak', 'fastest_21_makes', 'putts_per_minute', 'makes_per_minute', 'most_makes_in_60_seconds',
+    'session_duration', 'putt_list', 'makes_by_category', 'misses_by_category'
+)
+HEAVY_SESSION_FIELDS = ('putt_list', 'makes_by_category', 'misses_by_category')
+SUMMARY_SESSION_FIELDS = tuple(field for field in SESSION_FIELDS if field not in HEAVY_SESSION_FIELDS)
+
+def parse_session_fields(value):
+    """
+    Parses a comma-separated `fields` value into a tuple of session columns. Returns None (all
+    fields) for an empty value; raises ValueError naming any unknown field.
+    """
+    requested = [field.strip() for field in (value or '').split(',') if field.strip()]
+    if not requested:
+        return None
+    unknown = [field for field in requested if field not in SESSION_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown session fields: {', '.join(unknown)}")
+    return tuple(dict.fromkeys(requested))
+
+@read_only(player_arg="player_id")
+def get_sessions_page(player_id, limit=25, cursor=None, offset=0, fields=None, conn=None):
+    """
+    Returns one page of a player's sessions, newest first, as {"sessions", "next_cursor"}.
+    Pages after the first are found by seeking past the (start_time, session_id) in `cursor`,
+    so deep pages cost the same as the first. `offset` is only honoured without a cursor,
+    for clients still paging by number. `next_cursor` is None on the last page.
+    `fields` limits the columns selected and returned (default: all of SESSION_FIELDS).
+    """
+    fields = tuple(fields) if fields else SESSION_FIELDS
+    # session_id and start_time are always read: they order the page and make up the cursor
+    columns = [field for field in SESSION_FIELDS if field in fields or field in ('session_id', 'start_time')]
+    if 'putt_list' in fields:
+        columns.append('putt_data')
+    with _connect(conn) as conn:
+        params = {"player_id": player_id, "limit": limit + 1, "offset": offset}
+        seek = ""
+        if cursor:
+            params.update(_decode_cursor(conn, cursor))
+            params["offset"] = 0
+            seek = "AND (start_time, session_id) < (:cursor_value, :cursor_id)"
 
-def get_sessions_for_player(player_id, limit=25, offset=0):
-    pool = get_db_connection()
-    with pool.connect() as conn:
         player_info = conn.execute(
             sqlalchemy.text("SELECT subscription_status FROM players WHERE player_id = :player_id"),
             {"player_id": player_id}
@@ -829,100 +1029,120 @@ def get_sessions_for_player(player_id, limit=25, offset=0):
         is_subscribed = player_info and player_info['subscription_status'] == 'active'
 
         result = conn.execute(
-            sqlalchemy.text("""SELECT session_id, start_time, end_time, status, total_putts, total_makes, 
-                                 total_misses, best_streak, fastest_21_makes, putts_per_minute, 
-                                 makes_per_minute, most_makes_in_60_seconds, session_duration, 
-                                 putt_list, makes_by_category, misses_by_category 
+            sqlalchemy.text(f"""SELECT {', '.join(columns)}
                           FROM sessions 
-                          WHERE player_id = :player_id 
-                          ORDER BY start_time DESC 
+                          WHERE player_id = :player_id {seek}
+                          ORDER BY start_time DESC, session_id DESC 
                           LIMIT :limit OFFSET :offset"""),
-            {"player_id": player_id, "limit": limit, "offset": offset}
+            params
         ).mappings().fetchall()
 
+        rows = result[:limit]
+        next_cursor = encode_cursor(rows[-1]['start_time'], rows[-1]['session_id']) if len(result) > limit else None
+
         sessions_data = []
-        for i, row in enumerate(result):
-            session_dict = dict(row)
+        for i, row in enumerate(rows):
+            session_dict = {field: row[field] for field in SESSION_FIELDS if field in fields}
+            # Packed putts are decoded only if the putt list is actually read or serialized; a JSON
+            # putt_list still present (not yet verified against putt_data) is served as stored.
+            if row.get('putt_data') is not None and row.get('putt_list') is None:
+                session_dict['putt_list'] = putt_codes.LazyPuttList(row['putt_data'])
             # Convert datetime objects to ISO 8601 strings, handle None
-            if session_dict.get('start_time'):
+            if isinstance(session_dict.get('start_time'), datetime):
                 session_dict['start_time'] = session_dict['start_time'].isoformat()
-            if session_dict.get('end_time'):
+            if isinstance(session_dict.get('end_time'), datetime):
                 session_dict['end_time'] = session_dict['end_time'].isoformat()
 
-            # Apply free user limitation
-            if not is_subscribed and i > 0: # 0 is the most recent session
-                session_dict['putt_list'] = None
-                session_dict['makes_by_category'] = None
-                session_dict['misses_by_category'] = None
-                session_dict['fastest_21_makes'] = None
+            # Apply free user limitation; only the player's most recent session stays unlocked
+            if not is_subscribed and (i > 0 or cursor or offset):
+                for locked_field in HEAVY_SESSION_FIELDS + ('fastest_21_makes',):
+                    if locked_field in session_dict:
+                        session_dict[locked_field] = None
                 session_dict['is_locked'] = True # Add a flag for the frontend
 
             sessions_data.append(session_dict)
-        return sessions_data
+        return {"sessions": sessions_data, "next_cursor": next_cursor}
 
-def get_player_session_count(player_id):
-    """Get the total count of sessions for a player."""
-    pool = get_db_connection()
-    with pool.connect() as conn:
-        result = conn.execute(
-            sqlalchemy.text("SELECT COUNT(*) as total FROM sessions WHERE player_id = :player_id"),
+def get_sessions_for_player(player_id, limit=25, offset=0, cursor=None, fields=None, conn=None):
+    return get_sessions_page(player_id, limit=limit, cursor=cursor, offset=offset, fields=fields, conn=conn)["sessions"]
+
+def get_player_session_count(player_id, conn=None):
+    """Get the total count of sessions for a player, as maintained in player_stats by save_session."""
+    with _connect(conn) as conn:
+        total = conn.execute(
+            sqlalchemy.text("SELECT total_sessions FROM player_stats WHERE player_id = :player_id"),
             {"player_id": player_id}
-        ).fetchone()
-        return result[0] if result else 0
+        ).scalar_one_or_none()
+        if total is None:
+            # Players created before player_stats rows existed
+            total = conn.execute(
+                sqlalchemy.text("SELECT COUNT(*) as total FROM sessions WHERE player_id = :player_id"),
+                {"player_id": player_id}
+            ).scalar_one()
+        return total
 
-def get_leagues_for_player(player_id):
+@read_only(player_arg="player_id")
+def get_leagues_for_player(player_id, conn=None):
+    """
+    Returns the player's leagues (with rounds, submission flags and member counts), the public
+    leagues they could join, and pending invites. Uses three queries however many leagues there are.
+    """
     logger.info(f"Fetching leagues for player_id: {player_id}")
-    pool = get_db_connection()
-    with pool.connect() as conn:
-        # Fetch leagues where the player is a member
+    with _connect(conn) as conn:
+        # Fetch leagues where the player is a member, with their member counts
         my_leagues_result = conn.execute(
             sqlalchemy.text("""
-                SELECT l.league_id, l.name, l.description, l.privacy_type, l.status, l.start_time
+                SELECT l.league_id, l.name, l.description, l.privacy_type, l.status, l.start_time,
+                       counts.member_count
                 FROM leagues l
                 JOIN league_members lm ON l.league_id = lm.league_id
+                JOIN (
+                    SELECT league_id, COUNT(*) AS member_count
+                    FROM league_members
+                    WHERE league_id IN (SELECT league_id FROM league_members WHERE player_id = :player_id)
+                    GROUP BY league_id
+                ) counts ON counts.league_id = l.league_id
                 WHERE lm.player_id = :player_id
                 ORDER BY l.start_time DESC
             """),
             {"player_id": player_id}
         ).mappings().fetchall()
-        
+
+        # Fetch the rounds of all those leagues at once, flagging the ones this player has submitted to
+        rounds_result = conn.execute(
+            sqlalchemy.text("""
+                SELECT r.league_id, r.round_id, r.round_number, r.status, r.start_time, r.end_time,
+                       (submitted.round_id IS NOT NULL) AS has_submitted
+                FROM league_rounds r
+                JOIN league_members lm ON lm.league_id = r.league_id AND lm.player_id = :player_id
+                LEFT JOIN (
+                    SELECT DISTINCT round_id FROM league_round_submissions WHERE player_id = :player_id
+                ) submitted ON submitted.round_id = r.round_id
+                ORDER BY r.league_id, r.round_number ASC
+            """),
+            {"player_id": player_id}
+        ).mappings().fetchall()
+
+        rounds_by_league = {}
+        for round_row in rounds_result:
+            round_dict = dict(round_row)
+            league_id = round_dict.pop('league_id')
+            if round_dict.get('start_time'):
+                round_dict['start_time'] = round_dict['start_time'].isoformat()
+            if round_dict.get('end_time'):
+                round_dict['end_time'] = round_dict['end_time'].isoformat()
+            rounds_by_league.setdefault(league_id, []).append(round_dict)
+
         my_leagues = []
         for league_row in my_leagues_result:
             league = dict(league_row)
-            
+
             # Convert start_time to ISO format
             if league.get('start_time'):
                 league['start_time'] = league['start_time'].isoformat()
 
-            # Fetch rounds for this specific league
-            rounds_result = conn.execute(
-                sqlalchemy.text("""
-                    SELECT r.round_id, r.round_number, r.status, r.start_time, r.end_time,
-                           (SELECT COUNT(*) FROM league_round_submissions lrs
-                            WHERE lrs.round_id = r.round_id AND lrs.player_id = :player_id) > 0 AS has_submitted
-                    FROM league_rounds r
-                    WHERE r.league_id = :league_id
-                    ORDER BY r.round_number ASC
-                """),
-                {"league_id": league['league_id'], "player_id": player_id}
-            ).mappings().fetchall()
-            
-            league['rounds'] = []
-            for round_row in rounds_result:
-                round_dict = dict(round_row)
-                if round_dict.get('start_time'):
-                    round_dict['start_time'] = round_dict['start_time'].isoformat()
-                if round_dict.get('end_time'):
-                    round_dict['end_time'] = round_dict['end_time'].isoformat()
-                league['rounds'].append(round_dict)
-
-            # Fetch member count
-            member_count_result = conn.execute(
-                sqlalchemy.text("SELECT COUNT(*) FROM league_members WHERE league_id = :league_id"),
-                {"league_id": league['league_id']}
-            ).scalar()
-            league['member_count'] = member_count_result or 0
-
+            league['rounds'] = rounds_by_league.get(league['league_id'], [])
+            league['member_count'] = league['member_count'] or 0
             my_leagues.append(league)
 
         logger.info(f"Found and processed {len(my_leagues)} leagues for player {player_id}.")
@@ -934,7 +1154,10 @@ def get_leagues_for_player(player_id):
                 FROM leagues l
                 LEFT JOIN league_members lm ON l.league_id = lm.league_id
                 WHERE l.privacy_type = 'public'
-                AND l.league_id NOT IN (SELECT league_id FROM league_members WHERE player_id = :player_id)
+                AND NOT EXISTS (
+                    SELECT 1 FROM league_members mine
+                    WHERE mine.league_id = l.league_id AND mine.player_id = :player_id
+                )
                 GROUP BY l.league_id, l.name, l.description, l.privacy_type, l.status
                 ORDER BY l.created_at DESC
             """),
@@ -952,9 +1175,9 @@ def get_leagues_for_player(player_id):
             "pending_invites": pending_invites
         }
 
-def get_duels_for_player(player_id):
-    pool = get_db_connection()
-    with pool.connect() as conn:
+@read_only(player_arg="player_id")
+def get_duels_for_player(player_id, conn=None):
+    with _connect(conn) as conn:
         # The main query to get all duels for a player, now joining sessions and players
         result = conn.execute(
             sqlalchemy.text("""
@@ -989,82 +1212,252 @@ def get_duels_for_player(player_id):
             
         return duels_data
 
-def search_players(search_term, current_player_id):
-    pool = get_db_connection()
-    db_type = pool.dialect.name
-    like_operator = "ILIKE" if db_type == "postgresql" else "LIKE"
+PLAYER_SEARCH_LIMIT = 10
+# Built on first search when the database has no trigram indexes (SQLite); see player_search.py.
+# Every name or email change bumps the "players" resource version. A worker whose index was built
+# at an older version rebuilds it on its next search, so changes made in other workers show up too.
+PLAYERS_RESOURCE = "players"
+_search_index = None
+_search_index_version = None
+_search_index_lock = threading.Lock()
+
+def _get_search_index(conn):
+    global _search_index, _search_index_version
+    version = get_resource_version(PLAYERS_RESOURCE, conn)
+    if _search_index is None or _search_index_version != version:
+        with _search_index_lock:
+            if _search_index is None or _search_index_version != version:
+                index = player_search.PlayerSearchIndex()
+                index.load(conn.execute(sqlalchemy.text("SELECT player_id, name, email FROM players")))
+                _search_index, _search_index_version = index, version
+                logger.info(f"Built in-process player search index with {len(index)} players at version {version}.")
+    return _search_index
+
+def _queue_search_update(conn, player_id, fields):
+    """
+    Records a player's new name/email for the in-process search indexes: bumps the players version for
+    every worker, and applies the change to this worker's index once `conn` commits.
+    """
+    if conn.dialect.name == "postgresql" or ("name" not in fields and "email" not in fields):
+        return
+    _bump_resource_version(conn, PLAYERS_RESOURCE)
+    if _search_index is not None:
+        version = get_resource_version(PLAYERS_RESOURCE, conn)
+        _after_commit(conn, lambda: _apply_search_update(player_id, fields, version))
+
+def _apply_search_update(player_id, fields, version):
+    global _search_index_version
+    with _search_index_lock:
+        if _search_index is None:
+            return
+        current = _search_index.search_document(player_id) or {}
+        _search_index.add(player_id, fields.get("name", current.get("name")), fields.get("email", current.get("email")))
+        # Only skip the rebuild when no other worker's change came in between
+        if _search_index_version == version - 1:
+            _search_index_version = version
 
-    with pool.connect() as conn:
+def _escape_like(term):
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+@read_only()
+def search_players(search_term, current_player_id, limit=PLAYER_SEARCH_LIMIT, conn=None):
+    """
+    Finds players whose name or email contains `search_term`, excluding the requester.
+    Name prefix matches rank first, then email prefix matches, then other substring matches.
+    PostgreSQL answers from trigram and prefix indexes; SQLite uses the in-process n-gram index.
+    """
+    term = search_term.strip().lower()
+    if not term:
+        return []
+
+    with _connect(conn) as conn:
+        if conn.dialect.name != "postgresql":
+            return _get_search_index(conn).search(term, exclude_player_id=current_player_id, limit=limit)
+
+        # Trigram indexes need three characters; shorter terms only match as prefixes.
+        escaped = _escape_like(term)
+        match_pattern = f"%{escaped}%" if len(term) >= player_search.GRAM_SIZE else f"{escaped}%"
         result = conn.execute(
-            sqlalchemy.text(f"""
+            sqlalchemy.text(r"""
                 SELECT player_id, name, email
-                FROM players_view
-                WHERE (name {like_operator} :term OR email {like_operator} :term)
+                FROM players
+                WHERE (LOWER(name) LIKE :pattern ESCAPE '\' OR LOWER(email) LIKE :pattern ESCAPE '\')
                 AND player_id != :current_player_id
-                LIMIT 10
+                ORDER BY
+                    CASE WHEN LOWER(name) LIKE :prefix ESCAPE '\' THEN 0
+                         WHEN LOWER(email) LIKE :prefix ESCAPE '\' THEN 1
+                         ELSE 2 END,
+                    LOWER(name)
+                LIMIT :limit
             """),
-            {"term": f"%{search_term}%", "current_player_id": current_player_id}
+            {"pattern": match_pattern, "prefix": f"{escaped}%", "current_player_id": current_player_id, "limit": limit}
         ).mappings().fetchall()
         return [dict(row) for row in result]
 
-def create_in_app_notification(player_id, notification_type, message, details=None, link_path=None):
+# Unread counts are kept on players.unread_notification_count by every notification write,
+# served from a short-lived per-process cache, and pushed to listeners (the websocket handler) on commit.
+UNREAD_COUNT_TTL_SECONDS = 10
+_unread_count_cache = {}  # player_id -> (expires_at, count)
+_unread_count_listeners = []
+
+def add_unread_count_listener(callback):
+    """Registers callback(player_id, unread_count), called after a change to a player's unread count commits."""
+    _unread_count_listeners.append(callback)
+
+def _publish_unread_count(player_id, count):
+    _unread_count_cache[player_id] = (time.monotonic() + UNREAD_COUNT_TTL_SECONDS, count)
+    for callback in _unread_count_listeners:
+        try:
+            callback(player_id, count)
+        except Exception as e:
+            logger.error(f"Unread count listener failed for player {player_id}: {e}", exc_info=True)
+
+def _adjust_unread_count(conn, player_id, delta=None, reset=False):
+    """Updates the player's unread counter in the caller's transaction and publishes it once committed."""
+    if reset:
+        conn.execute(
+            sqlalchemy.text("UPDATE players SET unread_notification_count = 0 WHERE player_id = :player_id"),
+            {"player_id": player_id}
+        )
+    elif delta:
+        conn.execute(
+            sqlalchemy.text("""
+                UPDATE players
+                SET unread_notification_count = CASE WHEN unread_notification_count + :delta < 0 THEN 0
+                                                     ELSE unread_notification_count + :delta END
+                WHERE player_id = :player_id
+            """),
+            {"player_id": player_id, "delta": delta}
+        )
+    else:
+        return
+    count = conn.execute(
+        sqlalchemy.text("SELECT unread_notification_count FROM players WHERE player_id = :player_id"),
+        {"player_id": player_id}
+    ).scalar() or 0
+    _after_commit(conn, lambda: _publish_unread_count(player_id, count))
+
+def create_in_app_notification(player_id, notification_type, message, details=None, link_path=None, conn=None):
     """Creates a new in-app notification for a player."""
-    pool = get_db_connection()
-    with pool.connect() as conn:
-        with conn.begin():
+    with _connect(conn) as conn:
+        with _begin(conn):
             conn.execute(
                 sqlalchemy.text("""
-                    INSERT INTO notifications (player_id, type, message, details, link_path)
-                    VALUES (:player_id, :type, :message, :details, :link_path)
+                    INSERT INTO notifications (player_id, type, message, details, link_path, read_status, created_at)
+                    VALUES (:player_id, :type, :message, :details, :link_path, FALSE, :current_time)
                 """),
                 {
                     "player_id": player_id,
                     "type": notification_type,
                     "message": message,
                     "details": json.dumps(details) if details else None,
-                    "link_path": link_path
+                    "link_path": link_path,
+                    "current_time": datetime.utcnow()
                 }
             )
+            _adjust_unread_count(conn, player_id, delta=1)
     logger.info(f"Created in-app notification for player {player_id} of type {notification_type}.")
 
-def get_unread_notification_count(player_id):
-    pool = get_db_connection()
-    with pool.connect() as conn:
+def mark_notification_read(notification_id, player_id, conn=None):
+    """Marks one of the player's notifications as read. Returns False if it was not found or already read."""
+    with _connect(conn) as conn:
+        with _begin(conn):
+            result = conn.execute(
+                sqlalchemy.text("""
+                    UPDATE notifications SET read_status = TRUE
+                    WHERE id = :notification_id AND player_id = :player_id AND read_status = FALSE
+                """),
+                {"notification_id": notification_id, "player_id": player_id}
+            )
+            if result.rowcount == 0:
+                return False
+            _adjust_unread_count(conn, player_id, delta=-1)
+    return True
+
+def mark_all_notifications_read(player_id, conn=None):
+    """Marks all of the player's notifications as read and returns how many changed."""
+    with _connect(conn) as conn:
+        with _begin(conn):
+            result = conn.execute(
+                sqlalchemy.text("UPDATE notifications SET read_status = TRUE WHERE player_id = :player_id AND read_status = FALSE"),
+                {"player_id": player_id}
+            )
+            _adjust_unread_count(conn, player_id, reset=True)
+    return result.rowcount
+
+def delete_notification(notification_id, player_id, conn=None):
+    """Deletes one of the player's notifications. Returns False if it was not found."""
+    with _connect(conn) as conn:
+        with _begin(conn):
+            notification = conn.execute(
+                sqlalchemy.text("SELECT read_status FROM notifications WHERE id = :notification_id AND player_id = :player_id"),
+                {"notification_id": notification_id, "player_id": player_id}
+            ).mappings().first()
+            if not notification:
+                return False
+            conn.execute(
+                sqlalchemy.text("DELETE FROM notifications WHERE id = :notification_id"),
+                {"notification_id": notification_id}
+            )
+            if not notification['read_status']:
+                _adjust_unread_count(conn, player_id, delta=-1)
+    return True
+
+def get_unread_notification_count(player_id, conn=None):
+    """Returns the player's unread notification count from the maintained counter, cached briefly."""
+    cached = _unread_count_cache.get(player_id)
+    if cached and cached[0] > time.monotonic():
+        return cached[1]
+
+    with _connect(conn) as conn:
         count = conn.execute(
-            sqlalchemy.text(""" 
-                SELECT COUNT(*) FROM notifications
-                WHERE player_id = :player_id AND read_status = FALSE
-            """),
+            sqlalchemy.text("SELECT unread_notification_count FROM players WHERE player_id = :player_id"),
             {"player_id": player_id}
-        ).scalar_one_or_none()
-        return count or 0
+        ).scalar_one_or_none() or 0
+    _unread_count_cache[player_id] = (time.monotonic() + UNREAD_COUNT_TTL_SECONDS, count)
+    return count
+
+def get_notifications_page(player_id, limit=20, cursor=None, offset=0, conn=None):
+    """
+    Returns one page of a player's notifications, most recent first, as {"notifications", "next_cursor"}.
+    Pages seek past the (created_at, id) in `cursor`; `offset` is only honoured without a cursor.
+    """
+    with _connect(conn) as conn:
+        params = {"player_id": player_id, "limit": limit + 1, "offset": offset}
+        seek = ""
+        if cursor:
+            params.update(_decode_cursor(conn, cursor))
+            params["offset"] = 0
+            seek = "AND (created_at, id) < (:cursor_value, :cursor_id)"
 
-def get_notifications_for_player(player_id, limit=20, offset=0):
-    """Retrieves notifications for a specific player, sorted by most recent."""
-    pool = get_db_connection()
-    with pool.connect() as conn:
         result = conn.execute(
-            sqlalchemy.text("""
+            sqlalchemy.text(f"""
                 SELECT id, type, message, details, read_status, created_at, link_path
                 FROM notifications
-                WHERE player_id = :player_id
-                ORDER BY created_at DESC
+                WHERE player_id = :player_id {seek}
+                ORDER BY created_at DESC, id DESC
                 LIMIT :limit OFFSET :offset
             """),
-            {"player_id": player_id, "limit": limit, "offset": offset}
+            params
         ).mappings().fetchall()
 
+        rows = result[:limit]
+        next_cursor = encode_cursor(rows[-1]['created_at'], rows[-1]['id']) if len(result) > limit else None
+
         notifications = []
-        for row in result:
+        for row in rows:
             notification = dict(row)
-            if notification.get('created_at'):
+            if isinstance(notification.get('created_at'), datetime):
                 notification['created_at'] = notification['created_at'].isoformat()
             notifications.append(notification)
-        return notifications
+        return {"notifications": notifications, "next_cursor": next_cursor}
 
-def get_coach_conversations(player_id):
-    pool = get_db_connection()
-    with pool.connect() as conn:
+def get_notifications_for_player(player_id, limit=20, offset=0, cursor=None, conn=None):
+    """Retrieves notifications for a specific player, sorted by most recent."""
+    return get_notifications_page(player_id, limit=limit, cursor=cursor, offset=offset, conn=conn)["notifications"]
+
+def get_coach_conversations(player_id, conn=None):
+    with _connect(conn) as conn:
         result = conn.execute(
             sqlalchemy.text("""
                 SELECT conversation_id, title, last_updated
@@ -1083,9 +1476,8 @@ def get_coach_conversations(player_id):
             conversations_data.append(convo_dict)
         return conversations_data
 
-def get_coach_conversation_details(conversation_id, player_id):
-    pool = get_db_connection()
-    with pool.connect() as conn:
+def get_coach_conversation_details(conversation_id, player_id, conn=None):
+    with _connect(conn) as conn:
         result = conn.execute(
             sqlalchemy.text("""
                 SELECT *
@@ -1110,21 +1502,41 @@ def get_coach_conversation_details(conversation_id, player_id):
 
         return convo_dict
 
-def get_player_info(player_id):
-    pool = get_db_connection()
-    with pool.connect() as conn:
+# Player identity and subscription status are read on every protected request, so they are served
+# from a short-lived per-process cache. Writes to these columns invalidate the entry in this process
+# when they commit; other processes pick the change up once their entry expires.
+PLAYER_INFO_TTL_SECONDS = int(os.environ.get("PLAYER_INFO_TTL_SECONDS", "30"))
+_player_info_cache = {}  # player_id -> (expires_at, info)
+
+def invalidate_player_info(player_id, conn=None):
+    """Drops a player's cached info now and, when `conn` is in a transaction, again once it commits."""
+    _player_info_cache.pop(player_id, None)
+    if conn is not None:
+        _after_commit(conn, lambda: _player_info_cache.pop(player_id, None))
+
+def get_player_info(player_id, conn=None, use_cache=True):
+    """
+    Returns {player_id, email, name, subscription_status, timezone}, or None for an unknown player.
+    The cache is per process and only invalidated by writes in this process, so pass use_cache=False
+    when the result is stored beyond PLAYER_INFO_TTL_SECONDS, e.g. in a cached response.
+    """
+    cached = _player_info_cache.get(player_id) if use_cache else None
+    if cached and cached[0] > time.monotonic():
+        return dict(cached[1])
+
+    with _connect(conn) as conn:
         result = conn.execute(
             sqlalchemy.text("SELECT player_id, email, name, subscription_status, timezone FROM players WHERE player_id = :player_id"),
             {"player_id": player_id}
         ).mappings().first()
         if result:
+            _player_info_cache[player_id] = (time.monotonic() + PLAYER_INFO_TTL_SECONDS, dict(result))
             return dict(result)
         return None
 
-def get_notification_preferences(player_id):
+def get_notification_preferences(player_id, conn=None):
     """Retrieves notification preferences for a specific player."""
-    pool = get_db_connection()
-    with pool.connect() as conn:
+    with _connect(conn) as conn:
         result = conn.execute(
             sqlalchemy.text("SELECT notification_preferences FROM players WHERE player_id = :player_id"),
             {"player_id": player_id}
@@ -1132,11 +1544,10 @@ def get_notification_preferences(player_id):
     # The result could be a JSON string or None. The service layer will handle parsing.
     return result
 
-def update_notification_preferences(player_id, preferences):
+def update_notification_preferences(player_id, preferences, conn=None):
     """Updates notification preferences (as a JSON string) for a specific player."""
-    pool = get_db_connection()
-    with pool.connect() as conn:
-        with conn.begin():
+    with _connect(conn) as conn:
+        with _begin(conn):
             conn.execute(
                 sqlalchemy.text("""
                     UPDATE players
@@ -1147,11 +1558,10 @@ def update_notification_preferences(player_id, preferences):
             )
     logger.info(f"Updated notification preferences for player {player_id}.")
 
-def update_player_profile(player_id, updates):
+def update_player_profile(player_id, updates, conn=None):
     """Updates player profile information for a specific player."""
-    pool = get_db_connection()
-    with pool.connect() as conn:
-        with conn.begin():
+    with _connect(conn) as conn:
+        with _begin(conn):
             # Construct the SET clause dynamically based on the updates dictionary
             set_clauses = []
             params = {"player_id": player_id}
@@ -1167,6 +1577,9 @@ def update_player_profile(player_id, updates):
 
             update_sql = sqlalchemy.text(f"UPDATE players SET {', '.join(set_clauses)} WHERE player_id = :player_id")
             conn.execute(update_sql, params)
+            _bump_resource_version(conn, _player_resource(player_id))
+            invalidate_player_info(player_id, conn)
+            _queue_search_update(conn, player_id, params)
     logger.info(f"Updated profile for player {player_id} with updates: {updates}.")
     return True
 
@@ -1183,11 +1596,10 @@ def create_conversation(player_id, title, history):
     logger.info(f"Placeholder: Creating conversation for player {player_id} with title '{title}'")
     return 999 # Dummy conversation ID
 
-def save_calibration_data(player_id, calibration_data):
+def save_calibration_data(player_id, calibration_data, conn=None):
     """Saves calibration data (as a JSON string) for a specific player."""
-    pool = get_db_connection()
-    with pool.connect() as conn:
-        with conn.begin():
+    with _connect(conn) as conn:
+        with _begin(conn):
             conn.execute(
                 sqlalchemy.text("""
                     UPDATE players
@@ -1198,10 +1610,9 @@ def save_calibration_data(player_id, calibration_data):
             )
     logger.info(f"Saved calibration data for player {player_id}.")
 
-def get_calibration_data(player_id):
+def get_calibration_data(player_id, conn=None):
     """Retrieves calibration data for a specific player."""
-    pool = get_db_connection()
-    with pool.connect() as conn:
+    with _connect(conn) as conn:
         result = conn.execute(
             sqlalchemy.text("SELECT calibration_data FROM players WHERE player_id = :player_id"),
             {"player_id": player_id}
@@ -1213,41 +1624,179 @@ def get_calibration_data(player_id):
     logger.warning(f"No calibration data found for player {player_id}.")
     return None
 
-def save_session(session_data):
-    """Saves a completed session and updates player career stats."""
-    pool = get_db_connection()
-    with pool.connect() as conn:
-        with conn.begin() as trans:
+def _insert_session(conn, db_type, session_data):
+    """
+    Inserts one session with its analytics, category counts and leaderboard entries.
+    Returns (session_id, putt rows); the caller bulk-inserts the putts and recalculates player stats.
+    Returns (None, []) when the player already has a session with this external_session_id.
+    """
+    analytics_columns, category_counts = compute_session_analytics(session_data)
+    insert_columns = [
+        "player_id", "start_time", "end_time", "status", "total_putts", "total_makes",
+        "total_misses", "best_streak", "fastest_21_makes", "putts_per_minute",
+        "makes_per_minute", "most_makes_in_60_seconds", "session_duration",
+        "putt_list", "putt_data", "makes_by_category", "misses_by_category",
+        "external_session_id", "processed_at",
+        *analytics_columns.keys()
+    ]
+    # A retried upload hits the unique (external_session_id, player_id) index and inserts nothing.
+    insert_sql = f"""
+        INSERT INTO sessions ({', '.join(insert_columns)})
+        VALUES ({', '.join(':' + column for column in insert_columns)})
+        ON CONFLICT (external_session_id, player_id) DO NOTHING
+    """
+    if db_type == "postgresql":
+        insert_sql += " RETURNING session_id"
+
+    external_session_id = session_data.get('external_session_id')
+    putt_data = _pack_putt_list_field(session_data.get('putt_list'))
+    packed_losslessly = putt_data is not None and putt_codes.matches_packed(_load_json_field(session_data.get('putt_list'), None), putt_data)
+    # Insert the session data
+    result = conn.execute(
+        sqlalchemy.text(insert_sql),
+        {
+            **session_data, **analytics_columns,
+            # Putts are stored packed; putt_list is kept only when the packed form would lose something.
+            "putt_list": None if packed_losslessly else session_data.get('putt_list'),
+            "putt_data": putt_data,
+            "external_session_id": None if external_session_id is None else str(external_session_id),
+            "processed_at": datetime.utcnow()
+        }
+    )
+    if db_type == "postgresql":
+        session_id = result.scalar()
+    else:
+        session_id = result.lastrowid if result.rowcount else None
+    if session_id is None:
+        return None, []
+
+    player_id = session_data.get('player_id')
+    _insert_session_category_counts(conn, session_id, player_id, category_counts)
+    _update_leaderboards(conn, session_id, session_data)
+    return session_id, _encode_putt_rows(session_id, player_id, _load_json_field(session_data.get('putt_list'), []))
+
+def save_session(session_data, conn=None):
+    """
+    Saves a completed session, its pre-computed analytics, and updates player career stats.
+    Saving a session whose external_session_id the player already has returns the stored session's id
+    without reprocessing it.
+    """
+    with _connect(conn) as conn:
+        db_type = conn.dialect.name
+        with _begin(conn):
             try:
-                # Insert the session data
-                conn.execute(
-                    sqlalchemy.text("""
-                        INSERT INTO sessions (
-                            player_id, start_time, end_time, status, total_putts, total_makes,
-                            total_misses, best_streak, fastest_21_makes, putts_per_minute,
-                            makes_per_minute, most_makes_in_60_seconds, session_duration,
-                            putt_list, makes_by_category, misses_by_category
-                        ) VALUES (
-                            :player_id, :start_time, :end_time, :status, :total_putts, :total_makes,
-                            :total_misses, :best_streak, :fastest_21_makes, :putts_per_minute,
-                            :makes_per_minute, :most_makes_in_60_seconds, :session_duration,
-                            :putt_list, :makes_by_category, :misses_by_category
-                        )
-                    """),
-                    session_data
-                )
-                
                 player_id = session_data.get('player_id')
+                session_id, putt_rows = _insert_session(conn, db_type, session_data)
+                if session_id is None:
+                    existing = get_session_by_id(session_data['external_session_id'], player_id, conn)
+                    logger.info(f"Session {session_data['external_session_id']} for player {player_id} already stored as {existing['session_id']}.")
+                    return existing['session_id']
+                _bulk_insert_putts(conn, putt_rows)
+
                 if player_id:
                     recalculate_player_stats(player_id, conn)
+                    _bump_resource_version(conn, _player_resource(player_id))
+                    _after_commit(conn, lambda: _note_player_write(player_id))
                 
-                logger.info(f"Saved new session and updated stats for player {player_id}.")
+                logger.info(f"Saved new session {session_id} and updated stats for player {player_id}.")
+                return session_id
             except Exception as e:
                 logger.error(f"Error saving session for player {session_data.get('player_id')}: {e}", exc_info=True)
-                trans.rollback()
                 raise
 
-def create_league(creator_id, name, description, privacy_type, settings, start_time_str):
+def save_sessions(sessions, conn=None):
+    """
+    Saves a batch of completed sessions in one transaction and returns their session ids, in order.
+    Putts for the whole batch go in with one bulk insert, and each affected player's stats are
+    recalculated once rather than once per session. Sessions already stored (by external_session_id)
+    return their existing ids and are not reprocessed.
+    """
+    if not sessions:
+        return []
+
+    with _connect(conn) as conn:
+        db_type = conn.dialect.name
+        with _begin(conn):
+            try:
+                session_ids, putt_rows, player_ids = [], [], set()
+                for session_data in sessions:
+                    session_id, rows = _insert_session(conn, db_type, session_data)
+                    if session_id is None:
+                        session_id = get_session_by_id(session_data['external_session_id'], session_data.get('player_id'), conn)['session_id']
+                    else:
+                        player_ids.add(session_data.get('player_id'))
+                    session_ids.append(session_id)
+                    putt_rows.extend(rows)
+                _bulk_insert_putts(conn, putt_rows)
+
+                player_ids.discard(None)
+                for player_id in player_ids:
+                    _recalculate_player_stats(conn, player_id)
+                    _bump_resource_version(conn, _player_resource(player_id))
+                    _after_commit(conn, lambda player_id=player_id: _note_player_write(player_id))
+
+                logger.info(f"Saved batch of {len(session_ids)} sessions and updated stats for {len(player_ids)} players.")
+                return session_ids
+            except Exception as e:
+                logger.error(f"Error saving batch of {len(sessions)} sessions: {e}", exc_info=True)
+                raise
+
+SESSION_LOOKUP_COLUMNS = """session_id, external_session_id, player_id, start_time, end_time, processed_at,
+                            total_putts, total_makes, total_misses, best_streak, fastest_21_makes,
+                            putts_per_minute, makes_per_minute, most_makes_in_60_seconds, session_duration,
+                            makes_by_category, misses_by_category"""
+
+def _session_lookup_row(row):
+    session = dict(row)
+    for column in ('start_time', 'end_time', 'processed_at'):
+        if isinstance(session.get(column), datetime):
+            session[column] = session[column].isoformat()
+    return session
+
+def get_session_by_id(external_session_id, player_id=None, conn=None):
+    """
+    Looks up a stored session by the desktop client's session id, optionally scoped to a player.
+    Served by the unique (external_session_id, player_id) index. Returns None if it was never stored.
+    """
+    with _connect(conn) as conn:
+        player_filter = "AND player_id = :player_id" if player_id is not None else ""
+        row = conn.execute(
+            sqlalchemy.text(f"""
+                SELECT {SESSION_LOOKUP_COLUMNS}
+                FROM sessions
+                WHERE external_session_id = :external_session_id {player_filter}
+                ORDER BY session_id
+                LIMIT 1
+            """),
+            {"external_session_id": str(external_session_id), "player_id": player_id}
+        ).mappings().first()
+        return _session_lookup_row(row) if row else None
+
+def get_sessions_by_external_ids(keys, conn=None):
+    """
+    Looks up many (external_session_id, player_id) pairs in one query.
+    Returns {(external_session_id, player_id): session} for those already stored, with ids as strings.
+    """
+    keys = {(str(external_session_id), player_id) for external_session_id, player_id in keys}
+    if not keys:
+        return {}
+    with _connect(conn) as conn:
+        result = conn.execute(
+            sqlalchemy.text(f"""
+                SELECT {SESSION_LOOKUP_COLUMNS}
+                FROM sessions
+                WHERE external_session_id IN :external_session_ids
+            """).bindparams(sqlalchemy.bindparam("external_session_ids", expanding=True)),
+            {"external_session_ids": sorted({external_session_id for external_session_id, _ in keys})}
+        ).mappings()
+        sessions = {}
+        for row in result:
+            key = (row['external_session_id'], row['player_id'])
+            if key in keys:
+                sessions[key] = _session_lookup_row(row)
+        return sessions
+
+def create_league(creator_id, name, description, privacy_type, settings, start_time_str, conn=None):
     """Creates a new league, adds the creator as the first member, and generates rounds."""
     pool = get_db_connection()
     db_type = pool.dialect.name
@@ -1255,11 +1804,11 @@ def create_league(creator_id, name, description, privacy_type, settings, start_t
     num_rounds = settings.get('num_rounds', 4)
     round_duration_hours = settings.get('round_duration_hours', 168)
 
-    with pool.connect() as conn:
-        with conn.begin() as trans:
+    with _connect(conn) as conn:
+        with _begin(conn):
             try:
                 # Get player's timezone
-                player_info = get_player_info(creator_id)
+                player_info = get_player_info(creator_id, conn)
                 player_timezone_str = player_info.get('timezone', 'UTC') if player_info else 'UTC'
                 
                 try:
@@ -1334,15 +1883,50 @@ def create_league(creator_id, name, description, privacy_type, settings, start_t
                 
                 raise
 
-def start_pending_league_rounds():
+# Scheduler jobs (run by scheduler.py). Each is a few set-based statements over every due row,
+# runs in the caller's transaction when given one, and returns how many rows it changed.
+LEAGUE_REMINDER_HOURS = int(os.environ.get("LEAGUE_REMINDER_HOURS", "24"))
+ACTIVE_DUEL_EXPIRY_DAYS = int(os.environ.get("ACTIVE_DUEL_EXPIRY_DAYS", "7"))
+
+def _notify_players(conn, select_sql, params, expanding=()):
     """
-    Updates the status of league rounds from 'scheduled' to 'active' if their start time has passed.
+    Inserts one in-app notification per row of `select_sql` (player_id, type, message, link_path) with a
+    single INSERT ... SELECT, then updates the recipients' unread counters in one batch. Returns the count.
     """
-    pool = get_db_connection()
-    with pool.connect() as conn:
-        with conn.begin():
+    statement = sqlalchemy.text(f"""
+        INSERT INTO notifications (player_id, type, message, link_path, read_status, created_at)
+        SELECT player_id, type, message, link_path, FALSE, :created_at FROM ({select_sql}) new_notifications
+        RETURNING player_id
+    """)
+    if expanding:
+        statement = statement.bindparams(*(sqlalchemy.bindparam(name, expanding=True) for name in expanding))
+    player_ids = conn.execute(statement, {**params, "created_at": datetime.utcnow()}).scalars().all()
+    if not player_ids:
+        return 0
+
+    deltas = {}
+    for player_id in player_ids:
+        deltas[player_id] = deltas.get(player_id, 0) + 1
+    conn.execute(
+        sqlalchemy.text("UPDATE players SET unread_notification_count = unread_notification_count + :delta WHERE player_id = :player_id"),
+        [{"player_id": player_id, "delta": delta} for player_id, delta in deltas.items()]
+    )
+    counts = conn.execute(
+        sqlalchemy.text("SELECT player_id, unread_notification_count FROM players WHERE player_id IN :player_ids")
+        .bindparams(sqlalchemy.bindparam("player_ids", expanding=True)),
+        {"player_ids": list(deltas)}
+    ).fetchall()
+    _after_commit(conn, lambda: [_publish_unread_count(player_id, count) for player_id, count in counts])
+    return len(player_ids)
+
+def start_pending_league_rounds(conn=None):
+    """
+    Updates the status of league rounds from 'scheduled' to 'active' if their start time has passed,
+    and moves leagues whose first round has started from 'registering' to 'active'.
+    """
+    with _connect(conn) as conn:
+        with _begin(conn):
             current_time_utc = datetime.utcnow().replace(tzinfo=pytz.utc) # Ensure current time is timezone-aware UTC
-            logger.info(f"Scheduler: Checking for pending league rounds at {current_time_utc.isoformat()}")
             result = conn.execute(
                 sqlalchemy.text("""
                     UPDATE league_rounds
@@ -1353,40 +1937,217 @@ def start_pending_league_rounds():
                 {"current_time": current_time_utc}
             )
             updated_rounds = result.fetchall()
-            if updated_rounds:
-                for round_id, league_id, start_time_db in updated_rounds:
-                    logger.info(f"League round {round_id} for league {league_id} (starts: {start_time_db.isoformat()}) changed to 'active'.")
-            else:
-                logger.info("No pending league rounds to activate.")
-
-def expire_pending_duels():
-    """Placeholder for expiring pending duels."""
-    logger.info("Executing expire_pending_duels (placeholder).")
-
-def expire_active_duels():
-    """Placeholder for expiring active duels."""
-    logger.info("Executing expire_active_duels (placeholder).")
-
-def send_league_reminders():
-    """Placeholder for sending league reminders."""
-    logger.info("Executing send_league_reminders (placeholder).")
-
-def process_final_league_results():
-    """Placeholder for processing final league results."""
-    logger.info("Executing process_final_league_results (placeholder).")
-
-def send_fundraiser_reminders():
-    """Placeholder for sending fundraiser reminders."""
-    logger.info("Executing send_fundraiser_reminders (placeholder).")
-
-def process_concluded_fundraisers():
-    """Placeholder for processing concluded fundraisers."""
-    logger.info("Executing process_concluded_fundraisers (placeholder).")
-
-def get_league_details(league_id):
-    """Retrieves comprehensive details for a single league, including its members, rounds, and submissions."""
-    pool = get_db_connection()
-    with pool.connect() as conn:
+            if not updated_rounds:
+                return 0
+            league_ids = sorted({league_id for _, league_id, _ in updated_rounds})
+            conn.execute(
+                sqlalchemy.text("UPDATE leagues SET status = 'active' WHERE status = 'registering' AND league_id IN :league_ids")
+                .bindparams(sqlalchemy.bindparam("league_ids", expanding=True)),
+                {"league_ids": league_ids}
+            )
+            for league_id in league_ids:
+                _bump_resource_version(conn, _league_resource(league_id))
+            for round_id, league_id, start_time_db in updated_rounds:
+                start_time_db = start_time_db.isoformat() if isinstance(start_time_db, datetime) else start_time_db
+                logger.info(f"League round {round_id} for league {league_id} (starts: {start_time_db}) changed to 'active'.")
+    return len(updated_rounds)
+
+def expire_pending_duels(conn=None):
+    """Expires duel invitations past their invitation_expires_at and tells each creator."""
+    with _connect(conn) as conn:
+        with _begin(conn):
+            duel_ids = conn.execute(
+                sqlalchemy.text("""
+                    UPDATE duels SET status = 'expired'
+                    WHERE status = 'pending' AND invitation_expires_at <= :now
+                    RETURNING duel_id
+                """),
+                {"now": datetime.utcnow()}
+            ).scalars().all()
+            if duel_ids:
+                _notify_players(conn, """
+                    SELECT d.creator_id AS player_id, 'DUEL_EXPIRED' AS type,
+                           'Your duel invitation to ' || p.name || ' expired.' AS message, '/duels' AS link_path
+                    FROM duels d JOIN players p ON p.player_id = d.invited_player_id
+                    WHERE d.duel_id IN :duel_ids
+                """, {"duel_ids": duel_ids}, expanding=("duel_ids",))
+    return len(duel_ids)
+
+def expire_active_duels(conn=None):
+    """
+    Expires accepted duels still unfinished ACTIVE_DUEL_EXPIRY_DAYS after their invitation window
+    closed (or after creation, for duels without one), and tells both players.
+    """
+    with _connect(conn) as conn:
+        with _begin(conn):
+            duel_ids = conn.execute(
+                sqlalchemy.text("""
+                    UPDATE duels SET status = 'expired'
+                    WHERE status = 'active' AND COALESCE(invitation_expires_at, created_at) <= :cutoff
+                    RETURNING duel_id
+                """),
+                {"cutoff": datetime.utcnow() - timedelta(days=ACTIVE_DUEL_EXPIRY_DAYS)}
+            ).scalars().all()
+            if duel_ids:
+                _notify_players(conn, """
+                    SELECT d.creator_id AS player_id, 'DUEL_EXPIRED' AS type,
+                           'Your duel with ' || p.name || ' expired before both sessions were submitted.' AS message, '/duels' AS link_path
+                    FROM duels d JOIN players p ON p.player_id = d.invited_player_id
+                    WHERE d.duel_id IN :duel_ids
+                    UNION ALL
+                    SELECT d.invited_player_id, 'DUEL_EXPIRED',
+                           'Your duel with ' || p.name || ' expired before both sessions were submitted.', '/duels'
+                    FROM duels d JOIN players p ON p.player_id = d.creator_id
+                    WHERE d.duel_id IN :duel_ids
+                """, {"duel_ids": duel_ids}, expanding=("duel_ids",))
+    return len(duel_ids)
+
+def send_league_reminders(conn=None):
+    """
+    Reminds members who have not submitted to an active round that ends within LEAGUE_REMINDER_HOURS.
+    Each round is reminded once (league_rounds.reminder_sent_at). Returns the number of reminders sent.
+    """
+    now = datetime.utcnow()
+    with _connect(conn) as conn:
+        with _begin(conn):
+            round_ids = conn.execute(
+                sqlalchemy.text("""
+                    UPDATE league_rounds SET reminder_sent_at = :now
+                    WHERE status = 'active' AND reminder_sent_at IS NULL AND end_time > :now AND end_time <= :window_end
+                    RETURNING round_id
+                """),
+                {"now": now, "window_end": now + timedelta(hours=LEAGUE_REMINDER_HOURS)}
+            ).scalars().all()
+            if not round_ids:
+                return 0
+            return _notify_players(conn, """
+                SELECT lm.player_id, 'LEAGUE_ROUND_REMINDER' AS type,
+                       'Round ' || lr.round_number || ' of ' || l.name || ' ends soon. Submit a session before it closes.' AS message,
+                       '/leagues/' || l.league_id AS link_path
+                FROM league_rounds lr
+                JOIN leagues l ON l.league_id = lr.league_id
+                JOIN league_members lm ON lm.league_id = lr.league_id
+                WHERE lr.round_id IN :round_ids
+                  AND NOT EXISTS (
+                      SELECT 1 FROM league_round_submissions lrs
+                      WHERE lrs.round_id = lr.round_id AND lrs.player_id = lm.player_id
+                  )
+            """, {"round_ids": round_ids}, expanding=("round_ids",))
+
+def process_final_league_results(conn=None):
+    """
+    Closes active rounds whose end time has passed, then completes leagues with no open rounds
+    left and tells their members. Returns the number of rounds and leagues closed.
+    """
+    with _connect(conn) as conn:
+        with _begin(conn):
+            round_leagues = conn.execute(
+                sqlalchemy.text("""
+                    UPDATE league_rounds SET status = 'completed'
+                    WHERE status = 'active' AND end_time <= :now
+                    RETURNING league_id
+                """),
+                {"now": datetime.utcnow()}
+            ).scalars().all()
+            completed_league_ids = conn.execute(
+                sqlalchemy.text("""
+                    UPDATE leagues SET status = 'completed'
+                    WHERE status = 'active'
+                      AND EXISTS (SELECT 1 FROM league_rounds lr WHERE lr.league_id = leagues.league_id)
+                      AND NOT EXISTS (
+                          SELECT 1 FROM league_rounds lr
+                          WHERE lr.league_id = leagues.league_id AND lr.status <> 'completed'
+                      )
+                    RETURNING league_id
+                """)
+            ).scalars().all()
+            if completed_league_ids:
+                _notify_players(conn, """
+                    SELECT lm.player_id, 'LEAGUE_COMPLETED' AS type,
+                           l.name || ' has finished. See the final standings.' AS message,
+                           '/leagues/' || l.league_id AS link_path
+                    FROM leagues l JOIN league_members lm ON lm.league_id = l.league_id
+                    WHERE l.league_id IN :league_ids
+                """, {"league_ids": completed_league_ids}, expanding=("league_ids",))
+            for league_id in set(round_leagues) | set(completed_league_ids):
+                _bump_resource_version(conn, _league_resource(league_id))
+    return len(round_leagues) + len(completed_league_ids)
+
+# Funding progress is announced at each quarter of the target.
+_FUNDRAISER_MILESTONE_SQL = """
+    CASE WHEN current_amount >= target_amount THEN 100
+         WHEN current_amount >= target_amount * 0.75 THEN 75
+         WHEN current_amount >= target_amount * 0.5 THEN 50
+         WHEN current_amount >= target_amount * 0.25 THEN 25
+         ELSE 0 END
+"""
+
+def send_fundraiser_reminders(conn=None):
+    """Tells creators when an active fundraiser passes a new funding milestone (25/50/75/100% of target)."""
+    with _connect(conn) as conn:
+        with _begin(conn):
+            fundraiser_ids = conn.execute(
+                sqlalchemy.text(f"""
+                    UPDATE fundraisers SET last_notified_milestone = {_FUNDRAISER_MILESTONE_SQL}
+                    WHERE status = 'active' AND target_amount > 0
+                      AND {_FUNDRAISER_MILESTONE_SQL} > COALESCE(last_notified_milestone, 0)
+                    RETURNING fundraiser_id
+                """)
+            ).scalars().all()
+            if fundraiser_ids:
+                _notify_players(conn, """
+                    SELECT creator_id AS player_id, 'FUNDRAISER_MILESTONE' AS type,
+                           title || ' reached ' || last_notified_milestone || '% of its goal.' AS message,
+                           '/fundraisers/' || fundraiser_id AS link_path
+                    FROM fundraisers WHERE fundraiser_id IN :fundraiser_ids
+                """, {"fundraiser_ids": fundraiser_ids}, expanding=("fundraiser_ids",))
+    return len(fundraiser_ids)
+
+def process_concluded_fundraisers(conn=None):
+    """Completes fundraisers past their end date along with their active pledges, and tells the creator and pledgers."""
+    with _connect(conn) as conn:
+        with _begin(conn):
+            fundraiser_ids = conn.execute(
+                sqlalchemy.text("""
+                    UPDATE fundraisers SET status = 'completed', conclusion_notification_sent = TRUE
+                    WHERE status = 'active' AND end_date <= :now
+                    RETURNING fundraiser_id
+                """),
+                {"now": datetime.utcnow()}
+            ).scalars().all()
+            if not fundraiser_ids:
+                return 0
+            conn.execute(
+                sqlalchemy.text("UPDATE pledges SET status = 'completed' WHERE status = 'active' AND fundraiser_id IN :fundraiser_ids")
+                .bindparams(sqlalchemy.bindparam("fundraiser_ids", expanding=True)),
+                {"fundraiser_ids": fundraiser_ids}
+            )
+            _notify_players(conn, """
+                SELECT creator_id AS player_id, 'FUNDRAISER_CONCLUDED' AS type,
+                       title || ' has concluded. Thank you for fundraising!' AS message,
+                       '/fundraisers/' || fundraiser_id AS link_path
+                FROM fundraisers WHERE fundraiser_id IN :fundraiser_ids
+                UNION
+                SELECT p.pledger_id, 'FUNDRAISER_CONCLUDED',
+                       f.title || ' has concluded. Thank you for your pledge!',
+                       '/fundraisers/' || f.fundraiser_id
+                FROM pledges p JOIN fundraisers f ON f.fundraiser_id = p.fundraiser_id
+                WHERE p.fundraiser_id IN :fundraiser_ids AND p.pledger_id <> f.creator_id
+            """, {"fundraiser_ids": fundraiser_ids}, expanding=("fundraiser_ids",))
+            _bump_resource_version(conn, FUNDRAISERS_RESOURCE)
+    return len(fundraiser_ids)
+
+LEAGUE_DETAIL_SECTIONS = ("members", "rounds")
+
+@read_only()
+def get_league_details(league_id, include=None, conn=None):
+    """
+    Retrieves comprehensive details for a single league, including its members, rounds, and submissions.
+    `include` limits the optional sections to a subset of LEAGUE_DETAIL_SECTIONS (all by default).
+    Uses at most three queries regardless of the number of rounds.
+    """
+    include = set(LEAGUE_DETAIL_SECTIONS if include is None else include)
+    with _connect(conn) as conn:
         # First, get the main league info
         league_info = conn.execute(
             sqlalchemy.text("SELECT * FROM leagues WHERE league_id = :league_id"),
@@ -1404,66 +2165,63 @@ def get_league_details(league_id):
         else:
             league_details['settings'] = {} # Ensure settings is always a dict
 
-        # Next, get the list of members
-        members = conn.execute(
-            sqlalchemy.text("""
-                SELECT p.player_id, p.name
-                FROM league_members lm
-                JOIN players p ON lm.player_id = p.player_id
-                WHERE lm.league_id = :league_id
-                ORDER BY p.name
-            """),
-            {"league_id": league_id}
-        ).mappings().fetchall()
-        league_details['members'] = [dict(member) for member in members]
-        logger.info(f"Fetched {len(members)} members for league {league_id}.")
-
-        # Then, get all rounds for the league
-        rounds_result = conn.execute(
-            sqlalchemy.text("""
-                SELECT round_id, league_id, round_number, status, start_time, end_time
-                FROM league_rounds
-                WHERE league_id = :league_id
-                ORDER BY round_number ASC
-            """),
-            {"league_id": league_id}
-        ).mappings().fetchall()
-
-        rounds_data = []
-        for r_row in rounds_result:
-            round_dict = dict(r_row)
-            # Convert datetimes
-            if round_dict.get('start_time'):
-                round_dict['start_time'] = round_dict['start_time'].isoformat()
-            if round_dict.get('end_time'):
-                round_dict['end_time'] = round_dict['end_time'].isoformat()
+        if "members" in include:
+            members = conn.execute(
+                sqlalchemy.text("""
+                    SELECT p.player_id, p.name
+                    FROM league_members lm
+                    JOIN players p ON lm.player_id = p.player_id
+                    WHERE lm.league_id = :league_id
+                    ORDER BY p.name
+                """),
+                {"league_id": league_id}
+            ).mappings().fetchall()
+            league_details['members'] = [dict(member) for member in members]
+            logger.info(f"Fetched {len(members)} members for league {league_id}.")
 
-            # Get submissions for each round
-            submissions_result = conn.execute(
+        if "rounds" in include:
+            # Every round with its submissions in one query, grouped by round in memory
+            rows = conn.execute(
                 sqlalchemy.text("""
                     SELECT
+                        lr.round_id, lr.league_id, lr.round_number, lr.status, lr.start_time, lr.end_time,
                         lrs.submission_id, lrs.player_id, lrs.session_id, lrs.points_awarded,
                         s.total_makes AS score, p.name AS player_name
-                    FROM league_round_submissions lrs
-                    JOIN sessions s ON lrs.session_id = s.session_id
-                    JOIN players p ON lrs.player_id = p.player_id
-                    WHERE lrs.round_id = :round_id
+                    FROM league_rounds lr
+                    LEFT JOIN league_round_submissions lrs ON lrs.round_id = lr.round_id
+                    LEFT JOIN sessions s ON lrs.session_id = s.session_id
+                    LEFT JOIN players p ON lrs.player_id = p.player_id
+                    WHERE lr.league_id = :league_id
+                    ORDER BY lr.round_number ASC, lrs.submission_id ASC
                 """),
-                {"round_id": round_dict['round_id']}
+                {"league_id": league_id}
             ).mappings().fetchall()
-            round_dict['submissions'] = [dict(sub) for sub in submissions_result]
-            rounds_data.append(round_dict)
-        
-        league_details['rounds'] = rounds_data
-        logger.info(f"Fetched {len(rounds_data)} rounds and their submissions for league {league_id}.")
+
+            rounds_by_id = {}
+            for row in rows:
+                round_dict = rounds_by_id.get(row['round_id'])
+                if round_dict is None:
+                    round_dict = {key: row[key] for key in ("round_id", "league_id", "round_number", "status", "start_time", "end_time")}
+                    # Convert datetimes
+                    for key in ("start_time", "end_time"):
+                        if isinstance(round_dict[key], datetime):
+                            round_dict[key] = round_dict[key].isoformat()
+                    round_dict['submissions'] = []
+                    rounds_by_id[row['round_id']] = round_dict
+                if row['submission_id'] is not None:
+                    round_dict['submissions'].append({
+                        key: row[key] for key in ("submission_id", "player_id", "session_id", "points_awarded", "score", "player_name")
+                    })
+
+            league_details['rounds'] = list(rounds_by_id.values())
+            logger.info(f"Fetched {len(rounds_by_id)} rounds and their submissions for league {league_id}.")
 
         return league_details
 
-def join_league(league_id, player_id):
+def join_league(league_id, player_id, conn=None):
     """Allows a player to join a public league."""
-    pool = get_db_connection()
-    with pool.connect() as conn:
-        with conn.begin() as trans:
+    with _connect(conn) as conn:
+        with _begin(conn):
             try:
                 # First, check if the league is public
                 league = conn.execute(
@@ -1485,6 +2243,7 @@ def join_league(league_id, player_id):
                     """),
                     {"league_id": league_id, "player_id": player_id}
                 )
+                _bump_resource_version(conn, _league_resource(league_id))
                 logger.info(f"Player {player_id} successfully joined league {league_id}.")
                 
                 return {"success": True, "message": "Successfully joined league."}
@@ -1501,7 +2260,7 @@ def join_league(league_id, player_id):
                 logger.error(f"Error in join_league for player {player_id} and league {league_id}: {e}", exc_info=True)
                 raise Exception("An unexpected error occurred while trying to join the league.")
 
-def create_duel(creator_id, invited_player_id, settings):
+def create_duel(creator_id, invited_player_id, settings, conn=None):
     """Creates a new duel invitation."""
     pool = get_db_connection()
     db_type = pool.dialect.name
@@ -1511,8 +2270,8 @@ def create_duel(creator_id, invited_player_id, settings):
 
     invitation_expires_at = datetime.utcnow() + timedelta(minutes=invitation_expiry_minutes)
 
-    with pool.connect() as conn:
-        with conn.begin() as trans:
+    with _connect(conn) as conn:
+        with _begin(conn):
             try:
                 insert_sql = """
                     INSERT INTO duels (creator_id, invited_player_id, status, session_duration_limit_minutes, invitation_expiry_minutes, invitation_expires_at)
@@ -1546,11 +2305,10 @@ def create_duel(creator_id, invited_player_id, settings):
 
 
 
-def submit_session_to_duel(duel_id, player_id, session_id):
+def submit_session_to_duel(duel_id, player_id, session_id, conn=None):
     """Submits a player's session to an active duel and determines a winner if applicable."""
-    pool = get_db_connection()
-    with pool.connect() as conn:
-        with conn.begin() as trans:
+    with _connect(conn) as conn:
+        with _begin(conn):
             duel = conn.execute(
                 sqlalchemy.text("SELECT creator_id, invited_player_id, status FROM duels WHERE duel_id = :duel_id"),
                 {"duel_id": duel_id}
@@ -1597,7 +2355,7 @@ def _determine_duel_winner(duel_id, conn):
     """
     # Get the duel and session IDs
     duel = conn.execute(
-        sqlalchemy.text("SELECT creator_id, invited_player_id, creator_submitted_session_id, invited_player_submitted_session_id FROM duels WHERE duel_id = :duel_id"),
+        sqlalchemy.text("SELECT creator_id, invited_player_id, creator_submitted_session_id, invited_player_submitted_session_id, created_at FROM duels WHERE duel_id = :duel_id"),
         {"duel_id": duel_id}
     ).mappings().first()
 
@@ -1627,77 +2385,237 @@ def _determine_duel_winner(duel_id, conn):
         sqlalchemy.text("UPDATE duels SET status = 'completed', winner_id = :winner_id WHERE duel_id = :duel_id"),
         {"winner_id": winner_id, "duel_id": duel_id}
     )
+    _record_rivalry_result(
+        conn, duel_id, duel['created_at'], duel['creator_id'], duel['invited_player_id'], winner_id,
+        creator_session['total_makes'], invited_session['total_makes']
+    )
     logger.info(f"Duel {duel_id} completed. Winner is player {winner_id}.")
     # TODO: Create notifications for both players about the result.
 
-def get_all_time_leaderboards(limit=10):
-    """Retrieves a dictionary of all-time leaderboards for various metrics."""
-    pool = get_db_connection()
-    leaderboards = {}
-    with pool.connect() as conn:
-        # Top Makes in a Session
-        leaderboards['top_makes'] = [
-            dict(row) for row in conn.execute(
-                sqlalchemy.text("""
-                    SELECT s.total_makes, p.name, s.start_time
-                    FROM sessions s JOIN players p ON s.player_id = p.player_id
-                    WHERE s.total_makes > 0
-                    ORDER BY s.total_makes DESC, s.start_time DESC
-                    LIMIT :limit
-                """),
-                {"limit": limit}
-            ).mappings().fetchall()
-        ]
+def _rivalry_key(player1_id, player2_id):
+    """Rivalries are stored once per pair, keyed by (lower player_id, higher player_id)."""
+    return (player1_id, player2_id) if player1_id < player2_id else (player2_id, player1_id)
 
-        # Top Streaks
-        leaderboards['top_streaks'] = [
-            dict(row) for row in conn.execute(
-                sqlalchemy.text("""
-                    SELECT s.best_streak, p.name, s.start_time
-                    FROM sessions s JOIN players p ON s.player_id = p.player_id
-                    WHERE s.best_streak > 0
-                    ORDER BY s.best_streak DESC, s.start_time DESC
-                    LIMIT :limit
-                """),
-                {"limit": limit}
-            ).mappings().fetchall()
-        ]
+def _record_rivalry_result(conn, duel_id, duel_created_at, creator_id, invited_player_id, winner_id, creator_makes, invited_makes):
+    """Folds a completed duel into the pair's rivalry row. Runs in the caller's transaction."""
+    low_id, high_id = _rivalry_key(creator_id, invited_player_id)
+    low_makes, high_makes = (creator_makes, invited_makes) if creator_id == low_id else (invited_makes, creator_makes)
+    conn.execute(
+        sqlalchemy.text("""
+            INSERT INTO rivalries (
+                low_player_id, high_player_id, low_wins, high_wins, total_duels,
+                last_duel_id, last_duel_at, low_best_makes, high_best_makes
+            ) VALUES (
+                :low_id, :high_id, :low_win, :high_win, 1,
+                :duel_id, :duel_created_at, :low_makes, :high_makes
+            )
+            ON CONFLICT (low_player_id, high_player_id) DO UPDATE SET
+                low_wins = rivalries.low_wins + excluded.low_wins,
+                high_wins = rivalries.high_wins + excluded.high_wins,
+                total_duels = rivalries.total_duels + 1,
+                last_duel_id = excluded.last_duel_id,
+                last_duel_at = excluded.last_duel_at,
+                low_best_makes = CASE WHEN rivalries.low_best_makes IS NULL OR excluded.low_best_makes > rivalries.low_best_makes
+                                      THEN excluded.low_best_makes ELSE rivalries.low_best_makes END,
+                high_best_makes = CASE WHEN rivalries.high_best_makes IS NULL OR excluded.high_best_makes > rivalries.high_best_makes
+                                       THEN excluded.high_best_makes ELSE rivalries.high_best_makes END
+        """),
+        {
+            "low_id": low_id, "high_id": high_id,
+            "low_win": 1 if winner_id == low_id else 0, "high_win": 1 if winner_id == high_id else 0,
+            "duel_id": duel_id, "duel_created_at": duel_created_at,
+            "low_makes": low_makes, "high_makes": high_makes
+        }
+    )
 
-        # Top Makes per Minute
-        leaderboards['top_makes_per_minute'] = [
-            dict(row) for row in conn.execute(
-                sqlalchemy.text("""
-                    SELECT s.makes_per_minute, p.name, s.start_time
-                    FROM sessions s JOIN players p ON s.player_id = p.player_id
-                    WHERE s.makes_per_minute > 0
-                    ORDER BY s.makes_per_minute DESC, s.start_time DESC
-                    LIMIT :limit
-                """),
-                {"limit": limit}
-            ).mappings().fetchall()
-        ]
+def rebuild_rivalries(conn):
+    """Repopulates `rivalries` from completed duels (used by the migration that introduced it)."""
+    conn.execute(sqlalchemy.text("DELETE FROM rivalries"))
+    conn.execute(sqlalchemy.text("""
+        INSERT INTO rivalries (
+            low_player_id, high_player_id, low_wins, high_wins, total_duels,
+            last_duel_id, last_duel_at, low_best_makes, high_best_makes
+        )
+        SELECT
+            low_player_id, high_player_id,
+            SUM(CASE WHEN winner_id = low_player_id THEN 1 ELSE 0 END),
+            SUM(CASE WHEN winner_id = high_player_id THEN 1 ELSE 0 END),
+            COUNT(*), MAX(duel_id), MAX(created_at), MAX(low_makes), MAX(high_makes)
+        FROM (
+            SELECT
+                d.duel_id, d.winner_id, d.created_at,
+                CASE WHEN d.creator_id < d.invited_player_id THEN d.creator_id ELSE d.invited_player_id END AS low_player_id,
+                CASE WHEN d.creator_id < d.invited_player_id THEN d.invited_player_id ELSE d.creator_id END AS high_player_id,
+                CASE WHEN d.creator_id < d.invited_player_id THEN s_creator.total_makes ELSE s_invited.total_makes END AS low_makes,
+                CASE WHEN d.creator_id < d.invited_player_id THEN s_invited.total_makes ELSE s_creator.total_makes END AS high_makes
+            FROM duels d
+            LEFT JOIN sessions s_creator ON d.creator_submitted_session_id = s_creator.session_id
+            LEFT JOIN sessions s_invited ON d.invited_player_submitted_session_id = s_invited.session_id
+            WHERE d.status = 'completed'
+        ) completed
+        GROUP BY low_player_id, high_player_id
+    """))
+
+# All-time leaderboards are served from `leaderboard_entries`, which holds only the best
+# LEADERBOARD_SIZE sessions per metric and is maintained by save_session.
+# metric name -> (sessions column, sort direction, value type)
+LEADERBOARD_METRICS = {
+    "top_makes": ("total_makes", "DESC", int),
+    "top_streaks": ("best_streak", "DESC", int),
+    "top_makes_per_minute": ("makes_per_minute", "DESC", float),
+    "fastest_21": ("fastest_21_makes", "ASC", float),
+}
+LEADERBOARD_SIZE = 100
+LEADERBOARDS_RESOURCE = "leaderboards"
+# Other versioned resources: "player_<id>" (profile, stats and sessions), "league_<id>", the fundraiser list,
+# and "players" (names and emails, for the SQLite search index).
+FUNDRAISERS_RESOURCE = "fundraisers"
+
+def get_resource_version(resource, conn=None):
+    """Returns the change counter for a cached resource, used to build versioned ETags."""
+    with _connect(conn) as conn:
+        version = conn.execute(
+            sqlalchemy.text("SELECT version FROM resource_versions WHERE resource = :resource"),
+            {"resource": resource}
+        ).scalar()
+    return version or 0
+
+def get_resource_versions(resources, conn=None):
+    """Returns {resource: version} for many resources in one query; never-written resources are at 0."""
+    resources = list(resources)
+    if not resources:
+        return {}
+    with _connect(conn) as conn:
+        result = conn.execute(
+            sqlalchemy.text("SELECT resource, version FROM resource_versions WHERE resource IN :resources")
+            .bindparams(sqlalchemy.bindparam("resources", expanding=True)),
+            {"resources": resources}
+        )
+        versions = {resource: 0 for resource in resources}
+        versions.update({resource: version for resource, version in result})
+    return versions
 
-        # Fastest 21 Makes
-        leaderboards['fastest_21'] = [
-            dict(row) for row in conn.execute(
-                sqlalchemy.text("""
-                    SELECT s.fastest_21_makes, p.name, s.start_time
-                    FROM sessions s JOIN players p ON s.player_id = p.player_id
-                    WHERE s.fastest_21_makes > 0
-                    ORDER BY s.fastest_21_makes ASC, s.start_time DESC
-                    LIMIT :limit
-                """),
-                {"limit": limit}
-            ).mappings().fetchall()
-        ]
+def _player_resource(player_id):
+    return f"player_{player_id}"
+
+def _bump_resource_version(conn, resource):
+    result = conn.execute(
+        sqlalchemy.text("UPDATE resource_versions SET version = version + 1 WHERE resource = :resource"),
+        {"resource": resource}
+    )
+    if result.rowcount == 0:
+        conn.execute(
+            sqlalchemy.text("INSERT INTO resource_versions (resource, version) VALUES (:resource, 1)"),
+            {"resource": resource}
+        )
+
+def _trim_leaderboard(conn, metric):
+    _, direction, _ = LEADERBOARD_METRICS[metric]
+    conn.execute(
+        sqlalchemy.text(f"""
+            DELETE FROM leaderboard_entries
+            WHERE metric = :metric AND session_id NOT IN (
+                SELECT session_id FROM leaderboard_entries
+                WHERE metric = :metric
+                ORDER BY value {direction}, start_time DESC
+                LIMIT :size
+            )
+        """),
+        {"metric": metric, "size": LEADERBOARD_SIZE}
+    )
+
+def rebuild_leaderboards(conn):
+    """Repopulates the leaderboard store from `sessions` (used by the migration that introduced it)."""
+    conn.execute(sqlalchemy.text("DELETE FROM leaderboard_entries"))
+    for metric, (column, direction, _) in LEADERBOARD_METRICS.items():
+        conn.execute(
+            sqlalchemy.text(f"""
+                INSERT INTO leaderboard_entries (metric, session_id, player_id, value, start_time)
+                SELECT :metric, session_id, player_id, {column}, start_time
+                FROM sessions
+                WHERE {column} > 0
+                ORDER BY {column} {direction}, start_time DESC
+                LIMIT :size
+            """),
+            {"metric": metric, "size": LEADERBOARD_SIZE}
+        )
+    _bump_resource_version(conn, LEADERBOARDS_RESOURCE)
+
+def _update_leaderboards(conn, session_id, session_data):
+    """
+    Adds a newly saved session to every leaderboard it qualifies for and trims those boards back
+    to LEADERBOARD_SIZE. The leaderboards version only changes when a board actually changes.
+    """
+    boards = {
+        row['metric']: row for row in conn.execute(
+            sqlalchemy.text("""
+                SELECT metric, COUNT(*) AS entries, MIN(value) AS low, MAX(value) AS high
+                FROM leaderboard_entries
+                GROUP BY metric
+            """)
+        ).mappings()
+    }
+
+    changed = False
+    for metric, (column, direction, _) in LEADERBOARD_METRICS.items():
+        value = session_data.get(column)
+        if not value or value <= 0:
+            continue
+        board = boards.get(metric)
+        if board and board['entries'] >= LEADERBOARD_SIZE:
+            if (direction == "DESC" and value < board['low']) or (direction == "ASC" and value > board['high']):
+                continue
+        conn.execute(
+            sqlalchemy.text("""
+                INSERT INTO leaderboard_entries (metric, session_id, player_id, value, start_time)
+                VALUES (:metric, :session_id, :player_id, :value, :start_time)
+            """),
+            {
+                "metric": metric, "session_id": session_id, "player_id": session_data.get('player_id'),
+                "value": value, "start_time": session_data.get('start_time')
+            }
+        )
+        if board and board['entries'] >= LEADERBOARD_SIZE:
+            _trim_leaderboard(conn, metric)
+        changed = True
+
+    if changed:
+        _bump_resource_version(conn, LEADERBOARDS_RESOURCE)
+
+@read_only()
+def get_all_time_leaderboards(limit=10, conn=None):
+    """
+    Retrieves a dictionary of all-time leaderboards for various metrics (at most LEADERBOARD_SIZE entries each).
+    Reads the precomputed leaderboard store in one query rather than sorting all sessions per metric.
+    """
+    limit = min(limit, LEADERBOARD_SIZE)
+    leaderboards = {metric: [] for metric in LEADERBOARD_METRICS}
+    order_by = " ".join(
+        f"WHEN '{metric}' THEN {'-' if direction == 'DESC' else ''}e.value"
+        for metric, (_, direction, _) in LEADERBOARD_METRICS.items()
+    )
+    with _connect(conn) as conn:
+        rows = conn.execute(
+            sqlalchemy.text(f"""
+                SELECT e.metric, e.value, p.name, e.start_time
+                FROM leaderboard_entries e JOIN players p ON e.player_id = p.player_id
+                ORDER BY e.metric, CASE e.metric {order_by} END, e.start_time DESC
+            """)
+        ).mappings().fetchall()
 
+    for row in rows:
+        board = leaderboards.get(row['metric'])
+        if board is None or len(board) >= limit:
+            continue
+        column, _, value_type = LEADERBOARD_METRICS[row['metric']]
+        board.append({column: value_type(row['value']), "name": row['name'], "start_time": row['start_time']})
     return leaderboards
 
-def get_player_vs_player_duels(player1_id, player2_id):
+@read_only(player_arg="player1_id")
+def get_player_vs_player_duels(player1_id, player2_id, conn=None):
     """Retrieves the history of duels between two specific players."""
-    pool = get_db_connection()
-    with pool.connect() as conn:
-        # Duels where player1 is creator and player2 is invited, OR vice-versa
+    with _connect(conn) as conn:
+        # Each direction of the pair is its own lookup on idx_duels_pair
         result = conn.execute(
             sqlalchemy.text("""
                 SELECT
@@ -1716,8 +2634,11 @@ def get_player_vs_player_duels(player1_id, player2_id):
                 LEFT JOIN sessions s_invited ON d.invited_player_submitted_session_id = s_invited.session_id
                 JOIN players p_creator ON d.creator_id = p_creator.player_id
                 JOIN players p_invited ON d.invited_player_id = p_invited.player_id
-                WHERE (d.creator_id = :player1_id AND d.invited_player_id = :player2_id)
-                   OR (d.creator_id = :player2_id AND d.invited_player_id = :player1_id)
+                WHERE d.duel_id IN (
+                    SELECT duel_id FROM duels WHERE creator_id = :player1_id AND invited_player_id = :player2_id
+                    UNION ALL
+                    SELECT duel_id FROM duels WHERE creator_id = :player2_id AND invited_player_id = :player1_id
+                )
                 ORDER BY d.created_at DESC
             """),
             {"player1_id": player1_id, "player2_id": player2_id}
@@ -1732,109 +2653,202 @@ def get_player_vs_player_duels(player1_id, player2_id):
             duels_history.append(duel_dict)
         return duels_history
 
-def get_player_vs_player_leaderboard(player1_id, player2_id):
-    """Calculates the head-to-head win/loss record between two players."""
-    pool = get_db_connection()
-    with pool.connect() as conn:
-        # Count wins for player1 against player2
-        player1_wins = conn.execute(
+@read_only(player_arg="player1_id")
+def get_player_vs_player_leaderboard(player1_id, player2_id, conn=None):
+    """
+    Returns the head-to-head record between two players from their `rivalries` row,
+    which _determine_duel_winner keeps up to date.
+    """
+    low_id, high_id = _rivalry_key(player1_id, player2_id)
+    with _connect(conn) as conn:
+        row = conn.execute(
             sqlalchemy.text("""
-                SELECT COUNT(*) FROM duels
-                WHERE winner_id = :player1_id
-                AND (
-                    (creator_id = :player1_id AND invited_player_id = :player2_id) OR
-                    (creator_id = :player2_id AND invited_player_id = :player1_id)
-                )
-                AND status = 'completed'
+                SELECT
+                    (SELECT name FROM players WHERE player_id = :player1_id) AS player1_name,
+                    (SELECT name FROM players WHERE player_id = :player2_id) AS player2_name,
+                    r.low_wins, r.high_wins, r.total_duels, r.last_duel_id, r.last_duel_at,
+                    r.low_best_makes, r.high_best_makes
+                FROM (SELECT 1 AS one) pair
+                LEFT JOIN rivalries r ON r.low_player_id = :low_id AND r.high_player_id = :high_id
             """),
-            {"player1_id": player1_id, "player2_id": player2_id}
-        ).scalar_one_or_none() or 0
+            {"player1_id": player1_id, "player2_id": player2_id, "low_id": low_id, "high_id": high_id}
+        ).mappings().first()
 
-        # Count wins for player2 against player1
-        player2_wins = conn.execute(
-            sqlalchemy.text("""
-                SELECT COUNT(*) FROM duels
-                WHERE winner_id = :player2_id
-                AND (
-                    (creator_id = :player1_id AND invited_player_id = :player2_id) OR
-                    (creator_id = :player2_id AND invited_player_id = :player1_id)
-                )
-                AND status = 'completed'
-            """),
-            {"player2_id": player2_id, "player1_id": player1_id}
-        ).scalar_one_or_none() or 0
+    player1_is_low = player1_id == low_id
+    last_duel_at = row['last_duel_at']
+    return {
+        "player1_id": player1_id,
+        "player1_name": row['player1_name'],
+        "player1_wins": (row['low_wins'] if player1_is_low else row['high_wins']) or 0,
+        "player1_best_makes": row['low_best_makes'] if player1_is_low else row['high_best_makes'],
+        "player2_id": player2_id,
+        "player2_name": row['player2_name'],
+        "player2_wins": (row['high_wins'] if player1_is_low else row['low_wins']) or 0,
+        "player2_best_makes": row['high_best_makes'] if player1_is_low else row['low_best_makes'],
+        "total_completed_duels": row['total_duels'] or 0,
+        "last_duel_id": row['last_duel_id'],
+        "last_duel_at": last_duel_at.isoformat() if isinstance(last_duel_at, datetime) else last_duel_at
+    }
+
+# Standings are cached per league and checked against the league's resource version, which
+# changes whenever a submission or membership changes, so every worker sees fresh results.
+LEAGUE_CACHE_SIZE = 256
+_league_standings_cache = {}
+
+def _league_resource(league_id):
+    return f"league_{league_id}"
+
+def _compute_league_standings(conn, league_id):
+    """
+    Builds every league leaderboard and the points standings from one windowed query:
+    one row per member and submission, ranked per metric and totalled per player.
+    """
+    metric_ranks = ",\n".join(
+        f"ROW_NUMBER() OVER (ORDER BY CASE WHEN sub.{column} > 0 THEN 0 ELSE 1 END, sub.{column} {direction}, sub.start_time DESC) AS {metric}_rank"
+        for metric, (column, direction, _) in LEADERBOARD_METRICS.items()
+    )
+    metric_columns = ", ".join(f"sub.{column}" for column, _, _ in LEADERBOARD_METRICS.values())
+    rows = conn.execute(
+        sqlalchemy.text(f"""
+            SELECT
+                lm.player_id, p.name, sub.submission_id, sub.start_time, {metric_columns},
+                {metric_ranks},
+                SUM(COALESCE(sub.points_awarded, 0)) OVER (PARTITION BY lm.player_id) AS total_points,
+                COUNT(sub.submission_id) OVER (PARTITION BY lm.player_id) AS rounds_played
+            FROM league_members lm
+            JOIN players p ON lm.player_id = p.player_id
+            LEFT JOIN (
+                SELECT lrs.submission_id, lrs.player_id, lrs.points_awarded, s.start_time, {", ".join(f"s.{column}" for column, _, _ in LEADERBOARD_METRICS.values())}
+                FROM league_round_submissions lrs
+                JOIN league_rounds lr ON lrs.round_id = lr.round_id
+                JOIN sessions s ON lrs.session_id = s.session_id
+                WHERE lr.league_id = :league_id
+            ) sub ON sub.player_id = lm.player_id
+            WHERE lm.league_id = :league_id
+        """),
+        {"league_id": league_id}
+    ).mappings().fetchall()
+
+    boards = {metric: [] for metric in LEADERBOARD_METRICS}
+    totals = {}
+    for row in rows:
+        for metric, (column, _, _) in LEADERBOARD_METRICS.items():
+            if row['submission_id'] is not None and row[column] and row[column] > 0:
+                boards[metric].append((row[f'{metric}_rank'], {column: row[column], "name": row['name'], "start_time": row['start_time']}))
+        totals[row['player_id']] = {
+            "player_id": row['player_id'],
+            "name": row['name'],
+            "total_points": row['total_points'] or 0,
+            "rounds_played": row['rounds_played'],
+        }
 
-        # Count total completed duels between them
-        total_completed_duels = conn.execute(
-            sqlalchemy.text("""
-                SELECT COUNT(*) FROM duels
-                WHERE (
-                    (creator_id = :player1_id AND invited_player_id = :player2_id) OR
-                    (creator_id = :player2_id AND invited_player_id = :player1_id)
-                )
-                AND status = 'completed'
-            """),
-            {"player1_id": player1_id, "player2_id": player2_id}
-        ).scalar_one_or_none() or 0
+    standings = sorted(totals.values(), key=lambda entry: (-entry['total_points'], entry['name']))
+    for position, entry in enumerate(standings):
+        tied = position > 0 and entry['total_points'] == standings[position - 1]['total_points']
+        entry['rank'] = standings[position - 1]['rank'] if tied else position + 1
 
-        # Get player names
-        player1_name = conn.execute(sqlalchemy.text("SELECT name FROM players WHERE player_id = :player_id"), {"player_id": player1_id}).scalar_one_or_none()
-        player2_name = conn.execute(sqlalchemy.text("SELECT name FROM players WHERE player_id = :player_id"), {"player_id": player2_id}).scalar_one_or_none()
+    return {
+        "boards": {metric: [entry for _, entry in sorted(entries, key=lambda item: item[0])] for metric, entries in boards.items()},
+        "standings": standings,
+    }
 
-        return {
-            "player1_id": player1_id,
-            "player1_name": player1_name,
-            "player1_wins": player1_wins,
-            "player2_id": player2_id,
-            "player2_name": player2_name,
-            "player2_wins": player2_wins,
-            "total_completed_duels": total_completed_duels
-        }
+@read_only()
+def get_league_standings(league_id, conn=None):
+    """
+    Returns {"boards": {metric: [...]}, "standings": [...]} for a league, recomputing only when
+    the league's version has changed since it was cached.
+    """
+    with _connect(conn) as conn:
+        version = get_resource_version(_league_resource(league_id), conn)
+        cached = _league_standings_cache.get(league_id)
+        if cached and cached[0] == version:
+            return cached[1]
+
+        result = _compute_league_standings(conn, league_id)
 
-def get_league_leaderboard(league_id, limit=10):
+    if len(_league_standings_cache) >= LEAGUE_CACHE_SIZE:
+        _league_standings_cache.pop(next(iter(_league_standings_cache)), None)
+    _league_standings_cache[league_id] = (version, result)
+    return result
+
+def get_league_leaderboard(league_id, limit=10, conn=None):
     """
     Retrieves leaderboards for a specific league, considering only sessions
-    submitted to that league's rounds.
+    submitted to that league's rounds, plus the members' points standings.
     """
-    pool = get_db_connection()
-    leaderboards = {}
-    with pool.connect() as conn:
-        base_query = """
-            FROM sessions s
-            JOIN league_round_submissions lrs ON s.session_id = lrs.session_id
-            JOIN league_rounds lr ON lrs.round_id = lr.round_id
-            JOIN players p ON s.player_id = p.player_id
-            WHERE lr.league_id = :league_id
-        """
-
-        # Top Makes
-        leaderboards['top_makes'] = [dict(row) for row in conn.execute(
-            sqlalchemy.text(f"SELECT s.total_makes, p.name, s.start_time {base_query} AND s.total_makes > 0 ORDER BY s.total_makes DESC LIMIT :limit"),
-            {"league_id": league_id, "limit": limit}
-        ).mappings().fetchall()]
-
-        # Top Streaks
-        leaderboards['top_streaks'] = [dict(row) for row in conn.execute(
-            sqlalchemy.text(f"SELECT s.best_streak, p.name, s.start_time {base_query} AND s.best_streak > 0 ORDER BY s.best_streak DESC LIMIT :limit"),
-            {"league_id": league_id, "limit": limit}
-        ).mappings().fetchall()]
-
-        # Top Makes per Minute
-        leaderboards['top_makes_per_minute'] = [dict(row) for row in conn.execute(
-            sqlalchemy.text(f"SELECT s.makes_per_minute, p.name, s.start_time {base_query} AND s.makes_per_minute > 0 ORDER BY s.makes_per_minute DESC LIMIT :limit"),
-            {"league_id": league_id, "limit": limit}
-        ).mappings().fetchall()]
-
-        # Fastest 21 Makes
-        leaderboards['fastest_21'] = [dict(row) for row in conn.execute(
-            sqlalchemy.text(f"SELECT s.fastest_21_makes, p.name, s.start_time {base_query} AND s.fastest_21_makes > 0 ORDER BY s.fastest_21_makes ASC LIMIT :limit"),
-            {"league_id": league_id, "limit": limit}
-        ).mappings().fetchall()]
-def update_league_settings(league_id, editor_id, new_settings):
+    standings = get_league_standings(league_id, conn)
+    leaderboards = {metric: entries[:limit] for metric, entries in standings['boards'].items()}
+    leaderboards['standings'] = standings['standings']
+    return leaderboards
+
+def submit_session_to_league_round(round_id, player_id, session_id, conn=None):
+    """
+    Submits a member's session (scored by total makes) to an active league round and re-awards the
+    round's points by rank: last place earns 1 point, each place above earns one more, ties share.
+    """
+    with _connect(conn) as conn:
+        with _begin(conn):
+            round_sql = "SELECT league_id, status FROM league_rounds WHERE round_id = :round_id"
+            if conn.dialect.name == "postgresql":
+                # Serializes submissions per round, so each re-award ranks every committed submission.
+                round_sql += " FOR UPDATE"
+            league_round = conn.execute(sqlalchemy.text(round_sql), {"round_id": round_id}).mappings().first()
+            if not league_round:
+                raise ValueError("League round not found.")
+            if league_round['status'] != 'active':
+                raise ValueError("This league round is not active.")
+
+            league_id = league_round['league_id']
+            is_member = conn.execute(
+                sqlalchemy.text("SELECT 1 FROM league_members WHERE league_id = :league_id AND player_id = :player_id"),
+                {"league_id": league_id, "player_id": player_id}
+            ).first()
+            if not is_member:
+                raise ValueError("You are not a member of this league.")
+
+            session = conn.execute(
+                sqlalchemy.text("SELECT total_makes FROM sessions WHERE session_id = :session_id AND player_id = :player_id"),
+                {"session_id": session_id, "player_id": player_id}
+            ).mappings().first()
+            if not session:
+                raise ValueError("Session not found.")
+
+            inserted = conn.execute(
+                sqlalchemy.text("""
+                    INSERT INTO league_round_submissions (round_id, player_id, session_id, score, points_awarded, submitted_at)
+                    VALUES (:round_id, :player_id, :session_id, :score, 0, :submitted_at)
+                    ON CONFLICT (round_id, player_id) DO NOTHING
+                """),
+                {
+                    "round_id": round_id, "player_id": player_id, "session_id": session_id,
+                    "score": session['total_makes'] or 0, "submitted_at": datetime.utcnow()
+                }
+            ).rowcount
+            if not inserted:
+                raise ValueError("You have already submitted a session to this round.")
+
+            scores = conn.execute(
+                sqlalchemy.text("SELECT submission_id, score FROM league_round_submissions WHERE round_id = :round_id ORDER BY score DESC"),
+                {"round_id": round_id}
+            ).mappings().fetchall()
+            awards = []
+            for position, row in enumerate(scores):
+                tied = position > 0 and row['score'] == scores[position - 1]['score']
+                points = awards[-1]['points'] if tied else len(scores) - position
+                awards.append({"submission_id": row['submission_id'], "points": points})
+            conn.execute(
+                sqlalchemy.text("UPDATE league_round_submissions SET points_awarded = :points WHERE submission_id = :submission_id"),
+                awards
+            )
+
+            _bump_resource_version(conn, _league_resource(league_id))
+            logger.info(f"Player {player_id} submitted session {session_id} to league round {round_id}.")
+            return {"success": True, "message": "Session submitted successfully."}
+
+def update_league_settings(league_id, editor_id, new_settings, conn=None):
     """Updates league settings, only if the editor is the creator and the league is in 'registering' state."""
-    pool = get_db_connection()
-    with pool.connect() as conn:
-        with conn.begin() as trans:
+    with _connect(conn) as conn:
+        with _begin(conn):
             # Step 1: Verify permissions and status
             league = conn.execute(
                 sqlalchemy.text("SELECT creator_id, status FROM leagues WHERE league_id = :id"),
@@ -1849,7 +2863,7 @@ def update_league_settings(league_id, editor_id, new_settings):
                 raise ValueError("League settings can only be edited before the league starts.")
 
             # Step 2: Update league settings and start time
-            player_info = get_player_info(editor_id)
+            player_info = get_player_info(editor_id, conn)
             player_timezone_str = player_info.get('timezone', 'UTC') if player_info else 'UTC'
             player_timezone = pytz.timezone(player_timezone_str)
             
@@ -1866,6 +2880,7 @@ def update_league_settings(league_id, editor_id, new_settings):
 
             # Step 3: Delete old rounds and recreate them
             conn.execute(sqlalchemy.text("DELETE FROM league_rounds WHERE league_id = :league_id"), {"league_id": league_id})
+            _bump_resource_version(conn, _league_resource(league_id))
             
             # Re-create rounds based on new settings
             num_rounds = new_settings.get('num_rounds', 4)
@@ -1877,11 +2892,10 @@ def update_league_settings(league_id, editor_id, new_settings):
             logger.info(f"League {league_id} settings updated by creator {editor_id}.")
             return True
 
-def delete_league(league_id, deleter_id):
+def delete_league(league_id, deleter_id, conn=None):
     """Deletes a league, only if the deleter is the creator and the league is in 'registering' state."""
-    pool = get_db_connection()
-    with pool.connect() as conn:
-        with conn.begin() as trans:
+    with _connect(conn) as conn:
+        with _begin(conn):
             try:
                 # Step 1: Verify permissions and status
                 league = conn.execute(
@@ -1921,6 +2935,7 @@ def delete_league(league_id, deleter_id):
                     sqlalchemy.text("DELETE FROM leagues WHERE league_id = :league_id"),
                     {"league_id": league_id}
                 )
+                _bump_resource_version(conn, _league_resource(league_id))
 
                 logger.info(f"League '{league['name']}' (ID: {league_id}) deleted by creator {deleter_id}.")
                 return True
@@ -1929,11 +2944,9 @@ def delete_league(league_id, deleter_id):
                 logger.error(f"Failed to delete league {league_id}: {e}")
                 raise
 
-    return leaderboards
-
 # Password Recovery Functions
 
-def create_password_reset_token(player_id):
+def create_password_reset_token(player_id, conn=None):
     """Creates a password reset token for a player."""
     import secrets
     import string
@@ -1945,9 +2958,8 @@ def create_password_reset_token(player_id):
     # Token expires in 1 hour
     expires_at = datetime.utcnow() + timedelta(hours=1)
     
-    pool = get_db_connection()
-    with pool.connect() as conn:
-        with conn.begin():
+    with _connect(conn) as conn:
+        with _begin(conn):
             # Invalidate any existing tokens for this player
             conn.execute(
                 sqlalchemy.text("UPDATE password_reset_tokens SET used = TRUE WHERE player_id = :player_id AND used = FALSE"),
@@ -1971,10 +2983,9 @@ def create_password_reset_token(player_id):
     logger.info(f"Created password reset token for player {player_id}")
     return token
 
-def validate_password_reset_token(token):
+def validate_password_reset_token(token, conn=None):
     """Validates a password reset token and returns the player_id if valid."""
-    pool = get_db_connection()
-    with pool.connect() as conn:
+    with _connect(conn) as conn:
         result = conn.execute(
             sqlalchemy.text("""
                 SELECT player_id, expires_at, used 
@@ -2002,7 +3013,7 @@ def validate_password_reset_token(token):
             
         return result['player_id']
 
-def use_password_reset_token(token, new_password):
+def use_password_reset_token(token, new_password, conn=None):
     """Uses a password reset token to set a new password."""
     player_id = validate_password_reset_token(token)
     if not player_id:
@@ -2011,9 +3022,8 @@ def use_password_reset_token(token, new_password):
     # Hash the new password
     password_hash = bcrypt.hashpw(new_password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
     
-    pool = get_db_connection()
-    with pool.connect() as conn:
-        with conn.begin():
+    with _connect(conn) as conn:
+        with _begin(conn):
             # Update the player's password
             conn.execute(
                 sqlalchemy.text("UPDATE players SET password_hash = :password_hash WHERE player_id = :player_id"),
@@ -2029,10 +3039,9 @@ def use_password_reset_token(token, new_password):
     logger.info(f"Password reset completed for player {player_id}")
     return True
 
-def get_player_by_email(email):
+def get_player_by_email(email, conn=None):
     """Gets a player by their email address."""
-    pool = get_db_connection()
-    with pool.connect() as conn:
+    with _connect(conn) as conn:
         result = conn.execute(
             sqlalchemy.text("SELECT player_id, email, name FROM players WHERE email = :email"),
             {"email": email}
@@ -2042,11 +3051,10 @@ def get_player_by_email(email):
 
 # Fundraising Functions
 
-def create_fundraiser(creator_id, fundraiser_data):
+def create_fundraiser(creator_id, fundraiser_data, conn=None):
     """Creates a new fundraiser."""
-    pool = get_db_connection()
-    with pool.connect() as conn:
-        with conn.begin():
+    with _connect(conn) as conn:
+        with _begin(conn):
             result = conn.execute(
                 sqlalchemy.text("""
                     INSERT INTO fundraisers (
@@ -2071,14 +3079,14 @@ def create_fundraiser(creator_id, fundraiser_data):
                 }
             )
             fundraiser_id = result.scalar()
+            _bump_resource_version(conn, FUNDRAISERS_RESOURCE)
     
     logger.info(f"Created fundraiser {fundraiser_id} by player {creator_id}")
     return fundraiser_id
 
-def get_fundraisers():
+def get_fundraisers(conn=None):
     """Gets all active fundraisers."""
-    pool = get_db_connection()
-    with pool.connect() as conn:
+    with _connect(conn) as conn:
         results = conn.execute(
             sqlalchemy.text("""
                 SELECT f.*, p.name as creator_name
@@ -2100,10 +3108,9 @@ def get_fundraisers():
         
         return fundraisers
 
-def get_fundraiser(fundraiser_id):
+def get_fundraiser(fundraiser_id, conn=None):
     """Gets a specific fundraiser by ID."""
-    pool = get_db_connection()
-    with pool.connect() as conn:
+    with _connect(conn) as conn:
         result = conn.execute(
             sqlalchemy.text("""
                 SELECT f.*, p.name as creator_name
@@ -2125,11 +3132,10 @@ def get_fundraiser(fundraiser_id):
         
         return fundraiser
 
-def create_pledge(fundraiser_id, pledger_id, pledge_data):
+def create_pledge(fundraiser_id, pledger_id, pledge_data, conn=None):
     """Creates a pledge for a fundraiser."""
-    pool = get_db_connection()
-    with pool.connect() as conn:
-        with conn.begin():
+    with _connect(conn) as conn:
+        with _begin(conn):
             result = conn.execute(
                 sqlalchemy.text("""
                     INSERT INTO pledges (
@@ -2147,14 +3153,14 @@ def create_pledge(fundraiser_id, pledger_id, pledge_data):
                 }
             )
             pledge_id = result.scalar()
+            _bump_resource_version(conn, FUNDRAISERS_RESOURCE)
     
     logger.info(f"Created pledge {pledge_id} for fundraiser {fundraiser_id} by player {pledger_id}")
     return pledge_id
 
-def get_fundraiser_pledges(fundraiser_id):
+def get_fundraiser_pledges(fundraiser_id, conn=None):
     """Gets all pledges for a fundraiser."""
-    pool = get_db_connection()
-    with pool.connect() as conn:
+    with _connect(conn) as conn:
         results = conn.execute(
             sqlalchemy.text("""
                 SELECT p.*, pl.name as pledger_name
@@ -2175,4 +3181,203 @@ def get_fundraiser_pledges(fundraiser_id):
                     pledge[key] = value.isoformat()
             pledges.append(pledge)
         
-        return pledges
\ No newline at end of file
+        return pledges
+# --- Background jobs ---
+# Job state lives in background_jobs so work survives restarts; background_jobs.py runs it.
+_job_listeners = []
+
+def add_job_listener(callback):
+    """Registers callback(job_id), called after a newly enqueued job commits."""
+    _job_listeners.append(callback)
+
+def _publish_job(job_id):
+    for callback in _job_listeners:
+        try:
+            callback(job_id)
+        except Exception as e:
+            logger.error(f"Job listener failed for job {job_id}: {e}", exc_info=True)
+
+def enqueue_job(job_type, payload=None, dedupe_key=None, conn=None):
+    """
+    Persists a queued job and returns its id, or None when a job with the same `dedupe_key`
+    already exists. Listeners are told about the job once the enqueueing transaction commits.
+    """
+    with _connect(conn) as conn:
+        with _begin(conn):
+            insert_sql = """
+                INSERT INTO background_jobs (job_type, dedupe_key, payload, status, created_at)
+                VALUES (:job_type, :dedupe_key, :payload, 'queued', :created_at)
+                ON CONFLICT (dedupe_key) DO NOTHING
+            """
+            if conn.dialect.name == "postgresql":
+                insert_sql += " RETURNING job_id"
+            result = conn.execute(
+                sqlalchemy.text(insert_sql),
+                {
+                    "job_type": job_type,
+                    "dedupe_key": dedupe_key,
+                    "payload": json.dumps(payload) if payload is not None else None,
+                    "created_at": datetime.utcnow()
+                }
+            )
+            if conn.dialect.name == "postgresql":
+                job_id = result.scalar()
+            else:
+                job_id = result.lastrowid if result.rowcount else None
+            if job_id is not None:
+                _after_commit(conn, lambda: _publish_job(job_id))
+    return job_id
+
+def claim_job(job_id, conn=None):
+    """
+    Marks a queued job as running and returns {job_id, job_type, payload, attempts, created_at},
+    or None if another worker already claimed it.
+    """
+    with _connect(conn) as conn:
+        with _begin(conn):
+            claimed = conn.execute(
+                sqlalchemy.text("""
+                    UPDATE background_jobs SET status = 'running', started_at = :now, attempts = attempts + 1
+                    WHERE job_id = :job_id AND status = 'queued'
+                """),
+                {"job_id": job_id, "now": datetime.utcnow()}
+            ).rowcount
+            if not claimed:
+                return None
+            job = dict(conn.execute(
+                sqlalchemy.text("SELECT job_id, job_type, payload, attempts, created_at FROM background_jobs WHERE job_id = :job_id"),
+                {"job_id": job_id}
+            ).mappings().first())
+    job['payload'] = _load_json_field(job['payload'], None)
+    if isinstance(job['created_at'], str):
+        job['created_at'] = datetime.fromisoformat(job['created_at'])
+    return job
+
+def finish_job(job_id, error=None, retry=False, conn=None):
+    """Records a job's outcome: done, failed with `error`, or back to queued when `retry` is set."""
+    status = 'done' if error is None else ('queued' if retry else 'failed')
+    with _connect(conn) as conn:
+        with _begin(conn):
+            conn.execute(
+                sqlalchemy.text("""
+                    UPDATE background_jobs SET status = :status, last_error = :error, finished_at = :now
+                    WHERE job_id = :job_id
+                """),
+                {"job_id": job_id, "status": status, "error": error, "now": datetime.utcnow()}
+            )
+
+def get_queued_job_ids(limit, conn=None):
+    """Returns up to `limit` queued job ids, oldest first."""
+    with _connect(conn) as conn:
+        return list(conn.execute(
+            sqlalchemy.text("SELECT job_id FROM background_jobs WHERE status = 'queued' ORDER BY job_id LIMIT :limit"),
+            {"limit": limit}
+        ).scalars())
+
+def requeue_stale_jobs(timeout_seconds, conn=None):
+    """Returns jobs left running for longer than `timeout_seconds` (e.g. by a worker that died) to the queue."""
+    with _connect(conn) as conn:
+        with _begin(conn):
+            return conn.execute(
+                sqlalchemy.text("""
+                    UPDATE background_jobs SET status = 'queued', last_error = 'Timed out while running'
+                    WHERE status = 'running' AND started_at < :cutoff
+                """),
+                {"cutoff": datetime.utcnow() - timedelta(seconds=timeout_seconds)}
+            ).rowcount
+
+def prune_finished_jobs(retention_days, conn=None):
+    """Deletes jobs that finished more than `retention_days` ago, freeing their dedupe keys."""
+    with _connect(conn) as conn:
+        with _begin(conn):
+            return conn.execute(
+                sqlalchemy.text("DELETE FROM background_jobs WHERE status IN ('done', 'failed') AND finished_at < :cutoff"),
+                {"cutoff": datetime.utcnow() - timedelta(days=retention_days)}
+            ).rowcount
+
+def get_job_counts(conn=None):
+    """Returns {status: count} over the persisted jobs."""
+    with _connect(conn) as conn:
+        rows = conn.execute(sqlalchemy.text("SELECT status, COUNT(*) AS total FROM background_jobs GROUP BY status")).mappings()
+        return {row['status']: row['total'] for row in rows}
+
+# --- Scheduler leases ---
+# One row per scheduler job in scheduled_jobs. A worker may run a job only after claiming it: the claim
+# moves next_run_at forward and takes a lease, so one of N workers runs each due job. On PostgreSQL a
+# session advisory lock is held for the whole run as well, so a slow run can never overlap another.
+SCHEDULER_LOCK_NAMESPACE = 7041978
+SCHEDULER_LEASE_SECONDS = int(os.environ.get("SCHEDULER_LEASE_SECONDS", "900"))
+
+def _scheduler_lock_key(job_name):
+    return zlib.crc32(job_name.encode()) & 0x7fffffff
+
+def claim_scheduled_job(job_name, interval_seconds, owner, conn, force=False):
+    """
+    Claims `job_name` for one run if it is due (or `force`) and not leased by a live run. `conn` must be a dedicated
+    connection outside a transaction; on PostgreSQL it keeps the job's advisory lock until release_scheduled_job.
+    """
+    now = datetime.utcnow()
+    if conn.dialect.name == "postgresql":
+        locked = conn.execute(
+            sqlalchemy.text("SELECT pg_try_advisory_lock(:namespace, :key)"),
+            {"namespace": SCHEDULER_LOCK_NAMESPACE, "key": _scheduler_lock_key(job_name)}
+        ).scalar()
+        conn.commit()
+        if not locked:
+            return False
+    with conn.begin():
+        conn.execute(
+            sqlalchemy.text("INSERT INTO scheduled_jobs (job_name, next_run_at) VALUES (:job_name, :now) ON CONFLICT (job_name) DO NOTHING"),
+            {"job_name": job_name, "now": now}
+        )
+        claimed = conn.execute(
+            sqlalchemy.text("""
+                UPDATE scheduled_jobs
+                SET next_run_at = :next_run_at, lease_owner = :owner, last_started_at = :now, run_count = run_count + 1
+                WHERE job_name = :job_name AND (:force OR next_run_at IS NULL OR next_run_at <= :now)
+                  AND (lease_owner IS NULL OR last_started_at <= :lease_cutoff)
+            """),
+            {
+                "job_name": job_name, "owner": owner, "now": now, "force": force,
+                "next_run_at": now + timedelta(seconds=interval_seconds),
+                "lease_cutoff": now - timedelta(seconds=SCHEDULER_LEASE_SECONDS)
+            }
+        ).rowcount == 1
+    if not claimed:
+        _unlock_scheduled_job(job_name, conn)
+    return claimed
+
+def release_scheduled_job(job_name, duration_ms, rows, error, conn):
+    """Records a claimed run's duration, rows affected and error, and releases its lease and lock."""
+    with conn.begin():
+        conn.execute(
+            sqlalchemy.text("""
+                UPDATE scheduled_jobs
+                SET lease_owner = NULL, last_finished_at = :now, last_duration_ms = :duration_ms,
+                    last_rows = :rows, last_error = :error
+                WHERE job_name = :job_name
+            """),
+            {"job_name": job_name, "now": datetime.utcnow(), "duration_ms": duration_ms, "rows": rows, "error": error}
+        )
+    _unlock_scheduled_job(job_name, conn)
+
+def _unlock_scheduled_job(job_name, conn):
+    if conn.dialect.name == "postgresql":
+        conn.execute(
+            sqlalchemy.text("SELECT pg_advisory_unlock(:namespace, :key)"),
+            {"namespace": SCHEDULER_LOCK_NAMESPACE, "key": _scheduler_lock_key(job_name)}
+        )
+        conn.commit()
+
+def get_scheduled_job_runs(conn=None):
+    """Returns each scheduler job's last run: start, finish, duration, rows affected, error and run count."""
+    with _connect(conn) as conn:
+        rows = conn.execute(sqlalchemy.text("SELECT * FROM scheduled_jobs ORDER BY job_name")).mappings().all()
+    runs = {}
+    for row in rows:
+        run = dict(row)
+        for key, value in run.items():
+            if isinstance(value, datetime):
+                run[key] = value.isoformat()
+        runs[run.pop('job_name')] = run
+    return runs
@@ -0,0 +1,48 @@
+"""
+Gunicorn settings for the Proof of Putt API.
+
+Run `python manage.py migrate` once per deploy; workers never touch the schema. The app is
+preloaded in the master so workers fork ready to serve, and each worker builds its own
+database engine after fork, its own background job workers and its own scheduler (scheduled
+jobs are claimed in the database, so each due job still runs on one worker). Worker boot time is logged and
+reported by /health.
+
+GUNICORN_WORKER_CLASS=gevent selects the cooperative serving mode (see async_mode), in which
+each worker holds up to GUNICORN_WORKER_CONNECTIONS concurrent connections.
+"""
+
+import os
+import time
+
+import async_mode
+
+bind = os.environ.get("GUNICORN_BIND", f"0.0.0.0:{os.environ.get('PORT', '5001')}")
+workers = int(os.environ.get("WEB_CONCURRENCY", "2"))
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "sync")
+preload_app = True
+
+if async_mode.is_async_worker(worker_class):
+    # Patch before the app is preloaded so every module sees cooperative sockets and locks.
+    async_mode.patch()
+    worker_connections = int(os.environ.get("GUNICORN_WORKER_CONNECTIONS", "1000"))
+
+
+def post_fork(server, worker):
+    import data_manager
+
+    worker.boot_started = time.perf_counter()
+    # Never reuse connections inherited from the master process.
+    data_manager.reset_db_connection()
+
+
+def post_worker_init(worker):
+    from api import record_worker_boot
+    import background_jobs
+    import scheduler
+
+    boot_ms = (time.perf_counter() - worker.boot_started) * 1000
+    record_worker_boot(boot_ms)
+    # Each worker runs its own bounded job pool; queued jobs from before a restart are picked up here.
+    background_jobs.start()
+    scheduler.start()
+    worker.log.info(f"Worker {worker.pid} booted in {boot_ms:.1f} ms")
@@ -0,0 +1,92 @@
+"""
+One-time database management commands, run once per deploy rather than by every API worker.
+
+    python manage.py migrate   # apply pending schema migrations, then seed
+    python manage.py seed      # ensure the default player exists
+    python manage.py status    # show the applied and latest schema versions
+    python manage.py run-job <name>   # run one scheduler job now (see scheduler.JOBS)
+    python manage.py backfill-putt-data   # pack existing sessions' putt_list into putt_data
+    python manage.py clear-putt-lists     # then drop the JSON putt_list where putt_data verifies
+"""
+
+import argparse
+import logging
+import sys
+
+from dotenv import load_dotenv
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+load_dotenv()
+
+import data_manager
+import migrations
+
+
+def migrate():
+    applied = migrations.run_migrations(data_manager.get_db_connection())
+    if applied:
+        print(f"Applied migrations: {', '.join(str(version) for version in applied)}")
+    else:
+        print(f"Database is already at version {migrations.LATEST_VERSION}.")
+    data_manager.seed_default_user()
+    return 0
+
+
+def seed():
+    data_manager.seed_default_user()
+    print("Default player is present.")
+    return 0
+
+
+def status():
+    with data_manager.get_db_connection().connect() as conn:
+        current_version = migrations.get_schema_version(conn)
+    print(f"Schema version: {current_version} (latest: {migrations.LATEST_VERSION})")
+    for version, description, _ in migrations.MIGRATIONS:
+        state = "applied" if version <= current_version else "pending"
+        print(f"  {version:>3}  {state:<8} {description}")
+    return 0 if current_version >= migrations.LATEST_VERSION else 1
+
+
+def run_job(name):
+    import scheduler
+
+    if name not in scheduler.JOBS_BY_NAME:
+        print(f"Unknown job '{name}'. Jobs: {', '.join(scheduler.JOBS_BY_NAME)}")
+        return 2
+    rows = scheduler.run_job(name, force=True)
+    if rows is None:
+        print(f"{name} is already running elsewhere.")
+        return 1
+    run = data_manager.get_scheduled_job_runs().get(name, {})
+    if run.get('last_error'):
+        print(f"{name} failed: {run['last_error']}")
+        return 1
+    print(f"{name}: {rows} rows affected in {run.get('last_duration_ms')} ms.")
+    return 0
+
+
+def backfill_putt_data():
+    packed = data_manager.backfill_putt_data()
+    print(f"Packed putt lists for {packed} sessions.")
+    return 0
+
+
+def clear_putt_lists():
+    cleared, kept = data_manager.clear_packed_putt_lists()
+    print(f"Cleared putt_list for {cleared} sessions; kept {kept} whose packed putts did not verify.")
+    return 0
+
+
+if __name__ == "__main__":
+    commands = {"migrate": migrate, "seed": seed, "status": status, "run-job": run_job,
+                "backfill-putt-data": backfill_putt_data, "clear-putt-lists": clear_putt_lists}
+    parser = argparse.ArgumentParser(description="Proof of Putt database management.")
+    parser.add_argument("command", choices=commands.keys(), help="Command to run.")
+    parser.add_argument("job", nargs="?", help="Job name for run-job.")
+    args = parser.parse_args()
+    if args.command == "run-job":
+        if not args.job:
+            parser.error("run-job needs a job name")
+        sys.exit(run_job(args.job))
+    sys.exit(commands[args.command]())
@@ -0,0 +1,823 @@
+"""
+Versioned schema migrations for the Proof of Putt database.
+
+Each migration runs exactly once, in order, inside its own transaction, and the applied
+version is recorded in the schema_version table. Starting the API therefore costs a single
+version check once the database is current.
+"""
+
+import logging
+from datetime import datetime
+
+import sqlalchemy
+from sqlalchemy.exc import OperationalError, ProgrammingError
+
+import data_manager
+
+logger = logging.getLogger('debug_logger')
+
+# Arbitrary key for the PostgreSQL advisory lock that serializes concurrent migration runs.
+MIGRATION_LOCK_KEY = 7041977
+
+
+def _column_types(db_type):
+    """Returns the dialect-specific column types used in the DDL below."""
+    return {
+        "id_type": "SERIAL PRIMARY KEY" if db_type == "postgresql" else "INTEGER PRIMARY KEY",
+        "timestamp_type": "TIMESTAMP WITH TIME ZONE" if db_type == "postgresql" else "DATETIME",
+        "default_timestamp": "CURRENT_TIMESTAMP",
+    }
+
+
+def _baseline_schema(conn, db_type):
+    """
+    The schema as previously created by initialize_database on every startup.
+    Every statement is idempotent, so databases created before versioning simply adopt version 1.
+    """
+    types = _column_types(db_type)
+    player_id_type = types["id_type"]
+    session_id_type = types["id_type"]
+    timestamp_type = types["timestamp_type"]
+    default_timestamp = types["default_timestamp"]
+
+    conn.execute(sqlalchemy.text(f'''
+            CREATE TABLE IF NOT EXISTS players (
+                player_id {player_id_type},
+                email TEXT UNIQUE NOT NULL,
+                name TEXT NOT NULL,
+                password_hash TEXT NOT NULL,
+                created_at {timestamp_type} DEFAULT {default_timestamp},
+                subscription_status TEXT DEFAULT 'free',
+                zaprite_subscription_id TEXT,
+                timezone TEXT DEFAULT 'UTC',
+                x_url TEXT,
+                tiktok_url TEXT,
+                website_url TEXT,
+                notification_preferences TEXT,
+                calibration_data TEXT
+            )
+    '''))
+
+    if db_type == "sqlite":
+        columns_to_add = {
+            "x_url": "TEXT",
+            "tiktok_url": "TEXT",
+            "website_url": "TEXT",
+            "notification_preferences": "TEXT",
+            "calibration_data": "TEXT"
+        }
+        for column, col_type in columns_to_add.items():
+            try:
+                conn.execute(sqlalchemy.text(f"ALTER TABLE players ADD COLUMN {column} {col_type}"))
+                logger.info(f"Added column '{column}' to 'players' table.")
+            except OperationalError as e:
+                if "duplicate column name" in str(e).lower():
+                    logger.info(f"Column '{column}' already exists in 'players' table. Skipping.")
+                else:
+                    logger.error(f"Error adding column '{column}' to 'players' table: {e}")
+
+    elif db_type == "postgresql":
+        # Check if the column exists first to avoid a failing statement within the transaction
+        inspector = sqlalchemy.inspect(conn)
+        columns = [c['name'] for c in inspector.get_columns('players')]
+        if 'calibration_data' not in columns:
+            conn.execute(sqlalchemy.text("ALTER TABLE players ADD COLUMN calibration_data TEXT"))
+            logger.info("Migration: Added column 'calibration_data' to 'players' table.")
+        else:
+            logger.info("Migration: Column 'calibration_data' already exists in 'players' table. Skipping.")
+
+    conn.execute(sqlalchemy.text(f'''
+            CREATE TABLE IF NOT EXISTS sessions (
+                session_id {session_id_type},
+                player_id INTEGER NOT NULL,
+                start_time {timestamp_type} DEFAULT {default_timestamp},
+                end_time {timestamp_type},
+                status TEXT,
+                total_putts INTEGER,
+                total_makes INTEGER,
+                total_misses INTEGER,
+                best_streak INTEGER,
+                fastest_21_makes REAL,
+                putts_per_minute REAL,
+                makes_per_minute REAL,
+                most_makes_in_60_seconds INTEGER,
+                session_duration REAL,
+                putt_list TEXT,
+                makes_by_category TEXT,
+                misses_by_category TEXT,
+                {data_manager.SESSION_ANALYTICS_COLUMNS_DDL},
+                FOREIGN KEY (player_id) REFERENCES players (player_id) ON DELETE CASCADE
+            )
+    '''))
+
+    # Add the pre-aggregated analytics columns to existing sessions tables.
+    # They are left NULL (no default) so backfill_session_analytics can find unprocessed rows.
+    inspector = sqlalchemy.inspect(conn)
+    existing_session_columns = [c['name'] for c in inspector.get_columns('sessions')]
+    for column, col_type in data_manager.SESSION_ANALYTICS_COLUMNS.items():
+        if column not in existing_session_columns:
+            conn.execute(sqlalchemy.text(f"ALTER TABLE sessions ADD COLUMN {column} {col_type}"))
+            logger.info(f"Migration: Added column '{column}' to 'sessions' table.")
+
+    # Per-session make/miss detail counts (e.g. 'HOLE: TOP - LEFT', 'RETURN: LEFT - CENTER').
+    # The detail keys are open-ended, so they live in a narrow side table rather than columns.
+    conn.execute(sqlalchemy.text('''
+            CREATE TABLE IF NOT EXISTS session_category_counts (
+                session_id INTEGER NOT NULL,
+                player_id INTEGER NOT NULL,
+                kind TEXT NOT NULL,
+                category TEXT NOT NULL,
+                count INTEGER NOT NULL,
+                PRIMARY KEY (session_id, kind, category),
+                FOREIGN KEY (session_id) REFERENCES sessions (session_id) ON DELETE CASCADE,
+                FOREIGN KEY (player_id) REFERENCES players (player_id) ON DELETE CASCADE
+            )
+    '''))
+    conn.execute(sqlalchemy.text(
+        "CREATE INDEX IF NOT EXISTS idx_session_category_counts_player ON session_category_counts (player_id, kind, category)"
+    ))
+
+    # One row per putt, with classifications stored as small integer codes (see putt_codes.py).
+    conn.execute(sqlalchemy.text('''
+            CREATE TABLE IF NOT EXISTS putts (
+                session_id INTEGER NOT NULL,
+                putt_index INTEGER NOT NULL,
+                player_id INTEGER NOT NULL,
+                putt_time REAL,
+                classification SMALLINT NOT NULL,
+                detail SMALLINT NOT NULL,
+                entry_roi SMALLINT NOT NULL,
+                exit_roi SMALLINT NOT NULL,
+                PRIMARY KEY (session_id, putt_index),
+                FOREIGN KEY (session_id) REFERENCES sessions (session_id) ON DELETE CASCADE,
+                FOREIGN KEY (player_id) REFERENCES players (player_id) ON DELETE CASCADE
+            )
+    '''))
+    conn.execute(sqlalchemy.text(
+        "CREATE INDEX IF NOT EXISTS idx_putts_player_category ON putts (player_id, classification, detail, entry_roi)"
+    ))
+    conn.execute(sqlalchemy.text(
+        "CREATE INDEX IF NOT EXISTS idx_putts_category ON putts (classification, detail, entry_roi)"
+    ))
+
+    conn.execute(sqlalchemy.text(f'''
+            CREATE TABLE IF NOT EXISTS leagues (
+                league_id {session_id_type},
+                creator_id INTEGER NOT NULL,
+                name TEXT NOT NULL,
+                description TEXT,
+                privacy_type TEXT NOT NULL DEFAULT 'private',
+                status TEXT NOT NULL DEFAULT 'registering',
+                settings TEXT,
+                start_time {timestamp_type},
+                created_at {timestamp_type} DEFAULT {default_timestamp},
+                FOREIGN KEY (creator_id) REFERENCES players (player_id) ON DELETE CASCADE
+            )
+    '''))
+
+    # Password reset tokens table
+    conn.execute(sqlalchemy.text(f'''
+            CREATE TABLE IF NOT EXISTS password_reset_tokens (
+                token_id {session_id_type},
+                player_id INTEGER NOT NULL,
+                token TEXT UNIQUE NOT NULL,
+                expires_at {timestamp_type} NOT NULL,
+                used BOOLEAN DEFAULT FALSE,
+                created_at {timestamp_type} DEFAULT {default_timestamp},
+                FOREIGN KEY (player_id) REFERENCES players (player_id) ON DELETE CASCADE
+            )
+    '''))
+
+    # Fundraisers table
+    conn.execute(sqlalchemy.text(f'''
+            CREATE TABLE IF NOT EXISTS fundraisers (
+                fundraiser_id {session_id_type},
+                creator_id INTEGER NOT NULL,
+                title TEXT NOT NULL,
+                description TEXT,
+                charity_name TEXT NOT NULL,
+                charity_wallet_address TEXT,
+                target_amount REAL,
+                current_amount REAL DEFAULT 0,
+                sat_per_putt INTEGER DEFAULT 100,
+                start_date {timestamp_type},
+                end_date {timestamp_type},
+                status TEXT DEFAULT 'active',
+                created_at {timestamp_type} DEFAULT {default_timestamp},
+                FOREIGN KEY (creator_id) REFERENCES players (player_id) ON DELETE CASCADE
+            )
+    '''))
+
+    # Pledges table
+    conn.execute(sqlalchemy.text(f'''
+            CREATE TABLE IF NOT EXISTS pledges (
+                pledge_id {session_id_type},
+                fundraiser_id INTEGER NOT NULL,
+                pledger_id INTEGER NOT NULL,
+                amount_per_putt INTEGER NOT NULL,
+                max_amount REAL,
+                total_pledged REAL DEFAULT 0,
+                total_paid REAL DEFAULT 0,
+                status TEXT DEFAULT 'active',
+                created_at {timestamp_type} DEFAULT {default_timestamp},
+                FOREIGN KEY (fundraiser_id) REFERENCES fundraisers (fundraiser_id) ON DELETE CASCADE,
+                FOREIGN KEY (pledger_id) REFERENCES players (player_id) ON DELETE CASCADE
+            )
+    '''))
+
+    if db_type == "sqlite":
+        league_columns_to_add = {
+            "name": "TEXT",
+            "description": "TEXT",
+            "privacy_type": "TEXT",
+            "status": "TEXT",
+            "settings": "TEXT",
+            "start_time": "DATETIME",
+            "final_notifications_sent": "BOOLEAN"
+        }
+        for column, col_type in league_columns_to_add.items():
+            try:
+                conn.execute(sqlalchemy.text(f"ALTER TABLE leagues ADD COLUMN {column} {col_type} DEFAULT ''"))
+                logger.info(f"Added column '{column}' to 'leagues' table.")
+            except OperationalError as e:
+                if "duplicate column name" in str(e).lower():
+                    logger.info(f"Column '{column}' already exists in 'leagues' table. Skipping.")
+                else:
+                    logger.error(f"Error adding column '{column}' to 'leagues' table: {e}")
+
+    conn.execute(sqlalchemy.text(f'''
+            CREATE TABLE IF NOT EXISTS league_members (
+                member_id INTEGER,
+                league_id INTEGER NOT NULL,
+                player_id INTEGER NOT NULL,
+                status TEXT DEFAULT 'active',
+                created_at {timestamp_type} DEFAULT {default_timestamp},
+                PRIMARY KEY (league_id, player_id),
+                FOREIGN KEY (league_id) REFERENCES leagues (league_id) ON DELETE CASCADE,
+                FOREIGN KEY (player_id) REFERENCES players (player_id) ON DELETE CASCADE
+            )
+    '''))
+
+    conn.execute(sqlalchemy.text(f'''
+            CREATE TABLE IF NOT EXISTS league_rounds (
+                round_id {session_id_type},
+                league_id INTEGER NOT NULL,
+                round_number INTEGER NOT NULL,
+                status TEXT DEFAULT 'scheduled',
+                start_time {timestamp_type},
+                end_time {timestamp_type},
+                FOREIGN KEY (league_id) REFERENCES leagues (league_id) ON DELETE CASCADE
+            )
+    '''))
+
+    if db_type == "sqlite":
+        round_columns_to_add = {
+            "round_number": "INTEGER",
+            "status": "TEXT"
+        }
+        for column, col_type in round_columns_to_add.items():
+            try:
+                conn.execute(sqlalchemy.text(f"ALTER TABLE league_rounds ADD COLUMN {column} {col_type}"))
+                logger.info(f"Added column '{column}' to 'league_rounds' table.")
+            except OperationalError as e:
+                if "duplicate column name" in str(e).lower():
+                    logger.info(f"Column '{column}' already exists in 'league_rounds' table. Skipping.")
+                else:
+                    logger.error(f"Error adding column '{column}' to 'league_rounds' table: {e}")
+
+    conn.execute(sqlalchemy.text(f'''
+            CREATE TABLE IF NOT EXISTS league_round_submissions (
+                submission_id {session_id_type},
+                round_id INTEGER NOT NULL,
+                player_id INTEGER NOT NULL,
+                session_id INTEGER NOT NULL,
+                score INTEGER NOT NULL,
+                points_awarded INTEGER NOT NULL,
+                submitted_at {timestamp_type} DEFAULT {default_timestamp},
+                FOREIGN KEY (player_id) REFERENCES players (player_id) ON DELETE CASCADE,
+                FOREIGN KEY (session_id) REFERENCES sessions (session_id) ON DELETE CASCADE,
+                FOREIGN KEY (round_id) REFERENCES league_rounds (round_id) ON DELETE CASCADE
+            )
+    '''))
+
+    if db_type == "sqlite":
+        submission_columns_to_add = {
+            "player_id": "INTEGER",
+            "session_id": "INTEGER",
+            "score": "INTEGER",
+            "points_awarded": "INTEGER",
+            "submitted_at": "DATETIME"
+        }
+        for column, col_type in submission_columns_to_add.items():
+            try:
+                conn.execute(sqlalchemy.text(f"ALTER TABLE league_round_submissions ADD COLUMN {column} {col_type}"))
+                logger.info(f"Added column '{column}' to 'league_round_submissions' table.")
+            except OperationalError as e:
+                if "duplicate column name" in str(e).lower():
+                    logger.info(f"Column '{column}' already exists in 'league_round_submissions' table. Skipping.")
+                else:
+                    logger.error(f"Error adding column '{column}' to 'league_round_submissions' table: {e}")
+
+    conn.execute(sqlalchemy.text(f'''
+            CREATE TABLE IF NOT EXISTS player_stats (
+                player_id INTEGER PRIMARY KEY,
+                total_makes INTEGER DEFAULT 0,
+                total_misses INTEGER DEFAULT 0,
+                total_putts INTEGER DEFAULT 0,
+                best_streak INTEGER DEFAULT 0,
+                fastest_21_makes REAL DEFAULT 0,
+                total_duration REAL DEFAULT 0,
+                last_updated {timestamp_type} DEFAULT {default_timestamp},
+                FOREIGN KEY (player_id) REFERENCES players (player_id) ON DELETE CASCADE
+            )
+    '''))
+
+    # Add missing columns for existing player_stats tables
+    if db_type == "postgresql":
+        inspector = sqlalchemy.inspect(conn)
+        if inspector.has_table('player_stats'):
+            existing_columns = [c['name'] for c in inspector.get_columns('player_stats')]
+            missing_columns = {
+                'total_makes': 'INTEGER DEFAULT 0',
+                'total_misses': 'INTEGER DEFAULT 0',
+                'best_streak': 'INTEGER DEFAULT 0',
+                'total_duration': 'REAL DEFAULT 0',
+                'last_updated': f'{timestamp_type} DEFAULT {default_timestamp}'
+            }
+            for col_name, col_def in missing_columns.items():
+                if col_name not in existing_columns:
+                    try:
+                        conn.execute(sqlalchemy.text(f'ALTER TABLE player_stats ADD COLUMN {col_name} {col_def}'))
+                        logger.info(f"Added column '{col_name}' to 'player_stats' table.")
+                    except Exception as e:
+                        logger.error(f"Error adding column '{col_name}' to 'player_stats' table: {e}")
+
+    conn.execute(sqlalchemy.text(f'''
+            CREATE TABLE IF NOT EXISTS coach_conversations (
+                conversation_id {session_id_type},
+                player_id INTEGER NOT NULL,
+                last_updated {timestamp_type} DEFAULT {default_timestamp},
+                FOREIGN KEY (player_id) REFERENCES players (player_id) ON DELETE CASCADE
+            )
+    '''))
+
+    conn.execute(sqlalchemy.text(f'''
+            CREATE TABLE IF NOT EXISTS duels (
+                duel_id {session_id_type},
+                creator_id INTEGER NOT NULL,
+                invited_player_id INTEGER NOT NULL,
+                status TEXT DEFAULT 'pending',
+                settings TEXT,
+                creator_submitted_session_id INTEGER,
+                invited_submitted_session_id INTEGER,
+                winner_id INTEGER,
+                created_at {timestamp_type} DEFAULT {default_timestamp},
+                FOREIGN KEY (creator_id) REFERENCES players (player_id) ON DELETE CASCADE,
+                FOREIGN KEY (invited_player_id) REFERENCES players (player_id) ON DELETE CASCADE,
+                FOREIGN KEY (creator_submitted_session_id) REFERENCES sessions (session_id),
+                FOREIGN KEY (invited_submitted_session_id) REFERENCES sessions (session_id),
+                FOREIGN KEY (winner_id) REFERENCES players (player_id)
+            )
+    '''))
+
+    if db_type == "sqlite":
+        try:
+            duel_table_info = conn.execute(sqlalchemy.text("PRAGMA table_info(duels)")).mappings().fetchall()
+            duel_column_names = [col['name'] for col in duel_table_info]
+            duel_columns_to_add = {
+                "invitation_expiry_minutes": "INTEGER",
+                "session_duration_limit_minutes": "INTEGER",
+                "invitation_expires_at": "DATETIME"
+            }
+            for column, col_type in duel_columns_to_add.items():
+                if column not in duel_column_names:
+                    conn.execute(sqlalchemy.text(f"ALTER TABLE duels ADD COLUMN {column} {col_type}"))
+                    logger.info(f"Migration: Added column '{column}' to 'duels' table.")
+            if 'time_limit_minutes' in duel_column_names:
+                logger.info("Migration: Found obsolete 'time_limit_minutes' column in 'duels' table. Dropping it.")
+                conn.execute(sqlalchemy.text("ALTER TABLE duels DROP COLUMN time_limit_minutes"))
+                logger.info("Migration: Successfully dropped 'time_limit_minutes' column.")
+        except Exception as e:
+            logger.warning(f"A non-critical error occurred during 'duels' table migration. This is often safe to ignore. Error: {e}")
+
+    conn.execute(sqlalchemy.text(f'''
+            CREATE TABLE IF NOT EXISTS notifications (
+                id {session_id_type},
+                player_id INTEGER NOT NULL,
+                email_sent BOOLEAN DEFAULT FALSE,
+                FOREIGN KEY (player_id) REFERENCES players (player_id) ON DELETE CASCADE
+            )
+    '''))
+
+    if db_type == "sqlite":
+        notification_columns_to_add = {
+            "email_sent": "BOOLEAN"
+        }
+        for column, col_type in notification_columns_to_add.items():
+            try:
+                conn.execute(sqlalchemy.text(f"ALTER TABLE notifications ADD COLUMN {column} {col_type}"))
+                logger.info(f"Added column '{column}' to 'notifications' table.")
+            except OperationalError as e:
+                if "duplicate column name" in str(e).lower():
+                    logger.info(f"Column '{column}' already exists in 'notifications' table. Skipping.")
+                else:
+                    logger.error(f"Error adding column '{column}' to 'notifications' table: {e}")
+
+    if db_type == "sqlite":
+        fundraiser_columns_to_add = {
+            "last_notified_milestone": "INTEGER",
+            "conclusion_notification_sent": "BOOLEAN"
+        }
+        for column, col_type in fundraiser_columns_to_add.items():
+            try:
+                conn.execute(sqlalchemy.text(f"ALTER TABLE fundraisers ADD COLUMN {column} {col_type} DEFAULT 0"))
+                logger.info(f"Added column '{column}' to 'fundraisers' table.")
+            except OperationalError as e:
+                if "duplicate column name" in str(e).lower():
+                    logger.info(f"Column '{column}' already exists in 'fundraisers' table. Skipping.")
+                else:
+                    logger.error(f"Error adding column '{column}' to 'fundraisers' table: {e}")
+
+    conn.execute(sqlalchemy.text(f'''
+            CREATE TABLE IF NOT EXISTS player_relationships (
+                follower_id INTEGER NOT NULL,
+                followed_id INTEGER NOT NULL,
+                created_at {timestamp_type} DEFAULT {default_timestamp},
+                PRIMARY KEY (follower_id, followed_id),
+                FOREIGN KEY (follower_id) REFERENCES players (player_id) ON DELETE CASCADE,
+                FOREIGN KEY (followed_id) REFERENCES players (player_id) ON DELETE CASCADE
+            )
+    '''))
+
+
+def _backfill_session_data(conn, db_type):
+    """Fills the pre-aggregated analytics columns and the putts table for existing sessions."""
+    data_manager.backfill_session_analytics(conn=conn)
+    data_manager.backfill_putts(conn=conn)
+
+
+def _add_notification_columns(conn, db_type):
+    """Adds the in-app notification columns the notification queries read and write."""
+    types = _column_types(db_type)
+    existing_columns = [c['name'] for c in sqlalchemy.inspect(conn).get_columns('notifications')]
+    notification_columns = {
+        "type": "TEXT",
+        "message": "TEXT",
+        "details": "TEXT",
+        "link_path": "TEXT",
+        "read_status": "BOOLEAN DEFAULT FALSE",
+        # SQLite cannot add a column with a non-constant default to a populated table;
+        # create_in_app_notification always sets created_at explicitly.
+        "created_at": types['timestamp_type'] if db_type == "sqlite" else f"{types['timestamp_type']} DEFAULT {types['default_timestamp']}",
+    }
+    for column, col_def in notification_columns.items():
+        if column not in existing_columns:
+            conn.execute(sqlalchemy.text(f"ALTER TABLE notifications ADD COLUMN {column} {col_def}"))
+            logger.info(f"Migration: Added column '{column}' to 'notifications' table.")
+
+
+def _add_query_indexes(conn, db_type):
+    """Secondary indexes for the filters and sort orders used by the hot query paths."""
+    indexes = {
+        "idx_sessions_player_start": "sessions (player_id, start_time)",
+        "idx_notifications_player_unread": "notifications (player_id, read_status, created_at)",
+        "idx_duels_creator": "duels (creator_id)",
+        "idx_duels_invited": "duels (invited_player_id)",
+        "idx_league_rounds_league": "league_rounds (league_id, round_number)",
+        "idx_league_round_submissions_round": "league_round_submissions (round_id)",
+        "idx_league_members_player": "league_members (player_id)",
+    }
+    for index_name, definition in indexes.items():
+        conn.execute(sqlalchemy.text(f"CREATE INDEX IF NOT EXISTS {index_name} ON {definition}"))
+        logger.info(f"Migration: Ensured index '{index_name}' on {definition}.")
+
+
+def _add_leaderboard_store(conn, db_type):
+    """Precomputed all-time leaderboards and the change counters behind versioned ETags."""
+    types = _column_types(db_type)
+    conn.execute(sqlalchemy.text(f'''
+        CREATE TABLE IF NOT EXISTS leaderboard_entries (
+            metric TEXT NOT NULL,
+            session_id INTEGER NOT NULL REFERENCES sessions(session_id),
+            player_id INTEGER NOT NULL REFERENCES players(player_id),
+            value REAL NOT NULL,
+            start_time {types['timestamp_type']},
+            PRIMARY KEY (metric, session_id)
+        )
+    '''))
+    conn.execute(sqlalchemy.text("CREATE INDEX IF NOT EXISTS idx_leaderboard_entries_metric_value ON leaderboard_entries (metric, value)"))
+    conn.execute(sqlalchemy.text('''
+        CREATE TABLE IF NOT EXISTS resource_versions (
+            resource TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        )
+    '''))
+    data_manager.rebuild_leaderboards(conn)
+    logger.info("Migration: Built leaderboard store.")
+
+
+def _add_rivalries(conn, db_type):
+    """
+    Head-to-head rivalry rows maintained on duel completion, plus an index for pair lookups.
+    Also adds duels.invited_player_submitted_session_id, the column the duel code reads and writes,
+    which the baseline DDL created as invited_submitted_session_id.
+    """
+    types = _column_types(db_type)
+    if db_type == "postgresql":
+        conn.execute(sqlalchemy.text("ALTER TABLE duels ADD COLUMN IF NOT EXISTS invited_player_submitted_session_id INTEGER REFERENCES sessions(session_id)"))
+    else:
+        duel_columns = [col['name'] for col in conn.execute(sqlalchemy.text("PRAGMA table_info(duels)")).mappings()]
+        if "invited_player_submitted_session_id" not in duel_columns:
+            conn.execute(sqlalchemy.text("ALTER TABLE duels ADD COLUMN invited_player_submitted_session_id INTEGER REFERENCES sessions(session_id)"))
+    conn.execute(sqlalchemy.text('''
+        UPDATE duels SET invited_player_submitted_session_id = invited_submitted_session_id
+        WHERE invited_player_submitted_session_id IS NULL AND invited_submitted_session_id IS NOT NULL
+    '''))
+
+    conn.execute(sqlalchemy.text(f'''
+        CREATE TABLE IF NOT EXISTS rivalries (
+            low_player_id INTEGER NOT NULL REFERENCES players(player_id) ON DELETE CASCADE,
+            high_player_id INTEGER NOT NULL REFERENCES players(player_id) ON DELETE CASCADE,
+            low_wins INTEGER NOT NULL DEFAULT 0,
+            high_wins INTEGER NOT NULL DEFAULT 0,
+            total_duels INTEGER NOT NULL DEFAULT 0,
+            last_duel_id INTEGER,
+            last_duel_at {types['timestamp_type']},
+            low_best_makes INTEGER,
+            high_best_makes INTEGER,
+            PRIMARY KEY (low_player_id, high_player_id)
+        )
+    '''))
+    conn.execute(sqlalchemy.text("CREATE INDEX IF NOT EXISTS idx_duels_pair ON duels (creator_id, invited_player_id)"))
+    data_manager.rebuild_rivalries(conn)
+    logger.info("Migration: Built rivalries table.")
+
+
+def _add_player_search_indexes(conn, db_type):
+    """
+    Indexes for player search on PostgreSQL: trigram GIN indexes for substring matches (when the
+    pg_trgm extension can be enabled) and pattern-ops B-tree indexes for prefix matches.
+    SQLite searches an in-process index instead, so there is nothing to create there.
+    """
+    if db_type != "postgresql":
+        return
+    try:
+        with conn.begin_nested():
+            conn.execute(sqlalchemy.text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+            for column in ("name", "email"):
+                conn.execute(sqlalchemy.text(
+                    f"CREATE INDEX IF NOT EXISTS idx_players_{column}_trgm ON players USING gin (LOWER({column}) gin_trgm_ops)"
+                ))
+        logger.info("Migration: Created trigram indexes for player search.")
+    except (OperationalError, ProgrammingError) as e:
+        logger.warning(f"Migration: pg_trgm is unavailable, player search will scan for substring matches: {e}")
+    for column in ("name", "email"):
+        conn.execute(sqlalchemy.text(
+            f"CREATE INDEX IF NOT EXISTS idx_players_{column}_prefix ON players (LOWER({column}) text_pattern_ops)"
+        ))
+
+
+def _add_unread_notification_counter(conn, db_type):
+    """Per-player unread notification counter, maintained by the notification writes in data_manager."""
+    if db_type == "postgresql":
+        conn.execute(sqlalchemy.text("ALTER TABLE players ADD COLUMN IF NOT EXISTS unread_notification_count INTEGER NOT NULL DEFAULT 0"))
+    else:
+        player_columns = [col['name'] for col in conn.execute(sqlalchemy.text("PRAGMA table_info(players)")).mappings()]
+        if "unread_notification_count" not in player_columns:
+            conn.execute(sqlalchemy.text("ALTER TABLE players ADD COLUMN unread_notification_count INTEGER NOT NULL DEFAULT 0"))
+    conn.execute(sqlalchemy.text('''
+        UPDATE players SET unread_notification_count = (
+            SELECT COUNT(*) FROM notifications n
+            WHERE n.player_id = players.player_id AND n.read_status = FALSE
+        )
+    '''))
+    logger.info("Migration: Added and backfilled players.unread_notification_count.")
+
+
+def _add_keyset_pagination_support(conn, db_type):
+    """Tie-broken sort indexes for cursor pagination and a maintained session count in player_stats."""
+    indexes = {
+        "idx_sessions_player_start_id": "sessions (player_id, start_time, session_id)",
+        "idx_notifications_player_created_id": "notifications (player_id, created_at, id)",
+    }
+    for index_name, definition in indexes.items():
+        conn.execute(sqlalchemy.text(f"CREATE INDEX IF NOT EXISTS {index_name} ON {definition}"))
+        logger.info(f"Migration: Ensured index '{index_name}' on {definition}.")
+
+    if db_type == "postgresql":
+        conn.execute(sqlalchemy.text("ALTER TABLE player_stats ADD COLUMN IF NOT EXISTS total_sessions INTEGER NOT NULL DEFAULT 0"))
+    else:
+        stats_columns = [col['name'] for col in conn.execute(sqlalchemy.text("PRAGMA table_info(player_stats)")).mappings()]
+        if "total_sessions" not in stats_columns:
+            conn.execute(sqlalchemy.text("ALTER TABLE player_stats ADD COLUMN total_sessions INTEGER NOT NULL DEFAULT 0"))
+    conn.execute(sqlalchemy.text('''
+        UPDATE player_stats SET total_sessions = (
+            SELECT COUNT(*) FROM sessions s WHERE s.player_id = player_stats.player_id
+        )
+    '''))
+    logger.info("Migration: Added and backfilled player_stats.total_sessions.")
+
+
+def _add_session_external_ids(conn, db_type):
+    """Stores the desktop client's session id so ingestion is idempotent and /sessions/<id>/verify is a lookup."""
+    types = _column_types(db_type)
+    session_columns = {
+        "external_session_id": "TEXT",
+        "processed_at": types['timestamp_type'],
+    }
+    if db_type == "postgresql":
+        for column, col_def in session_columns.items():
+            conn.execute(sqlalchemy.text(f"ALTER TABLE sessions ADD COLUMN IF NOT EXISTS {column} {col_def}"))
+    else:
+        existing_columns = [col['name'] for col in conn.execute(sqlalchemy.text("PRAGMA table_info(sessions)")).mappings()]
+        for column, col_def in session_columns.items():
+            if column not in existing_columns:
+                conn.execute(sqlalchemy.text(f"ALTER TABLE sessions ADD COLUMN {column} {col_def}"))
+    # Leading with the external id serves verify lookups; including player_id scopes uniqueness per player.
+    conn.execute(sqlalchemy.text("CREATE UNIQUE INDEX IF NOT EXISTS idx_sessions_external_id ON sessions (external_session_id, player_id)"))
+    logger.info("Migration: Added sessions.external_session_id with a unique index.")
+
+
+def _add_packed_putt_data(conn, db_type):
+    """
+    Packed binary putt lists (putt_codes.pack_putt_list) alongside the JSON in sessions.putt_list.
+    Existing rows are packed by `python manage.py backfill-putt-data`, which commits per batch.
+    """
+    blob_type = "BYTEA" if db_type == "postgresql" else "BLOB"
+    if db_type == "postgresql":
+        conn.execute(sqlalchemy.text(f"ALTER TABLE sessions ADD COLUMN IF NOT EXISTS putt_data {blob_type}"))
+    else:
+        existing_columns = [col['name'] for col in conn.execute(sqlalchemy.text("PRAGMA table_info(sessions)")).mappings()]
+        if "putt_data" not in existing_columns:
+            conn.execute(sqlalchemy.text(f"ALTER TABLE sessions ADD COLUMN putt_data {blob_type}"))
+    logger.info("Migration: Added sessions.putt_data. Run `python manage.py backfill-putt-data` to pack existing sessions.")
+
+
+def _add_background_jobs(conn, db_type):
+    """Persisted state for background_jobs, so queued work survives restarts and is deduplicated by key."""
+    types = _column_types(db_type)
+    conn.execute(sqlalchemy.text(f'''
+        CREATE TABLE IF NOT EXISTS background_jobs (
+            job_id {types['id_type']},
+            job_type TEXT NOT NULL,
+            dedupe_key TEXT UNIQUE,
+            payload TEXT,
+            status TEXT NOT NULL DEFAULT 'queued',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            last_error TEXT,
+            created_at {types['timestamp_type']} DEFAULT {types['default_timestamp']},
+            started_at {types['timestamp_type']},
+            finished_at {types['timestamp_type']}
+        )
+    '''))
+    conn.execute(sqlalchemy.text("CREATE INDEX IF NOT EXISTS idx_background_jobs_status ON background_jobs (status, job_id)"))
+    logger.info("Migration: Created background_jobs table.")
+
+
+def _add_scheduler_support(conn, db_type):
+    """
+    Leases for scheduler jobs, plus the columns those jobs read: duel expiry and fundraiser
+    notification state (until now only added on SQLite) and per-round reminder tracking.
+    """
+    types = _column_types(db_type)
+    conn.execute(sqlalchemy.text(f'''
+        CREATE TABLE IF NOT EXISTS scheduled_jobs (
+            job_name TEXT PRIMARY KEY,
+            next_run_at {types['timestamp_type']},
+            lease_owner TEXT,
+            last_started_at {types['timestamp_type']},
+            last_finished_at {types['timestamp_type']},
+            last_duration_ms REAL,
+            last_rows INTEGER,
+            last_error TEXT,
+            run_count INTEGER NOT NULL DEFAULT 0
+        )
+    '''))
+
+    new_columns = {
+        "duels": {
+            "invitation_expiry_minutes": "INTEGER",
+            "session_duration_limit_minutes": "INTEGER",
+            "invitation_expires_at": types['timestamp_type'],
+        },
+        "fundraisers": {
+            "last_notified_milestone": "INTEGER DEFAULT 0",
+            "conclusion_notification_sent": "BOOLEAN DEFAULT FALSE",
+        },
+        "league_rounds": {
+            "reminder_sent_at": types['timestamp_type'],
+        },
+    }
+    for table, columns in new_columns.items():
+        if db_type == "postgresql":
+            for column, col_def in columns.items():
+                conn.execute(sqlalchemy.text(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {column} {col_def}"))
+        else:
+            existing_columns = [col['name'] for col in conn.execute(sqlalchemy.text(f"PRAGMA table_info({table})")).mappings()]
+            for column, col_def in columns.items():
+                if column not in existing_columns:
+                    conn.execute(sqlalchemy.text(f"ALTER TABLE {table} ADD COLUMN {column} {col_def}"))
+
+    indexes = {
+        "idx_duels_status_expiry": "duels (status, invitation_expires_at)",
+        "idx_league_rounds_status_end": "league_rounds (status, end_time)",
+        "idx_fundraisers_status_end": "fundraisers (status, end_date)",
+    }
+    for index_name, definition in indexes.items():
+        conn.execute(sqlalchemy.text(f"CREATE INDEX IF NOT EXISTS {index_name} ON {definition}"))
+    logger.info("Migration: Added scheduled_jobs and scheduler job columns.")
+
+
+def _add_unique_round_submissions(conn, db_type):
+    """One submission per player per league round, enforced by the database rather than a check-then-insert."""
+    # Earlier concurrent submits could store duplicates; keep each player's first submission.
+    removed = conn.execute(sqlalchemy.text("""
+        DELETE FROM league_round_submissions
+        WHERE submission_id NOT IN (
+            SELECT MIN(submission_id) FROM league_round_submissions GROUP BY round_id, player_id
+        )
+    """)).rowcount
+    if removed:
+        logger.warning(f"Migration: Removed {removed} duplicate league round submissions.")
+    conn.execute(sqlalchemy.text(
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_league_round_submissions_player ON league_round_submissions (round_id, player_id)"
+    ))
+    logger.info("Migration: Added a unique index on league_round_submissions (round_id, player_id).")
+
+
+# (version, description, function). Append new migrations; never renumber or edit applied ones.
+MIGRATIONS = [
+    (1, "Baseline schema", _baseline_schema),
+    (2, "Backfill session analytics and putts", _backfill_session_data),
+    (3, "Add in-app notification columns", _add_notification_columns),
+    (4, "Indexes for hot query paths", _add_query_indexes),
+    (5, "Leaderboard store and resource versions", _add_leaderboard_store),
+    (6, "Head-to-head rivalries", _add_rivalries),
+    (7, "Player search indexes", _add_player_search_indexes),
+    (8, "Unread notification counter", _add_unread_notification_counter),
+    (9, "Keyset pagination indexes and session counts", _add_keyset_pagination_support),
+    (10, "Session external ids", _add_session_external_ids),
+    (11, "Packed putt lists", _add_packed_putt_data),
+    (12, "Background job queue", _add_background_jobs),
+    (13, "Scheduler leases and job columns", _add_scheduler_support),
+    (14, "Unique league round submissions", _add_unique_round_submissions),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def _ensure_version_table(conn, db_type):
+    types = _column_types(db_type)
+    conn.execute(sqlalchemy.text(f'''
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            description TEXT NOT NULL,
+            applied_at {types['timestamp_type']} DEFAULT {types['default_timestamp']}
+        )
+    '''))
+
+
+def get_schema_version(conn):
+    """Returns the highest applied migration version, or 0 for an unversioned database."""
+    try:
+        version = conn.execute(sqlalchemy.text("SELECT MAX(version) FROM schema_version")).scalar()
+    except (OperationalError, ProgrammingError):
+        conn.rollback()
+        return 0
+    return version or 0
+
+
+def run_migrations(engine):
+    """
+    Applies every pending migration in order and returns the list of versions applied.
+    When the database is already current this is a single SELECT.
+    """
+    db_type = engine.dialect.name
+
+    with engine.connect() as conn:
+        if get_schema_version(conn) >= LATEST_VERSION:
+            return []
+
+    applied = []
+    with engine.connect() as conn:
+        with conn.begin():
+            _ensure_version_table(conn, db_type)
+
+        for version, description, migration in MIGRATIONS:
+            with conn.begin():
+                if db_type == "postgresql":
+                    # Serialize concurrent runners; the lock is released when this transaction ends.
+                    conn.execute(sqlalchemy.text("SELECT pg_advisory_xact_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+                if get_schema_version(conn) >= version:
+                    continue
+                logger.info(f"Migration {version}: {description}")
+                migration(conn, db_type)
+                conn.execute(
+                    sqlalchemy.text("INSERT INTO schema_version (version, description, applied_at) VALUES (:version, :description, :applied_at)"),
+                    {"version": version, "description": description, "applied_at": datetime.utcnow()}
+                )
+            applied.append(version)
+
+    if applied:
+        logger.info(f"Database migrated to version {applied[-1]}.")
+    return applied
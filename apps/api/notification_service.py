@@ -9,7 +9,7 @@ logger = logging.getLogger(__name__)
 def _should_send_email(player_id, preference_key):
     """Checks if a user wants to receive a specific type of email."""
     try:
-        prefs_json = data_manager.get_player_info(player_id).get('notification_preferences')
+        prefs_json = data_manager.get_notification_preferences(player_id)
         if prefs_json:
             prefs = json.loads(prefs_json)
             # Default to True if the key is missing from their saved preferences
@@ -29,7 +29,7 @@ def send_welcome_email(player_id):
         logger.info(f"Skipping welcome email for player {player_id} due to preferences.")
         return
 
-    player = data_manager.get_player_info(player_id) # This should be get_player_info
+    player = data_manager.get_player_info(player_id)
     if not player:
         return
 
@@ -0,0 +1,119 @@
+"""
+In-process player search index, used when the database has no trigram support (the SQLite fallback).
+
+Names and emails are indexed by character trigrams for substring matches and kept in sorted lists
+for prefix matches. Results are ranked the same way as the PostgreSQL query in data_manager:
+name prefix, then email prefix, then any other substring match, alphabetically within each group.
+"""
+
+import threading
+from array import array
+from bisect import bisect_left, insort
+
+GRAM_SIZE = 3
+
+
+def _grams(text):
+    return {text[i:i + GRAM_SIZE] for i in range(len(text) - GRAM_SIZE + 1)}
+
+
+class PlayerSearchIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._docs = {}  # player_id -> (name, email, lowercased name, lowercased email)
+        self._postings = {}  # trigram -> array of player_ids (may hold stale ids; matches are re-checked)
+        self._names = []  # sorted (lowercased name, player_id)
+        self._emails = []  # sorted (lowercased email, player_id)
+
+    def __len__(self):
+        return len(self._docs)
+
+    def load(self, rows):
+        """Bulk-loads (player_id, name, email) rows, replacing the current contents."""
+        docs, postings = {}, {}
+        for player_id, name, email in rows:
+            name, email = name or "", email or ""
+            docs[player_id] = (name, email, name.lower(), email.lower())
+            for gram in _grams(name.lower()) | _grams(email.lower()):
+                postings.setdefault(gram, array("i")).append(player_id)
+        with self._lock:
+            self._docs = docs
+            self._postings = postings
+            self._names = sorted((doc[2], player_id) for player_id, doc in docs.items())
+            self._emails = sorted((doc[3], player_id) for player_id, doc in docs.items())
+
+    def add(self, player_id, name, email):
+        """Adds a player or updates their name and email."""
+        name, email = name or "", email or ""
+        with self._lock:
+            self._remove_sorted(player_id)
+            doc = (name, email, name.lower(), email.lower())
+            self._docs[player_id] = doc
+            for gram in _grams(doc[2]) | _grams(doc[3]):
+                self._postings.setdefault(gram, array("i")).append(player_id)
+            insort(self._names, (doc[2], player_id))
+            insort(self._emails, (doc[3], player_id))
+
+    def search_document(self, player_id):
+        """Returns a player's indexed name and email, or None if they are not indexed."""
+        doc = self._docs.get(player_id)
+        return {"name": doc[0], "email": doc[1]} if doc else None
+
+    def remove(self, player_id):
+        with self._lock:
+            self._remove_sorted(player_id)
+            self._docs.pop(player_id, None)
+
+    def _remove_sorted(self, player_id):
+        doc = self._docs.get(player_id)
+        if doc is None:
+            return
+        for entries, key in ((self._names, doc[2]), (self._emails, doc[3])):
+            position = bisect_left(entries, (key, player_id))
+            if position < len(entries) and entries[position] == (key, player_id):
+                del entries[position]
+
+    def _prefix_matches(self, entries, term, limit, exclude):
+        matches = []
+        position = bisect_left(entries, (term,))
+        while position < len(entries) and len(matches) < limit and entries[position][0].startswith(term):
+            if entries[position][1] != exclude:
+                matches.append(entries[position][1])
+            position += 1
+        return matches
+
+    def search(self, term, exclude_player_id=None, limit=10):
+        """
+        Returns up to `limit` {"player_id", "name", "email"} dicts matching `term`, excluding
+        `exclude_player_id`. Terms shorter than a trigram only match as prefixes.
+        """
+        term = term.strip().lower()
+        if not term:
+            return []
+
+        with self._lock:
+            ranked = []
+            seen = set()
+            for player_id in (self._prefix_matches(self._names, term, limit, exclude_player_id)
+                              + self._prefix_matches(self._emails, term, limit, exclude_player_id)):
+                if player_id not in seen:
+                    seen.add(player_id)
+                    ranked.append(player_id)
+
+            if len(ranked) < limit and len(term) >= GRAM_SIZE:
+                # The rarest trigram bounds the candidates; each is confirmed against the current text.
+                postings = [self._postings.get(gram) for gram in _grams(term)]
+                if all(postings):
+                    substring_matches = []
+                    for player_id in set(min(postings, key=len)):
+                        doc = self._docs.get(player_id)
+                        if player_id in seen or player_id == exclude_player_id or doc is None:
+                            continue
+                        if term in doc[2] or term in doc[3]:
+                            substring_matches.append((doc[2], player_id))
+                    ranked.extend(player_id for _, player_id in sorted(substring_matches))
+
+            return [
+                {"player_id": player_id, "name": self._docs[player_id][0], "email": self._docs[player_id][1]}
+                for player_id in ranked[:limit]
+            ]
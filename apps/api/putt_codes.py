@@ -0,0 +1,262 @@
+"""
+Small integer codes for putt classifications.
+
+PuttClassifier emits detailed classifications as strings such as
+'MAKE - HOLE: TOP - LEFT' (hole entry quadrant, then ramp entry),
+'MISS - RETURN: LEFT - CENTER' (ramp entry, then ramp exit) or 'MISS - TIMEOUT: RIGHT'.
+These helpers turn a putt into compact codes for storage and back again, and pack a whole
+session's putt list into a compact binary form (see pack_putt_list).
+"""
+
+import json
+import math
+import struct
+import sys
+import zlib
+from array import array
+from collections.abc import Sequence
+
+CLASSIFICATION_CODES = {"MAKE": 1, "MISS": 2}
+
+DETAIL_CODES = {
+    "UNKNOWN": 0,
+    "HOLE": 1,
+    "RETURN": 2,
+    "CATCH": 3,
+    "TIMEOUT": 4,
+    "QUICK PUTT": 5,
+}
+
+# Ramp sub-ROIs and hole quadrants share one code space.
+# For makes, exit_roi is the hole quadrant the ball dropped through.
+ROI_CODES = {
+    "UNKNOWN": 0,
+    "RAMP_LEFT": 1,
+    "RAMP_CENTER": 2,
+    "RAMP_RIGHT": 3,
+    "RAMP": 4,
+    "HOLE_TOP": 5,
+    "HOLE_RIGHT": 6,
+    "HOLE_LOW": 7,
+    "HOLE_LEFT": 8,
+    "HOLE": 9,
+}
+
+CLASSIFICATION_NAMES = {code: name for name, code in CLASSIFICATION_CODES.items()}
+DETAIL_NAMES = {code: name for name, code in DETAIL_CODES.items()}
+ROI_NAMES = {code: name for name, code in ROI_CODES.items()}
+
+
+def _roi_code(token, prefix):
+    """Maps a classifier token ('LEFT', 'TOP', 'RAMP', 'UNKNOWN') to an ROI code."""
+    token = token.strip().upper()
+    if token in ("", "UNKNOWN"):
+        return ROI_CODES["UNKNOWN"]
+    if token in ROI_CODES:
+        return ROI_CODES[token]
+    return ROI_CODES.get(f"{prefix}_{token}", ROI_CODES["UNKNOWN"])
+
+
+def _roi_token(code):
+    """Inverse of _roi_code: returns the token as the classifier writes it."""
+    name = ROI_NAMES.get(code, "UNKNOWN")
+    for prefix in ("RAMP_", "HOLE_"):
+        if name.startswith(prefix):
+            return name[len(prefix):]
+    return name
+
+
+def parse_detailed_classification(classification, detailed):
+    """
+    Encodes a putt's classification strings.
+    Returns a (classification, detail, entry_roi, exit_roi) tuple of integer codes.
+    """
+    classification_code = CLASSIFICATION_CODES.get((classification or "").strip().upper(), 0)
+    detailed = (detailed or "").strip()
+    if " - " in detailed:
+        detailed = detailed.split(" - ", 1)[1]
+
+    category, _, rois = detailed.partition(":")
+    detail_code = DETAIL_CODES.get(category.strip().upper(), DETAIL_CODES["UNKNOWN"])
+    parts = rois.split(" - ") if rois.strip() else []
+
+    entry_roi = exit_roi = ROI_CODES["UNKNOWN"]
+    if detail_code == DETAIL_CODES["HOLE"]:
+        if parts:
+            exit_roi = _roi_code(parts[0], "HOLE")
+        if len(parts) > 1:
+            entry_roi = _roi_code(parts[1], "RAMP")
+    else:
+        if parts:
+            entry_roi = _roi_code(parts[0], "RAMP")
+        if len(parts) > 1:
+            exit_roi = _roi_code(parts[1], "RAMP")
+
+    return classification_code, detail_code, entry_roi, exit_roi
+
+
+def format_detailed_classification(classification_code, detail_code, entry_roi, exit_roi):
+    """Rebuilds the classifier's detailed classification string from codes."""
+    classification = CLASSIFICATION_NAMES.get(classification_code, "UNKNOWN")
+    detail = DETAIL_NAMES.get(detail_code, "UNKNOWN")
+    if detail == "HOLE":
+        return f"{classification} - HOLE: {_roi_token(exit_roi)} - {_roi_token(entry_roi)}"
+    if detail in ("RETURN", "CATCH"):
+        return f"{classification} - {detail}: {_roi_token(entry_roi)} - {_roi_token(exit_roi)}"
+    if detail == "TIMEOUT":
+        return f"{classification} - TIMEOUT: {_roi_token(entry_roi)}"
+    return f"{classification} - {detail}"
+
+
+def encode_putt(putt, putt_index):
+    """
+    Encodes a stored putt (a raw desktop log entry or a SessionReporter 'Putt ...' record).
+    Returns a dict with putt_index, putt_time, classification, detail, entry_roi and exit_roi.
+    """
+    classification = putt.get("Putt Classification") or putt.get("classification")
+    detailed = putt.get("Putt Detailed Classification") or putt.get("detailed_classification")
+    putt_time = putt.get("Putt Time", putt.get("current_frame_time"))
+    try:
+        putt_time = float(putt_time) if putt_time not in (None, "") else None
+    except (TypeError, ValueError):
+        putt_time = None
+
+    classification_code, detail_code, entry_roi, exit_roi = parse_detailed_classification(classification, detailed)
+    return {
+        "putt_index": putt_index,
+        "putt_time": putt_time,
+        "classification": classification_code,
+        "detail": detail_code,
+        "entry_roi": entry_roi,
+        "exit_roi": exit_roi,
+    }
+
+
+def decode_putt(row):
+    """Returns a SessionReporter-style putt record for an encoded putt."""
+    return {
+        "Putt Index": row["putt_index"],
+        "Putt Classification": CLASSIFICATION_NAMES.get(row["classification"], "UNKNOWN"),
+        "Putt Detailed Classification": format_detailed_classification(
+            row["classification"], row["detail"], row["entry_roi"], row["exit_roi"]
+        ),
+        "Putt Time": row["putt_time"],
+    }
+
+
+# Packed putt lists: a versioned header followed by a zlib-compressed body of parallel arrays
+# (float32 putt times, NaN when unknown, then one uint8 array per code), little-endian.
+PACKED_MAGIC = b"PL"
+PACKED_VERSION = 1
+_PACKED_HEADER = struct.Struct("<2sBI")  # magic, version, putt count
+_CODE_FIELDS = ("classification", "detail", "entry_roi", "exit_roi")
+
+
+def pack_putt_list(putt_list):
+    """Packs a putt list (desktop log entries or SessionReporter records) into the compact binary format."""
+    encoded = [encode_putt(putt, index) for index, putt in enumerate(putt_list, start=1)]
+    times = array("f", (math.nan if putt["putt_time"] is None else putt["putt_time"] for putt in encoded))
+    if sys.byteorder == "big":
+        times.byteswap()
+    body = times.tobytes() + b"".join(bytes(putt[field] for putt in encoded) for field in _CODE_FIELDS)
+    return _PACKED_HEADER.pack(PACKED_MAGIC, PACKED_VERSION, len(encoded)) + zlib.compress(body)
+
+
+def packed_putt_count(blob):
+    """Reads the putt count from a packed putt list's header without decompressing it."""
+    magic, version, count = _PACKED_HEADER.unpack_from(blob)
+    if magic != PACKED_MAGIC or version != PACKED_VERSION:
+        raise ValueError(f"Unsupported packed putt list (magic {magic!r}, version {version})")
+    return count
+
+
+def unpack_putt_list(blob):
+    """Returns the SessionReporter-style putt records stored in a packed putt list."""
+    count = packed_putt_count(blob)
+    body = zlib.decompress(bytes(blob[_PACKED_HEADER.size:]))
+    times = array("f")
+    times.frombytes(body[:4 * count])
+    if sys.byteorder == "big":
+        times.byteswap()
+    offset = 4 * count
+    codes = {}
+    for field in _CODE_FIELDS:
+        codes[field] = body[offset:offset + count]
+        offset += count
+    return [
+        decode_putt({
+            "putt_index": index + 1,
+            "putt_time": None if math.isnan(times[index]) else round(times[index], 3),
+            **{field: codes[field][index] for field in _CODE_FIELDS},
+        })
+        for index in range(count)
+    ]
+
+
+# Every field pack_putt_list keeps; a putt with any other key would lose it when packed.
+PACKED_PUTT_KEYS = frozenset({
+    "Putt Index", "Putt Classification", "Putt Detailed Classification", "Putt Time",
+    "classification", "detailed_classification", "current_frame_time",
+})
+
+
+def matches_packed(putt_list, blob):
+    """
+    Returns True if the packed putt list holds everything in `putt_list`: the same putts, no fields
+    the codec does not encode, and classifications and times that come back unchanged.
+    """
+    if not isinstance(putt_list, list):
+        return False
+    try:
+        unpacked = unpack_putt_list(blob)
+    except (ValueError, struct.error, zlib.error):
+        return False
+    if len(unpacked) != len(putt_list):
+        return False
+    for putt, record in zip(putt_list, unpacked):
+        if not isinstance(putt, dict) or not PACKED_PUTT_KEYS.issuperset(putt):
+            return False
+        if putt.get("Putt Index", record["Putt Index"]) != record["Putt Index"]:
+            return False
+        if (putt.get("Putt Classification") or putt.get("classification")) != record["Putt Classification"]:
+            return False
+        if (putt.get("Putt Detailed Classification") or putt.get("detailed_classification")) != record["Putt Detailed Classification"]:
+            return False
+        putt_time = putt.get("Putt Time", putt.get("current_frame_time"))
+        if putt_time in (None, ""):
+            if record["Putt Time"] is not None:
+                return False
+        else:
+            try:
+                if round(float(putt_time), 3) != record["Putt Time"]:
+                    return False
+            except (TypeError, ValueError):
+                return False
+    return True
+
+
+class LazyPuttList(Sequence):
+    """
+    Read-only view of a packed putt list. The length comes from the header; the putts are only
+    decompressed and decoded the first time an item, iteration or to_json() needs them.
+    """
+
+    def __init__(self, blob):
+        self._blob = bytes(blob)
+        self._count = packed_putt_count(self._blob)
+        self._putts = None
+
+    def _decoded(self):
+        if self._putts is None:
+            self._putts = unpack_putt_list(self._blob)
+        return self._putts
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        return self._decoded()[index]
+
+    def to_json(self):
+        """Serializes the putts as the JSON array string that sessions.putt_list used to hold."""
+        return json.dumps(self._decoded())
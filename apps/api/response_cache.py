@@ -0,0 +1,155 @@
+"""
+Response cache for hot GET endpoints, invalidated by writes rather than by time.
+
+Each cached endpoint names the resources its response depends on (e.g. "player_12", "leaderboards").
+data_manager bumps a resource's version in the same transaction as any write that changes it, so a
+request reads the current versions (one query), derives a key and ETag from them, and then:
+  - answers 304 when the client's If-None-Match still matches,
+  - otherwise serves the stored body for that key, or renders it once and stores it.
+Stale entries are never read again once a version moves; the TTL only bounds memory and any
+staleness from data a write path does not version. Versions and the rendered body must come from the
+same database: the API renders cached views under data_manager.primary_reads, because a lagging
+read replica would otherwise store a pre-write body under the post-write ETag.
+
+Backends are pluggable: an in-process LRU (the default) or a shared Redis-protocol cache when
+RESPONSE_CACHE_URL is set, so workers share rendered responses. Any Redis-compatible local
+server can stand in for the shared cache in development.
+"""
+
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import nullcontext
+from functools import wraps
+
+from flask import request, make_response
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+logger = logging.getLogger('debug_logger')
+
+RESPONSE_CACHE_TTL_SECONDS = int(os.environ.get("RESPONSE_CACHE_TTL_SECONDS", "300"))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.environ.get("RESPONSE_CACHE_MAX_ENTRIES", "2048"))
+
+
+class InProcessBackend:
+    """Per-process LRU with per-entry expiry."""
+
+    def __init__(self, max_entries=RESPONSE_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class RedisBackend:
+    """Shared cache over the Redis protocol; entries expire server-side after their TTL."""
+
+    def __init__(self, url, prefix="pop:response:"):
+        self._client = redis.Redis.from_url(url)
+        self._prefix = prefix
+
+    def get(self, key):
+        try:
+            return self._client.get(self._prefix + key)
+        except redis.RedisError as e:
+            logger.warning(f"Response cache read failed: {e}")
+            return None
+
+    def set(self, key, value, ttl):
+        try:
+            self._client.set(self._prefix + key, value, ex=ttl)
+        except redis.RedisError as e:
+            logger.warning(f"Response cache write failed: {e}")
+
+    def clear(self):
+        for key in self._client.scan_iter(match=self._prefix + "*"):
+            self._client.delete(key)
+
+
+def create_backend(url=None, prefix="pop:response:"):
+    """Returns the shared backend for `url` (default RESPONSE_CACHE_URL), else an in-process LRU."""
+    url = url if url is not None else os.environ.get("RESPONSE_CACHE_URL")
+    if url:
+        if redis is None:
+            logger.warning("RESPONSE_CACHE_URL is set but the redis package is not installed; using the in-process cache.")
+        else:
+            return RedisBackend(url, prefix=prefix)
+    return InProcessBackend()
+
+
+class ResponseCache:
+    def __init__(self, get_versions, backend=None, ttl=RESPONSE_CACHE_TTL_SECONDS, render_context=None):
+        """
+        `get_versions(resources)` returns {resource: version} for the resources a response depends on.
+        `render_context()`, if given, is entered around reading the versions and rendering, e.g. to keep
+        both on the same database.
+        """
+        self.get_versions = get_versions
+        self.render_context = render_context or nullcontext
+        self.backend = backend if backend is not None else create_backend()
+        self.ttl = ttl
+        self.stats = {"hits": 0, "misses": 0, "not_modified": 0}
+
+    def cached_get(self, resources, cache_control="private, no-cache"):
+        """
+        Decorates a GET view. `resources(**view_args)` lists the resources the response depends on.
+        Only 200 responses are stored; the path and query string are part of the key, so
+        variants such as ?include= are cached separately.
+        """
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                with self.render_context():
+                    names = list(resources(**kwargs))
+                    versions = self.get_versions(names)
+                    fingerprint = "|".join([request.full_path] + [f"{name}={versions.get(name, 0)}" for name in names])
+                    etag = hashlib.sha1(fingerprint.encode()).hexdigest()[:20]
+
+                    if request.if_none_match.contains_weak(etag):
+                        self.stats["not_modified"] += 1
+                        response = make_response("", 304)
+                    else:
+                        body = self.backend.get(etag)
+                        if body is not None:
+                            self.stats["hits"] += 1
+                            response = make_response(body, 200)
+                            response.mimetype = "application/json"
+                        else:
+                            self.stats["misses"] += 1
+                            response = make_response(view(*args, **kwargs))
+                            if response.status_code != 200:
+                                return response
+                            self.backend.set(etag, response.get_data(), self.ttl)
+                response.set_etag(etag, weak=True)
+                response.headers['Cache-Control'] = cache_control
+                return response
+            return wrapper
+        return decorator
@@ -0,0 +1,107 @@
+"""
+Periodic maintenance jobs: league round transitions and reminders, duel expiry, and fundraiser
+milestones and conclusions.
+
+Every gunicorn worker runs the same APScheduler timetable, and each job is claimed in the database
+before it runs (a scheduled_jobs lease, plus an advisory lock on PostgreSQL; see
+data_manager.claim_scheduled_job), so each due job runs on one worker only. Jobs are set-based
+functions in data_manager that return the number of rows they changed; each run's duration, rows and
+error are recorded in scheduled_jobs and reported by /health.
+
+    python manage.py run-job expire_pending_duels   # run one job now, e.g. from cron
+"""
+
+import logging
+import os
+import socket
+import threading
+import time
+
+import data_manager
+
+try:
+    from apscheduler.schedulers.background import BackgroundScheduler
+except ImportError:
+    BackgroundScheduler = None
+
+logger = logging.getLogger('debug_logger')
+
+SCHEDULER_ENABLED = os.environ.get("SCHEDULER_ENABLED", "true").lower() not in ("0", "false", "no")
+
+# (name, function, interval in seconds)
+JOBS = [
+    ("start_pending_league_rounds", data_manager.start_pending_league_rounds, 60),
+    ("process_final_league_results", data_manager.process_final_league_results, 300),
+    ("send_league_reminders", data_manager.send_league_reminders, 900),
+    ("expire_pending_duels", data_manager.expire_pending_duels, 300),
+    ("expire_active_duels", data_manager.expire_active_duels, 3600),
+    ("send_fundraiser_reminders", data_manager.send_fundraiser_reminders, 900),
+    ("process_concluded_fundraisers", data_manager.process_concluded_fundraisers, 900),
+]
+JOBS_BY_NAME = {name: (function, interval) for name, function, interval in JOBS}
+
+_scheduler = None
+_started_pid = None
+_start_lock = threading.Lock()
+
+
+def _owner():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def run_job(name, force=False):
+    """
+    Runs one job if this worker can claim it and returns the rows it changed, or None when the job
+    was not due or another worker holds it. `force` ignores the schedule but still takes the lease.
+    """
+    function, interval = JOBS_BY_NAME[name]
+    with data_manager.get_db_connection().connect() as conn:
+        if not data_manager.claim_scheduled_job(name, interval, _owner(), conn, force=force):
+            return None
+        if force:
+            logger.info(f"Scheduler: running {name} on demand.")
+        started = time.perf_counter()
+        rows, error = None, None
+        try:
+            with conn.begin():
+                rows = function(conn=conn)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            logger.error(f"Scheduler job {name} failed: {e}", exc_info=True)
+        duration_ms = round((time.perf_counter() - started) * 1000, 1)
+        data_manager.release_scheduled_job(name, duration_ms, rows, error, conn)
+    logger.info(f"Scheduler job {name} finished in {duration_ms} ms, {rows} rows affected.")
+    return rows
+
+
+def _run_scheduled(name):
+    try:
+        run_job(name)
+    except Exception as e:
+        logger.error(f"Scheduler could not run {name}: {e}", exc_info=True)
+
+
+def start():
+    """Starts this process's scheduler. Idempotent, and restarts it in a forked child."""
+    global _scheduler, _started_pid
+    if not SCHEDULER_ENABLED or _started_pid == os.getpid():
+        return
+    if BackgroundScheduler is None:
+        logger.warning("apscheduler is not installed; scheduled jobs will not run in this worker.")
+        return
+    with _start_lock:
+        if _started_pid == os.getpid():
+            return
+        _scheduler = BackgroundScheduler(daemon=True)
+        for name, _, interval in JOBS:
+            # Workers wake on the same timetable; the claim in run_job lets one of them do the work.
+            _scheduler.add_job(_run_scheduled, "interval", seconds=interval, args=[name], id=name,
+                               max_instances=1, coalesce=True, jitter=min(30, interval // 4))
+        _scheduler.start()
+        _started_pid = os.getpid()
+    logger.info(f"Scheduler started with {len(JOBS)} jobs (pid {_started_pid}).")
+
+
+def get_stats():
+    """Each job's last recorded run, for /health."""
+    return data_manager.get_scheduled_job_runs()
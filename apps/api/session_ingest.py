@@ -0,0 +1,298 @@
+"""
+Turns desktop session uploads into rows for data_manager.save_session / save_sessions.
+
+Upload bodies may be compressed (gzip, deflate, zstd) and JSON or MessagePack; see decode_upload.
+
+Reporting a session with SessionReporter is CPU-bound, so batch uploads are validated and reported
+in a per-process pool of worker processes; single sessions are reported inline.
+"""
+
+import gzip
+import json
+import logging
+import os
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+
+from session_reporter import SessionReporter
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger('debug_logger')
+
+MAX_BATCH_SESSIONS = int(os.environ.get("MAX_BATCH_SESSIONS", "100"))
+INGEST_WORKERS = int(os.environ.get("INGEST_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+_executor = None
+_executor_pid = None
+
+
+# Upload limits, in bytes, for the request body as sent and after decompression.
+MAX_UPLOAD_BYTES = int(os.environ.get("MAX_UPLOAD_BYTES", str(16 * 1024 * 1024)))
+MAX_DECODED_UPLOAD_BYTES = int(os.environ.get("MAX_DECODED_UPLOAD_BYTES", str(64 * 1024 * 1024)))
+UPLOAD_READ_CHUNK = 64 * 1024
+
+JSON_CONTENT_TYPES = ("application/json", "")
+MSGPACK_CONTENT_TYPES = ("application/msgpack", "application/x-msgpack", "application/vnd.msgpack")
+
+
+class UploadTooLarge(ValueError):
+    pass
+
+
+class UnsupportedUpload(ValueError):
+    pass
+
+
+class _LimitedReader:
+    """File-like wrapper that stops reading once more than `limit` bytes have come through."""
+
+    def __init__(self, stream, limit, what):
+        self._stream = stream
+        self._limit = limit
+        self._what = what
+        self._read = 0
+
+    def read(self, size=-1):
+        data = self._stream.read(size if size is not None and size >= 0 else UPLOAD_READ_CHUNK)
+        self._read += len(data)
+        if self._read > self._limit:
+            raise UploadTooLarge(f"{self._what} exceeds {self._limit} bytes")
+        return data
+
+
+def _decoding_reader(stream, content_encoding):
+    encoding = (content_encoding or "identity").strip().lower()
+    if encoding == "identity":
+        return stream
+    if encoding in ("gzip", "x-gzip"):
+        return gzip.GzipFile(fileobj=stream, mode="rb")
+    if encoding == "deflate":
+        return _ZlibReader(stream)
+    if encoding == "zstd":
+        if zstandard is None:
+            raise UnsupportedUpload("zstd uploads need the zstandard package on the server")
+        return zstandard.ZstdDecompressor().stream_reader(stream)
+    raise UnsupportedUpload(f"Unsupported Content-Encoding: {content_encoding}")
+
+
+class _ZlibReader:
+    """Streams a zlib (HTTP 'deflate') body, never inflating more than the requested size at a time."""
+
+    def __init__(self, stream):
+        self._stream = stream
+        self._inflater = zlib.decompressobj()
+        self._eof = False
+
+    def read(self, size=-1):
+        size = size if size and size > 0 else UPLOAD_READ_CHUNK
+        output = self._inflater.decompress(self._inflater.unconsumed_tail, size)
+        while not output and not self._eof:
+            chunk = self._stream.read(UPLOAD_READ_CHUNK)
+            if not chunk:
+                self._eof = True
+                return self._inflater.flush()
+            output = self._inflater.decompress(chunk, size)
+        return output
+
+
+def decode_upload(stream, content_type=None, content_encoding=None):
+    """
+    Reads a session upload body and returns the decoded payload. The body may be gzip, deflate or
+    zstd compressed (Content-Encoding) and JSON or MessagePack (Content-Type). Decompression is
+    streamed and both the raw and decompressed sizes are capped, so a small compressed body cannot
+    expand without bound. Raises UploadTooLarge, UnsupportedUpload, or ValueError for malformed bodies.
+    """
+    content_type = (content_type or "").split(";")[0].strip().lower()
+    if content_type not in JSON_CONTENT_TYPES + MSGPACK_CONTENT_TYPES:
+        raise UnsupportedUpload(f"Unsupported Content-Type: {content_type}")
+    if content_type in MSGPACK_CONTENT_TYPES and msgpack is None:
+        raise UnsupportedUpload("MessagePack uploads need the msgpack package on the server")
+
+    reader = _LimitedReader(
+        _decoding_reader(_LimitedReader(stream, MAX_UPLOAD_BYTES, "Upload"), content_encoding),
+        MAX_DECODED_UPLOAD_BYTES, "Decompressed upload"
+    )
+    chunks = []
+    try:
+        while True:
+            chunk = reader.read(UPLOAD_READ_CHUNK)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    except (OSError, EOFError, zlib.error) as e:
+        raise ValueError(f"Could not decompress upload: {e}") from e
+    except Exception as e:
+        if zstandard is not None and isinstance(e, zstandard.ZstdError):
+            raise ValueError(f"Could not decompress upload: {e}") from e
+        raise
+    body = b"".join(chunks)
+
+    try:
+        if content_type in MSGPACK_CONTENT_TYPES:
+            return msgpack.unpackb(body, raw=False, strict_map_key=False)
+        return json.loads(body)
+    except Exception as e:
+        raise ValueError(f"Malformed {content_type or 'JSON'} upload: {e}") from e
+
+
+def _expand_putt_entries(entries):
+    """
+    Accepts putt_log_entries as a list of dicts, or in the compact record layout
+    {"columns": [field, ...], "rows": [[value, ...], ...]} that avoids repeating every key per putt.
+    """
+    if isinstance(entries, dict) and isinstance(entries.get('columns'), list) and isinstance(entries.get('rows'), list):
+        columns = entries['columns']
+        if any(not isinstance(row, (list, tuple)) or len(row) != len(columns) for row in entries['rows']):
+            raise ValueError("Every putt_log_entries row must have one value per column")
+        return [dict(zip(columns, row)) for row in entries['rows']]
+    return entries
+
+
+def upload_key(payload):
+    """
+    Returns an upload's (desktop session id, player id) without processing it, so retries of an
+    already stored session can be answered from the database. None if the upload lacks either.
+    """
+    try:
+        metadata = payload['session_data']['metadata']
+        key = (str(metadata['session_id']), metadata['player_id'])
+    except (KeyError, TypeError):
+        return None
+    return key if metadata['session_id'] is not None and metadata['player_id'] is not None else None
+
+
+def stored_session_result(session):
+    """Rebuilds the submit response fields for a session that was already stored."""
+    statistics = {
+        column: session.get(column) for column in (
+            'total_putts', 'total_makes', 'total_misses', 'best_streak', 'fastest_21_makes', 'putts_per_minute',
+            'makes_per_minute', 'most_makes_in_60_seconds', 'session_duration'
+        )
+    }
+    for column in ('makes_by_category', 'misses_by_category'):
+        try:
+            statistics[column] = json.loads(session.get(column) or '{}')
+        except (TypeError, ValueError):
+            statistics[column] = {}
+    statistics.update(source='desktop', session_id=session['external_session_id'], submitted_at=session.get('processed_at'))
+    return {
+        "session_id": session['external_session_id'],
+        "putts_processed": session.get('total_putts') or 0,
+        "statistics": statistics,
+    }
+
+
+def prepare_desktop_session(payload):
+    """
+    Validates one desktop upload ({"session_data", "verification", ...}) and reports its putts.
+    Returns {"session_id", "player_id", "putts_processed", "statistics", "row"}, where `row` is the
+    save_session input, or None when the session has no classified putts. Raises ValueError for bad uploads.
+    """
+    if not isinstance(payload, dict):
+        raise ValueError("No data provided")
+    session_data = payload.get('session_data')
+    verification = payload.get('verification')
+    if not session_data or not verification:
+        raise ValueError("Missing session_data or verification")
+
+    metadata = session_data.get('metadata') or {}
+    for field in ('session_id', 'player_id', 'start_time'):
+        if metadata.get(field) is None:
+            raise ValueError(f"Missing metadata.{field}")
+    entries = _expand_putt_entries(session_data.get('putt_log_entries'))
+    if not isinstance(entries, list):
+        raise ValueError("putt_log_entries must be a list")
+
+    expected_count = verification.get('classification_count')
+    actual_count = (session_data.get('session_summary') or {}).get('total_putts')
+    if expected_count != actual_count:
+        logger.warning(f"Data integrity mismatch for session {metadata['session_id']}: expected {expected_count}, got {actual_count}")
+
+    # Filter to only classification entries (MAKE/MISS)
+    putt_log_entries = [entry for entry in entries if isinstance(entry, dict) and entry.get('classification') in ('MAKE', 'MISS')]
+    prepared = {
+        "session_id": metadata['session_id'],
+        "player_id": metadata['player_id'],
+        "putts_processed": len(putt_log_entries),
+        "statistics": None,
+        "row": None,
+    }
+    if not putt_log_entries:
+        return prepared
+
+    reporter = SessionReporter(putt_log_entries)
+    reporter.process_data()
+
+    fastest_21_makes = reporter.fastest_21_makes if reporter.fastest_21_makes != float('inf') else None
+    prepared["statistics"] = {
+        'total_putts': reporter.total_putts,
+        'total_makes': reporter.total_makes,
+        'total_misses': reporter.total_misses,
+        'best_streak': reporter.max_consecutive_makes,
+        'fastest_21_makes': fastest_21_makes,
+        'putts_per_minute': reporter.putts_per_minute,
+        'makes_per_minute': reporter.makes_per_minute,
+        'most_makes_in_60_seconds': reporter.most_makes_in_60_seconds,
+        'session_duration': reporter.session_duration,
+        'makes_by_category': reporter.makes_by_category,
+        'misses_by_category': reporter.misses_by_category,
+        'source': 'desktop',
+        'session_id': metadata['session_id'],
+        'submitted_at': datetime.now(timezone.utc).isoformat()
+    }
+    prepared["row"] = {
+        'player_id': metadata['player_id'],
+        'external_session_id': metadata['session_id'],
+        'start_time': metadata['start_time'],
+        'end_time': metadata.get('end_time'),
+        'status': 'completed',
+        'total_putts': reporter.total_putts,
+        'total_makes': reporter.total_makes,
+        'total_misses': reporter.total_misses,
+        'best_streak': reporter.max_consecutive_makes,
+        'fastest_21_makes': fastest_21_makes,
+        'putts_per_minute': reporter.putts_per_minute,
+        'makes_per_minute': reporter.makes_per_minute,
+        'most_makes_in_60_seconds': reporter.most_makes_in_60_seconds,
+        'session_duration': reporter.session_duration,
+        'putt_list': json.dumps(putt_log_entries),
+        'makes_by_category': json.dumps(reporter.makes_by_category),
+        'misses_by_category': json.dumps(reporter.misses_by_category)
+    }
+    return prepared
+
+
+def _prepare_or_error(payload):
+    try:
+        return prepare_desktop_session(payload)
+    except (ValueError, KeyError, TypeError) as e:
+        return {"error": str(e) if isinstance(e, ValueError) else f"Malformed session: {e!r}"}
+
+
+def _get_executor():
+    """Returns this process's worker pool, replacing one inherited across fork()."""
+    global _executor, _executor_pid
+    if _executor is None or _executor_pid != os.getpid():
+        _executor = ProcessPoolExecutor(max_workers=INGEST_WORKERS)
+        _executor_pid = os.getpid()
+    return _executor
+
+
+def prepare_desktop_sessions(payloads):
+    """
+    Prepares a batch of uploads, in the same order. Each result is prepare_desktop_session's dict,
+    or {"error": message} for an upload that failed validation; one bad session does not fail the batch.
+    """
+    if len(payloads) < 2 or INGEST_WORKERS <= 1:
+        return [_prepare_or_error(payload) for payload in payloads]
+    return list(_get_executor().map(_prepare_or_error, payloads, chunksize=max(1, len(payloads) // (INGEST_WORKERS * 4))))
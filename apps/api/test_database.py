@@ -5,8 +5,11 @@ Tests all critical functionality to ensure system reliability.
 
 import os
 import sys
+import tempfile
+import time
 import traceback
-from datetime import datetime
+from contextlib import contextmanager
+from datetime import datetime, timedelta
 import json
 
 # Add the current directory to sys.path for imports
@@ -186,6 +189,918 @@ def test_session_reporter():
         traceback.print_exc()
         return False
 
+def test_session_analytics():
+    """Test per-session analytics derived at save time."""
+    print("\n=== Testing Session Analytics ===")
+    try:
+        putt_list = [
+            {'classification': 'MAKE', 'detailed_classification': 'MAKE - HOLE: TOP - RIGHT'},
+            {'classification': 'MAKE', 'detailed_classification': 'MAKE - HOLE: LEFT - CENTER'},
+            {'classification': 'MAKE', 'detailed_classification': 'MAKE - HOLE: TOP - LEFT'},
+            {'classification': 'MISS', 'detailed_classification': 'MISS - RETURN: LEFT - CENTER'},
+            {'Putt Classification': 'MISS', 'Putt Detailed Classification': 'MISS - TIMEOUT: RIGHT'},
+        ]
+        columns, category_counts = data_manager.compute_session_analytics({
+            'putt_list': json.dumps(putt_list), 'total_makes': 3, 'total_misses': 2
+        })
+
+        # Quadrants come from the hole entry only, never from the ramp side
+        assert (columns['makes_top'], columns['makes_left'], columns['makes_right']) == (2, 1, 0)
+        assert (columns['misses_return'], columns['misses_timeout'], columns['misses_catch']) == (1, 1, 0)
+        assert columns['streaks_3'] == 1 and columns['streaks_7'] == 0
+        assert columns['accuracy'] == 60.0
+        assert ('MISS', 'RETURN: LEFT - CENTER', 1) in category_counts
+        print("✅ Session analytics computed correctly")
+        print(f"  - {len(category_counts)} detailed categories")
+        return True
+
+    except Exception as e:
+        print(f"❌ Session analytics test failed: {e}")
+        traceback.print_exc()
+        return False
+
+def test_migrations_and_indexes():
+    """Test the migration runner and index usage on a seeded local SQLite database."""
+    print("\n=== Testing Migrations & Indexes ===")
+    try:
+        import migrations
+        db_path = os.path.join(tempfile.mkdtemp(), "migrations_test.db")
+        engine = data_manager.sqlalchemy.create_engine(f"sqlite:///{db_path}")
+        text = data_manager.sqlalchemy.text
+
+        applied = migrations.run_migrations(engine)
+        assert applied == [version for version, _, _ in migrations.MIGRATIONS]
+        assert migrations.run_migrations(engine) == []
+        print(f"✅ Applied migrations {applied}; second run is a no-op")
+
+        # Seed enough rows for the planner to prefer the indexes
+        with engine.begin() as conn:
+            conn.execute(text("INSERT INTO players (player_id, email, name, password_hash) VALUES (:id, :email, :name, 'x')"),
+                         [{"id": i, "email": f"p{i}@example.com", "name": f"Player {i}"} for i in range(1, 51)])
+            conn.execute(text("INSERT INTO sessions (player_id, start_time, total_makes) VALUES (:player_id, :start_time, :makes)"),
+                         [{"player_id": i % 50 + 1, "start_time": datetime(2026, 1, 1) + timedelta(hours=i), "makes": i % 40} for i in range(2000)])
+            conn.execute(text("INSERT INTO notifications (player_id, message, read_status, created_at) VALUES (:player_id, 'hi', :read, :created_at)"),
+                         [{"player_id": i % 50 + 1, "read": i % 3 == 0, "created_at": datetime(2026, 1, 1) + timedelta(minutes=i)} for i in range(2000)])
+            conn.execute(text("INSERT INTO duels (creator_id, invited_player_id) VALUES (:a, :b)"),
+                         [{"a": i % 50 + 1, "b": (i + 7) % 50 + 1} for i in range(500)])
+            conn.execute(text("ANALYZE"))
+
+        hot_queries = {
+            "idx_sessions_player_start": "SELECT session_id FROM sessions WHERE player_id = 3 ORDER BY start_time DESC LIMIT 25",
+            "idx_notifications_player_unread": "SELECT COUNT(*) FROM notifications WHERE player_id = 3 AND read_status = FALSE",
+            "idx_duels_creator": "SELECT duel_id FROM duels WHERE creator_id = 3",
+            "idx_duels_invited": "SELECT duel_id FROM duels WHERE invited_player_id = 3",
+            "idx_league_round_submissions_round": "SELECT submission_id FROM league_round_submissions WHERE round_id = 3",
+            "idx_league_members_player": "SELECT league_id FROM league_members WHERE player_id = 3",
+        }
+        with engine.connect() as conn:
+            for index_name, query in hot_queries.items():
+                plan = " ".join(str(row[-1]) for row in conn.execute(text(f"EXPLAIN QUERY PLAN {query}")))
+                assert index_name in plan, f"{index_name} not used: {plan}"
+                print(f"  - {index_name}: {plan}")
+        print("✅ Hot queries use their indexes")
+        return True
+
+    except Exception as e:
+        print(f"❌ Migrations test failed: {e}")
+        traceback.print_exc()
+        return False
+
+def test_request_scoped_connection():
+    """Test that data_manager calls share one provided connection instead of checking out their own."""
+    print("\n=== Testing Request-Scoped Connection ===")
+    try:
+        import migrations
+        engine = data_manager.sqlalchemy.create_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'uow_test.db')}")
+        migrations.run_migrations(engine)
+        checkouts = []
+        data_manager.sqlalchemy.event.listen(engine, "checkout", lambda *args: checkouts.append(1))
+
+        conn = engine.connect()
+        conn.begin()
+        data_manager.set_connection_provider(lambda: conn)
+        try:
+            conn.execute(data_manager.sqlalchemy.text(
+                "INSERT INTO players (player_id, email, name, password_hash) VALUES (1, 'uow@example.com', 'UoW', 'x')"
+            ))
+            data_manager.create_in_app_notification(1, 'TEST', 'Hello')
+            assert data_manager.get_player_info(1)['name'] == 'UoW'
+            assert data_manager.get_player_stats(1) is not None
+            assert data_manager.get_unread_notification_count(1) == 1
+            conn.rollback()
+        finally:
+            data_manager.set_connection_provider(None)
+            conn.close()
+
+        assert len(checkouts) == 1, f"expected one checkout, got {len(checkouts)}"
+        print("✅ Reads and writes shared a single pooled connection")
+        with engine.connect() as check_conn:
+            assert check_conn.execute(data_manager.sqlalchemy.text("SELECT COUNT(*) FROM notifications")).scalar() == 0
+        print("✅ Rolling back the unit of work discards its writes")
+        return True
+
+    except Exception as e:
+        print(f"❌ Request-scoped connection test failed: {e}")
+        traceback.print_exc()
+        return False
+
+def test_league_listing_query_count():
+    """Test that listing a player's leagues costs the same number of queries however many leagues they are in."""
+    print("\n=== Testing League Listing Query Count ===")
+    try:
+        import migrations
+        engine = data_manager.sqlalchemy.create_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'leagues_test.db')}")
+        migrations.run_migrations(engine)
+        text = data_manager.sqlalchemy.text
+        statements = []
+        data_manager.sqlalchemy.event.listen(engine, "before_cursor_execute", lambda *args: statements.append(1))
+
+        def add_leagues(conn, first_id, count):
+            for league_id in range(first_id, first_id + count):
+                conn.execute(text("INSERT INTO leagues (league_id, creator_id, name, privacy_type) VALUES (:id, 1, :name, 'public')"),
+                             {"id": league_id, "name": f"League {league_id}"})
+                conn.execute(text("INSERT INTO league_members (league_id, player_id) VALUES (:id, 1), (:id, 2)"), {"id": league_id})
+                conn.execute(text("INSERT INTO league_rounds (league_id, round_number, status) VALUES (:id, 1, 'active'), (:id, 2, 'scheduled')"),
+                             {"id": league_id})
+
+        with engine.begin() as conn:
+            conn.execute(text("INSERT INTO players (player_id, email, name, password_hash) VALUES (1, 'a@example.com', 'A', 'x'), (2, 'b@example.com', 'B', 'x')"))
+            add_leagues(conn, 1, 1)
+
+        query_counts = []
+        for league_total, extra_leagues in ((1, 0), (20, 19)):
+            with engine.begin() as conn:
+                add_leagues(conn, league_total - extra_leagues + 1, extra_leagues)
+                statements.clear()
+                leagues = data_manager.get_leagues_for_player(1, conn=conn)
+                query_counts.append(len(statements))
+            assert len(leagues['my_leagues']) == league_total
+            assert all(league['member_count'] == 2 and len(league['rounds']) == 2 for league in leagues['my_leagues'])
+
+        assert query_counts[0] == query_counts[1], f"query count grew with leagues: {query_counts}"
+        print(f"✅ {query_counts[0]} queries for both 1 and 20 leagues")
+        return True
+
+    except Exception as e:
+        print(f"❌ League listing test failed: {e}")
+        traceback.print_exc()
+        return False
+
+def test_batch_session_save():
+    """Test that saving sessions as a batch gives the same stats as saving them one at a time."""
+    print("\n=== Testing Batch Session Save ===")
+    try:
+        import migrations
+        text = data_manager.sqlalchemy.text
+        sessions = [
+            {
+                'player_id': 1 + i % 2, 'start_time': f'2025-01-0{1 + i} 10:00:00', 'end_time': None, 'status': 'completed',
+                'total_putts': 3, 'total_makes': 2 + i, 'total_misses': 1, 'best_streak': 2, 'fastest_21_makes': None,
+                'putts_per_minute': 1.5, 'makes_per_minute': 1.0, 'most_makes_in_60_seconds': 2, 'session_duration': 60 + i,
+                'putt_list': json.dumps([
+                    {"current_frame_time": "1.0", "classification": "MAKE", "detailed_classification": "MAKE - HOLE: TOP - CENTER"},
+                    {"current_frame_time": "4.0", "classification": "MISS", "detailed_classification": "MISS - RETURN: LEFT - CENTER"},
+                ]),
+                'makes_by_category': '{}', 'misses_by_category': '{}'
+            }
+            for i in range(4)
+        ]
+
+        stats = []
+        for save in (lambda conn: data_manager.save_sessions(sessions, conn=conn),
+                     lambda conn: [data_manager.save_session(session, conn=conn) for session in sessions]):
+            engine = data_manager.sqlalchemy.create_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'batch_test.db')}")
+            migrations.run_migrations(engine)
+            with engine.begin() as conn:
+                conn.execute(text("INSERT INTO players (player_id, email, name, password_hash) VALUES (1, 'a@example.com', 'A', 'x'), (2, 'b@example.com', 'B', 'x')"))
+                conn.execute(text("INSERT INTO player_stats (player_id) VALUES (1), (2)"))
+                session_ids = save(conn)
+            assert len(session_ids) == len(sessions)
+            with engine.connect() as conn:
+                stats.append(conn.execute(text("SELECT player_id, total_makes, total_putts, total_duration, total_sessions FROM player_stats ORDER BY player_id")).fetchall())
+
+        assert stats[0] == stats[1], f"batch stats {stats[0]} differ from single saves {stats[1]}"
+        print(f"✅ Batch save matches single saves: {stats[0]}")
+        return True
+
+    except Exception as e:
+        print(f"❌ Batch session save test failed: {e}")
+        traceback.print_exc()
+        return False
+
+def test_scheduler_job_lease():
+    """Test that a due scheduler job is claimed by one worker per interval and its run is recorded."""
+    print("\n=== Testing Scheduler Job Lease ===")
+    try:
+        import migrations
+        engine = data_manager.sqlalchemy.create_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'scheduler_test.db')}")
+        migrations.run_migrations(engine)
+
+        with engine.connect() as first, engine.connect() as second:
+            assert data_manager.claim_scheduled_job("expire_pending_duels", 300, "worker-1", first)
+            assert not data_manager.claim_scheduled_job("expire_pending_duels", 300, "worker-2", second)
+            with first.begin():
+                rows = data_manager.expire_pending_duels(conn=first)
+            data_manager.release_scheduled_job("expire_pending_duels", 1.5, rows, None, first)
+            # Released but not yet due again
+            assert not data_manager.claim_scheduled_job("expire_pending_duels", 300, "worker-2", second)
+
+            runs = data_manager.get_scheduled_job_runs(conn=second)
+        run = runs["expire_pending_duels"]
+        assert run['run_count'] == 1 and run['last_rows'] == 0 and run['lease_owner'] is None
+        print("✅ One claim per interval, run recorded")
+        return True
+
+    except Exception as e:
+        print(f"❌ Scheduler job lease test failed: {e}")
+        traceback.print_exc()
+        return False
+
+def test_response_cache():
+    """Test ETag revalidation, invalidation by resource version, per-variant keys and TTL eviction."""
+    print("\n=== Testing Response Cache ===")
+    try:
+        from flask import Flask, jsonify, request
+        import migrations
+        import response_cache
+        engine = data_manager.sqlalchemy.create_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'cache_test.db')}")
+        migrations.run_migrations(engine)
+
+        with engine.connect() as conn:
+            renders = []
+            cache = response_cache.ResponseCache(lambda names: data_manager.get_resource_versions(names, conn=conn),
+                                                 backend=response_cache.InProcessBackend())
+            app = Flask(__name__)
+
+            @app.route('/player/<int:player_id>/data')
+            @cache.cached_get(lambda player_id: [f"player_{player_id}"])
+            def player_data(player_id):
+                renders.append(request.full_path)
+                return jsonify({"render": len(renders), "fields": request.args.get('fields')})
+
+            client = app.test_client()
+            first = client.get('/player/1/data')
+            etag = first.get_etag()[0]
+            assert first.status_code == 200 and len(renders) == 1
+
+            # A matching If-None-Match answers 304 without rendering
+            revalidated = client.get('/player/1/data', headers={"If-None-Match": f'W/"{etag}"'})
+            assert revalidated.status_code == 304 and revalidated.get_etag()[0] == etag and len(renders) == 1
+            assert client.get('/player/1/data').get_json()["render"] == 1  # served from the backend
+
+            # Variants are keyed separately
+            narrowed = client.get('/player/1/data?fields=stats')
+            assert narrowed.get_etag()[0] != etag and narrowed.get_json()["fields"] == "stats" and len(renders) == 2
+            assert client.get('/player/1/data?include=sessions').get_etag()[0] not in (etag, narrowed.get_etag()[0])
+
+            # A write bumps the version: new ETag, the old one no longer matches, and the body is rendered again
+            data_manager._bump_resource_version(conn, "player_1")
+            conn.commit()
+            changed = client.get('/player/1/data', headers={"If-None-Match": f'W/"{etag}"'})
+            assert changed.status_code == 200 and changed.get_etag()[0] != etag
+            assert changed.get_json()["render"] == len(renders) == 4
+            assert cache.stats == {"hits": 1, "misses": 4, "not_modified": 1}
+
+        # Entries expire after their TTL
+        backend = response_cache.InProcessBackend(max_entries=2)
+        backend.set("short", b"1", 0.05)
+        backend.set("long", b"2", 60)
+        assert backend.get("short") == b"1"
+        time.sleep(0.1)
+        assert backend.get("short") is None and backend.get("long") == b"2"
+        # and the least recently used entry is evicted past max_entries
+        backend.set("a", b"3", 60)
+        backend.set("b", b"4", 60)
+        assert backend.get("long") is None and backend.get("a") == b"3"
+        print("✅ 304, invalidation, variants and TTL behave as expected")
+        return True
+
+    except Exception as e:
+        print(f"❌ Response cache test failed: {e}")
+        traceback.print_exc()
+        return False
+
+def test_response_cache_replica_lag():
+    """Test that a lagging read replica cannot get a pre-write body cached under the post-write ETag."""
+    print("\n=== Testing Response Cache Under Replica Lag ===")
+    previous_provider = data_manager._connection_provider
+    previous_read_url = os.environ.get("DATABASE_READ_URL")
+    try:
+        from flask import Flask, jsonify
+        import migrations
+        import response_cache
+        text = data_manager.sqlalchemy.text
+        engines = {}
+        for role in ("primary", "replica"):
+            engines[role] = data_manager.sqlalchemy.create_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(), role + '.db')}")
+            migrations.run_migrations(engines[role])
+            with engines[role].begin() as conn:
+                conn.execute(text("INSERT INTO players (player_id, email, name, password_hash) VALUES (1, 'a@example.com', 'Old', 'x')"))
+        # The write reached the primary, with its version bump, but not the replica yet
+        with engines["primary"].begin() as conn:
+            conn.execute(text("UPDATE players SET name = 'New' WHERE player_id = 1"))
+            data_manager._bump_resource_version(conn, "player_1")
+
+        connections = {role: engine.connect() for role, engine in engines.items()}
+        data_manager.set_connection_provider(lambda read_only=False: connections["replica" if read_only else "primary"])
+        os.environ["DATABASE_READ_URL"] = "sqlite://"
+
+        @data_manager.read_only(player_arg="player_id")
+        def get_name(player_id):
+            with data_manager._connect() as conn:
+                return conn.execute(text("SELECT name FROM players WHERE player_id = :id"), {"id": player_id}).scalar()
+
+        app = Flask(__name__)
+        fixed = response_cache.ResponseCache(data_manager.get_resource_versions, backend=response_cache.InProcessBackend(),
+                                             render_context=data_manager.primary_reads)
+        unscoped = response_cache.ResponseCache(data_manager.get_resource_versions, backend=response_cache.InProcessBackend())
+        for rule, cache in (("/fixed/<int:player_id>", fixed), ("/unscoped/<int:player_id>", unscoped)):
+            app.add_url_rule(rule, rule, cache.cached_get(lambda player_id: [f"player_{player_id}"])(
+                lambda player_id: jsonify({"name": get_name(player_id)})))
+
+        client = app.test_client()
+        # Without the render context the stale replica body lands under the new version's ETag
+        assert client.get("/unscoped/1").get_json()["name"] == "Old"
+        response = client.get("/fixed/1")
+        assert response.get_json()["name"] == "New"
+        stored = fixed.backend.get(response.get_etag()[0])
+        assert stored is not None and b"New" in stored and b"Old" not in stored
+        for conn in connections.values():
+            conn.close()
+        print("✅ Cached body matches the versions in its ETag")
+        return True
+
+    except Exception as e:
+        print(f"❌ Response cache replica lag test failed: {e}")
+        traceback.print_exc()
+        return False
+    finally:
+        data_manager.set_connection_provider(previous_provider)
+        if previous_read_url is None:
+            os.environ.pop("DATABASE_READ_URL", None)
+        else:
+            os.environ["DATABASE_READ_URL"] = previous_read_url
+
+def test_player_info_cache_bypass():
+    """Test that use_cache=False reads a player's identity from the database past a stale cached entry."""
+    print("\n=== Testing Player Info Cache Bypass ===")
+    try:
+        import migrations
+        engine = data_manager.sqlalchemy.create_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'info_test.db')}")
+        migrations.run_migrations(engine)
+        with engine.begin() as conn:
+            conn.execute(data_manager.sqlalchemy.text(
+                "INSERT INTO players (player_id, email, name, password_hash, subscription_status) VALUES (91, 'a@example.com', 'New', 'x', 'active')"))
+        # Another worker changed the player after this one cached them
+        data_manager._player_info_cache[91] = (time.monotonic() + 60, {"player_id": 91, "name": "Old", "subscription_status": "free"})
+        with engine.connect() as conn:
+            assert data_manager.get_player_info(91, conn=conn)['name'] == "Old"
+            fresh = data_manager.get_player_info(91, conn=conn, use_cache=False)
+        assert fresh['name'] == "New" and fresh['subscription_status'] == "active"
+        assert data_manager.get_player_info(91)['name'] == "New"  # the fresh read refreshes the cache
+        print("✅ Fresh read bypasses and refreshes the cache")
+        return True
+
+    except Exception as e:
+        print(f"❌ Player info cache bypass test failed: {e}")
+        traceback.print_exc()
+        return False
+    finally:
+        data_manager._player_info_cache.pop(91, None)
+
+def test_read_your_writes_fallback():
+    """Test that a player who just saved reads from the primary, on any worker sharing the write markers."""
+    print("\n=== Testing Read-Your-Writes Fallback ===")
+    previous_provider = data_manager._connection_provider
+    previous_read_url = os.environ.get("DATABASE_READ_URL")
+    previous_markers = data_manager._write_markers
+    try:
+        import migrations
+        import response_cache
+        text = data_manager.sqlalchemy.text
+        engines = {}
+        for role in ("primary", "replica"):
+            engines[role] = data_manager.sqlalchemy.create_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(), role + '.db')}")
+            migrations.run_migrations(engines[role])
+            with engines[role].begin() as conn:
+                conn.execute(text("INSERT INTO players (player_id, email, name, password_hash) VALUES (1, 'a@example.com', :name, 'x'), (2, 'b@example.com', :name, 'x')"),
+                             {"name": role})
+        connections = {role: engine.connect() for role, engine in engines.items()}
+        data_manager.set_connection_provider(lambda read_only=False: connections["replica" if read_only else "primary"])
+        os.environ["DATABASE_READ_URL"] = "sqlite://"
+
+        @data_manager.read_only(player_arg="player_id")
+        def read_source(player_id):
+            with data_manager._connect() as conn:
+                return conn.execute(text("SELECT name FROM players WHERE player_id = :id"), {"id": player_id}).scalar()
+
+        # One backend stands in for the shared cache that every worker reads the markers from
+        data_manager._write_markers = response_cache.InProcessBackend()
+        data_manager._note_player_write(1)
+        assert read_source(1) == "primary"
+        assert read_source(2) == "replica"
+        data_manager._write_markers = response_cache.InProcessBackend()  # markers expired
+        assert read_source(1) == "replica"
+        for conn in connections.values():
+            conn.close()
+        print("✅ Recent writer reads the primary, others read the replica")
+        return True
+
+    except Exception as e:
+        print(f"❌ Read-your-writes test failed: {e}")
+        traceback.print_exc()
+        return False
+    finally:
+        data_manager.set_connection_provider(previous_provider)
+        data_manager._write_markers = previous_markers
+        if previous_read_url is None:
+            os.environ.pop("DATABASE_READ_URL", None)
+        else:
+            os.environ["DATABASE_READ_URL"] = previous_read_url
+
+def test_upload_decoding():
+    """Test compressed and MessagePack upload decoding, decompression limits and malformed bodies."""
+    print("\n=== Testing Upload Decoding ===")
+    previous_limit = None
+    try:
+        import gzip
+        import io
+        import zlib
+        import session_ingest
+        payload = {"session_data": {"metadata": {"session_id": 7}, "putt_log_entries": [{"classification": "MAKE"}] * 50}}
+        raw = json.dumps(payload).encode()
+
+        encodings = {None: raw, "identity": raw, "gzip": gzip.compress(raw), "deflate": zlib.compress(raw)}
+        if session_ingest.zstandard is not None:
+            encodings["zstd"] = session_ingest.zstandard.ZstdCompressor().compress(raw)
+        else:
+            try:
+                session_ingest.decode_upload(io.BytesIO(raw), "application/json", "zstd")
+                raise AssertionError("zstd accepted without the zstandard package")
+            except session_ingest.UnsupportedUpload:
+                pass
+        for encoding, body in encodings.items():
+            assert session_ingest.decode_upload(io.BytesIO(body), "application/json; charset=utf-8", encoding) == payload, encoding
+        if session_ingest.msgpack is not None:
+            packed = session_ingest.msgpack.packb(payload)
+            assert session_ingest.decode_upload(io.BytesIO(gzip.compress(packed)), "application/msgpack", "gzip") == payload
+        print(f"✅ Round-trips for {', '.join(str(encoding) for encoding in encodings)}")
+
+        # A small compressed body that expands past the decoded limit is rejected while streaming (413)
+        previous_limit = session_ingest.MAX_DECODED_UPLOAD_BYTES
+        session_ingest.MAX_DECODED_UPLOAD_BYTES = 1024 * 1024
+        bomb = b'{"pad": "' + b"0" * (4 * 1024 * 1024) + b'"}'
+        bombs = {"gzip": gzip.compress(bomb), "deflate": zlib.compress(bomb, 9)}
+        if session_ingest.zstandard is not None:
+            bombs["zstd"] = session_ingest.zstandard.ZstdCompressor().compress(bomb)
+        for encoding, body in bombs.items():
+            assert len(body) < 64 * 1024
+            try:
+                session_ingest.decode_upload(io.BytesIO(body), "application/json", encoding)
+                raise AssertionError(f"{encoding} bomb was decoded")
+            except session_ingest.UploadTooLarge:
+                pass
+        print("✅ Decompression bombs raise UploadTooLarge")
+
+        # Malformed bodies are ValueErrors (400); unknown types and encodings are UnsupportedUpload (415)
+        for encoding, body in (("gzip", b"not gzip at all"), ("gzip", gzip.compress(raw)[:-12]),
+                               ("deflate", b"not deflate"), (None, b"{not json")):
+            try:
+                session_ingest.decode_upload(io.BytesIO(body), "application/json", encoding)
+                raise AssertionError(f"malformed {encoding} body was decoded")
+            except session_ingest.UploadTooLarge:
+                raise
+            except ValueError:
+                pass
+        for content_type, encoding in (("text/csv", None), ("application/json", "br")):
+            try:
+                session_ingest.decode_upload(io.BytesIO(raw), content_type, encoding)
+                raise AssertionError(f"{content_type} {encoding} was accepted")
+            except session_ingest.UnsupportedUpload:
+                pass
+        print("✅ Malformed and unsupported uploads are rejected")
+        return True
+
+    except Exception as e:
+        print(f"❌ Upload decoding test failed: {e}")
+        traceback.print_exc()
+        return False
+    finally:
+        if previous_limit is not None:
+            session_ingest.MAX_DECODED_UPLOAD_BYTES = previous_limit
+
+def test_background_jobs():
+    """Test job dedupe, single claims, retries and recovery of jobs left running by a dead worker."""
+    print("\n=== Testing Background Jobs ===")
+    previous_provider = data_manager._connection_provider
+    try:
+        import background_jobs
+        import migrations
+        engine = data_manager.sqlalchemy.create_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'jobs_test.db')}")
+        migrations.run_migrations(engine)
+        text = data_manager.sqlalchemy.text
+
+        with engine.connect() as conn:
+            data_manager.set_connection_provider(lambda read_only=False: conn)
+
+            # The same player and day enqueued twice is one job
+            first = data_manager.enqueue_job("daily_ai_chat", {"player_id": 1}, dedupe_key="daily_ai_chat:1:2026-01-01")
+            again = data_manager.enqueue_job("daily_ai_chat", {"player_id": 1}, dedupe_key="daily_ai_chat:1:2026-01-01")
+            other_day = data_manager.enqueue_job("daily_ai_chat", {"player_id": 1}, dedupe_key="daily_ai_chat:1:2026-01-02")
+            assert first is not None and again is None and other_day not in (None, first)
+            assert data_manager.get_job_counts() == {"queued": 2}
+
+            # Only one of two workers claims a queued job
+            job = data_manager.claim_job(first)
+            assert job['payload'] == {"player_id": 1} and job['attempts'] == 1
+            assert data_manager.claim_job(first) is None
+
+            # A job left running past the timeout, e.g. by a worker that died, is requeued and claimed again
+            assert data_manager.requeue_stale_jobs(600) == 0
+            conn.execute(text("UPDATE background_jobs SET started_at = :started WHERE job_id = :job_id"),
+                         {"started": datetime.utcnow() - timedelta(hours=1), "job_id": first})
+            conn.commit()
+            assert data_manager.requeue_stale_jobs(600) == 1
+            assert data_manager.get_queued_job_ids(10) == [first, other_day]
+            assert data_manager.claim_job(first)['attempts'] == 2
+            data_manager.finish_job(first)
+
+            # A failing handler is retried until it succeeds
+            calls = []
+
+            @background_jobs.handler("test_flaky")
+            def flaky(payload):
+                calls.append(payload)
+                if len(calls) == 1:
+                    raise RuntimeError("first attempt fails")
+
+            flaky_id = data_manager.enqueue_job("test_flaky", {"n": 1})
+            assert background_jobs.run_job(flaky_id)
+            assert data_manager.get_job_counts()["queued"] == 2  # back in the queue next to other_day
+            assert background_jobs.run_job(flaky_id) and len(calls) == 2
+            assert not background_jobs.run_job(flaky_id)  # done jobs are not claimed again
+            assert data_manager.get_job_counts() == {"queued": 1, "done": 2}
+        print("✅ Dedupe, claims, retries and stale-job recovery behave as expected")
+        return True
+
+    except Exception as e:
+        print(f"❌ Background job test failed: {e}")
+        traceback.print_exc()
+        return False
+    finally:
+        data_manager.set_connection_provider(previous_provider)
+
+def test_packed_putt_lists():
+    """Test that every classifier format survives pack/unpack and that a LazyPuttList serializes like the old JSON column."""
+    print("\n=== Testing Packed Putt Lists ===")
+    try:
+        from flask import Flask, jsonify
+        from flask.json.provider import DefaultJSONProvider
+        import putt_codes
+
+        detailed = ["MAKE - HOLE: TOP - LEFT", "MAKE - HOLE: RIGHT - CENTER", "MAKE - HOLE: LOW - RIGHT", "MAKE - HOLE: LEFT - RAMP",
+                    "MAKE - HOLE: UNKNOWN - UNKNOWN", "MISS - RETURN: LEFT - CENTER", "MISS - RETURN: RAMP - UNKNOWN",
+                    "MISS - CATCH: CENTER - RIGHT", "MISS - TIMEOUT: RIGHT", "MISS - TIMEOUT: UNKNOWN", "MISS - QUICK PUTT"]
+        records = [
+            {"Putt Index": index, "Putt Classification": text.split(" - ")[0], "Putt Detailed Classification": text,
+             "Putt Time": round(0.123 + 37.517 * index, 3)}
+            for index, text in enumerate(detailed, start=1)
+        ]
+        # The same putts as raw desktop log entries, with frame times and one missing time
+        log_entries = [
+            {"classification": record["Putt Classification"], "detailed_classification": record["Putt Detailed Classification"],
+             "current_frame_time": str(record["Putt Time"]) if index else ""}
+            for index, record in enumerate(records)
+        ]
+        assert putt_codes.unpack_putt_list(putt_codes.pack_putt_list(records)) == records
+        from_log = putt_codes.unpack_putt_list(putt_codes.pack_putt_list(log_entries))
+        assert from_log[0]["Putt Time"] is None and from_log[1:] == records[1:]
+        assert putt_codes.unpack_putt_list(putt_codes.pack_putt_list([])) == []
+        print(f"✅ {len(detailed)} classifier formats round-trip from both input layouts")
+
+        lazy = putt_codes.LazyPuttList(putt_codes.pack_putt_list(records))
+        assert len(lazy) == len(records) and lazy._putts is None  # length comes from the header alone
+        assert lazy[2] == records[2] and list(lazy) == records
+
+        class ApiJSONProvider(DefaultJSONProvider):  # as configured on the API app
+            @staticmethod
+            def default(o):
+                if isinstance(o, putt_codes.LazyPuttList):
+                    return o.to_json()
+                return DefaultJSONProvider.default(o)
+
+        app = Flask(__name__)
+        app.json = ApiJSONProvider(app)
+        with app.app_context():
+            lazy_body = jsonify({"sessions": [{"session_id": 1, "putt_list": putt_codes.LazyPuttList(putt_codes.pack_putt_list(records))}]}).get_json()
+            json_body = jsonify({"sessions": [{"session_id": 1, "putt_list": json.dumps(records)}]}).get_json()
+        assert lazy_body == json_body and json.loads(lazy_body["sessions"][0]["putt_list"]) == records
+        print("✅ LazyPuttList serializes as the putt_list JSON string")
+        return True
+
+    except Exception as e:
+        print(f"❌ Packed putt list test failed: {e}")
+        traceback.print_exc()
+        return False
+
+def test_putt_data_backfill():
+    """Test that the migration only adds putt_data, the backfill keeps putt_list, and only verified lists are cleared."""
+    print("\n=== Testing Putt Data Backfill ===")
+    previous_url = os.environ.get('DATABASE_URL')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'putt_data_test.db')}"
+    data_manager.reset_db_connection()
+    try:
+        import migrations
+        import putt_codes
+        data_manager.initialize_database()
+        player_id = data_manager.get_player_by_email("pop@proofofputt.com")["player_id"]
+
+        records = [
+            {"Putt Index": 1, "Putt Classification": "MAKE", "Putt Detailed Classification": "MAKE - HOLE: TOP - LEFT", "Putt Time": 3.25},
+            {"Putt Index": 2, "Putt Classification": "MISS", "Putt Detailed Classification": "MISS - RETURN: LEFT - CENTER", "Putt Time": 9.5},
+        ]
+        # A desktop log entry with a field the packed format does not keep
+        with_extra_field = [{"classification": "MAKE", "detailed_classification": "MAKE - HOLE: LOW - RIGHT",
+                             "current_frame_time": "4.125", "ball_speed": 1.8}]
+        engine = data_manager.get_db_connection()
+        with engine.connect() as conn:
+            for putt_list in (json.dumps(records), json.dumps(with_extra_field), json.dumps("not a list")):
+                conn.execute(
+                    data_manager.sqlalchemy.text("INSERT INTO sessions (player_id, status, putt_list) VALUES (:player_id, 'COMPLETED', :putt_list)"),
+                    {"player_id": player_id, "putt_list": putt_list}
+                )
+            migrations._add_packed_putt_data(conn, engine.dialect.name)  # re-running the migration step
+            conn.commit()
+
+        def stored():
+            with engine.connect() as conn:
+                return conn.execute(data_manager.sqlalchemy.text(
+                    "SELECT session_id, putt_list, putt_data FROM sessions ORDER BY session_id"
+                )).mappings().fetchall()
+
+        assert all(row['putt_data'] is None and row['putt_list'] is not None for row in stored())
+        print("✅ The migration adds the column without rewriting sessions")
+
+        assert data_manager.backfill_putt_data(batch_size=1) == 2
+        plain, extra, invalid = stored()
+        assert putt_codes.unpack_putt_list(plain['putt_data']) == records and plain['putt_list'] is not None
+        assert extra['putt_data'] is not None and json.loads(extra['putt_list']) == with_extra_field
+        assert invalid['putt_data'] is None and invalid['putt_list'] is not None
+        assert data_manager.backfill_putt_data(batch_size=1) == 0
+        print("✅ The backfill packs putt lists in batches and keeps the JSON")
+
+        assert data_manager.clear_packed_putt_lists(batch_size=1) == (1, 1)
+        plain, extra, invalid = stored()
+        assert plain['putt_list'] is None and json.loads(extra['putt_list']) == with_extra_field
+        sessions = {session['session_id']: session for session in
+                    data_manager.get_sessions_page(player_id, fields=('session_id', 'putt_list'))['sessions']}
+        assert list(sessions[plain['session_id']]['putt_list']) == records
+        assert json.loads(sessions[extra['session_id']]['putt_list']) == with_extra_field
+        print("✅ Only putt lists that match their packed form are cleared; the rest are served as stored")
+        return True
+
+    except Exception as e:
+        print(f"❌ Putt data backfill test failed: {e}")
+        traceback.print_exc()
+        return False
+    finally:
+        if previous_url is None:
+            os.environ.pop('DATABASE_URL', None)
+        else:
+            os.environ['DATABASE_URL'] = previous_url
+        data_manager.reset_db_connection()
+
+def test_player_search():
+    """Test ranked prefix/substring search, requester exclusion, and index refresh after another worker's write."""
+    print("\n=== Testing Player Search ===")
+    try:
+        import migrations
+        engine = data_manager.sqlalchemy.create_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'search_test.db')}")
+        data_manager.sqlalchemy.event.listen(engine, "commit", data_manager._run_after_commit)  # as on the API's engine
+        migrations.run_migrations(engine)
+        players = [(1, "Sam Ace", "sam@example.com"), (2, "Samantha Green", "green@example.com"), (3, "Bob Jones", "samwise@example.com"),
+                   (4, "Tom Balsam", "tom@example.com"), (5, "Alice", "alice@example.com")]
+        with engine.begin() as conn:
+            for player_id, name, email in players:
+                conn.execute(data_manager.sqlalchemy.text("INSERT INTO players (player_id, email, name, password_hash) VALUES (:id, :email, :name, 'x')"),
+                             {"id": player_id, "email": email, "name": name})
+        data_manager._search_index = None
+
+        with engine.connect() as conn:
+            # Name prefixes first (alphabetically), then email prefixes, then other substrings
+            ids = [player['player_id'] for player in data_manager.search_players("sam", 5, conn=conn)]
+            assert ids == [1, 2, 3, 4], ids
+            assert [player['player_id'] for player in data_manager.search_players("SAM", 1, conn=conn)] == [2, 3, 4]
+            assert data_manager.search_players("  ", 1, conn=conn) == []
+            assert data_manager.search_players("sam", 5, limit=2, conn=conn)[-1]['player_id'] == 2
+            print("✅ Ranked prefix matches, requester excluded")
+
+            # Another worker renames a player: it has no index of its own, but the version bump reaches this one
+            built_index = data_manager._search_index
+            data_manager._search_index = None
+            data_manager.update_player_profile(5, {"name": "Samuel Lee"}, conn=conn)
+            conn.commit()
+            data_manager._search_index = built_index
+            assert [player['player_id'] for player in data_manager.search_players("samu", 1, conn=conn)] == [5]
+
+            # This worker's own rename is applied in place without a rebuild
+            data_manager.update_player_profile(4, {"name": "Samir Balsam"}, conn=conn)
+            conn.commit()
+            refreshed_index = data_manager._search_index
+            assert [player['player_id'] for player in data_manager.search_players("sami", 1, conn=conn)] == [4]
+            assert data_manager._search_index is refreshed_index
+        print("✅ Index follows renames made by any worker")
+        return True
+
+    except Exception as e:
+        print(f"❌ Player search test failed: {e}")
+        traceback.print_exc()
+        return False
+    finally:
+        data_manager._search_index = None
+
+@contextmanager
+def _api_on_fresh_database(name):
+    """Yields the api module serving a fresh, migrated and seeded SQLite database, or None when the API cannot be imported here."""
+    try:
+        import api
+    except ImportError as e:
+        print(f"⚠️  Skipping, the API cannot be imported here: {e}")
+        yield None
+        return
+    previous_url = os.environ.get('DATABASE_URL')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), name)}"
+    data_manager.reset_db_connection()
+    try:
+        data_manager.initialize_database()
+        yield api
+    finally:
+        if previous_url is None:
+            os.environ.pop('DATABASE_URL', None)
+        else:
+            os.environ['DATABASE_URL'] = previous_url
+        data_manager.reset_db_connection()
+
+def test_login_route():
+    """Test POST /login against a fresh database: identity response, bad credentials, and one queued AI chat per day."""
+    print("\n=== Testing Login Route ===")
+    background_jobs = previous_workers = None
+    try:
+        with _api_on_fresh_database('login_test.db') as api:
+            if api is None:
+                return True
+            import background_jobs
+            previous_workers, background_jobs.JOB_WORKERS = background_jobs.JOB_WORKERS, 0  # leave the AI chat job queued
+
+            client = api.app.test_client()
+            for _ in range(2):
+                response = client.post('/login', json={"email": "POP@proofofputt.com ", "password": "passwordpop123"})
+                assert response.status_code == 200, response.get_json()
+            body = response.get_json()
+            assert body['email'] == "pop@proofofputt.com" and body['subscription_status'] == "active"
+            assert isinstance(body['timezone'], str) and not body['is_new_user']
+            assert set(body) == {"player_id", "name", "email", "timezone", "subscription_status", "is_new_user"}
+            assert client.post('/login', json={"email": "pop@proofofputt.com", "password": "wrong"}).status_code == 401
+            assert data_manager.get_job_counts() == {"queued": 1}  # the second login is deduplicated
+        print("✅ Login returns the player's identity and queues one daily AI chat")
+        return True
+
+    except Exception as e:
+        print(f"❌ Login route test failed: {e}")
+        traceback.print_exc()
+        return False
+    finally:
+        if previous_workers is not None:
+            background_jobs.JOB_WORKERS = previous_workers
+
+def _seed_league(conn, players, sessions):
+    """Seeds league 1 with `players` [(player_id, name)] as members, two active rounds, and `sessions` {session_id: (player_id, metrics)}."""
+    text = data_manager.sqlalchemy.text
+    for player_id, name in players:
+        conn.execute(text("INSERT INTO players (player_id, email, name, password_hash, subscription_status) VALUES (:id, :email, :name, 'x', 'active')"),
+                     {"id": player_id, "email": f"{name.lower()}@example.com", "name": name})
+        conn.execute(text("INSERT INTO league_members (league_id, player_id) VALUES (1, :id)"), {"id": player_id})
+    conn.execute(text("INSERT INTO leagues (league_id, creator_id, name, status) VALUES (1, :creator, 'Test League', 'active')"), {"creator": players[0][0]})
+    conn.execute(text("INSERT INTO league_rounds (round_id, league_id, round_number, status) VALUES (1, 1, 1, 'active'), (2, 1, 2, 'active')"))
+    for session_id, (player_id, metrics) in sessions.items():
+        conn.execute(text("""
+            INSERT INTO sessions (session_id, player_id, start_time, total_makes, best_streak, makes_per_minute, fastest_21_makes)
+            VALUES (:session_id, :player_id, :start_time, :total_makes, :best_streak, :makes_per_minute, :fastest_21_makes)
+        """), {"session_id": session_id, "player_id": player_id, "start_time": datetime(2026, 1, 1) + timedelta(hours=session_id),
+               "fastest_21_makes": None, **metrics})
+
+def test_league_standings():
+    """Test the windowed league leaderboards and points standings, tie sharing, the per-league cache and its invalidation."""
+    print("\n=== Testing League Standings ===")
+    try:
+        import migrations
+        engine = data_manager.sqlalchemy.create_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'league_test.db')}")
+        migrations.run_migrations(engine)
+        players = [(1, "Ann"), (2, "Ben"), (3, "Cat"), (4, "Dan")]
+        sessions = {
+            11: (1, {"total_makes": 30, "best_streak": 8, "makes_per_minute": 3.0, "fastest_21_makes": 50.0}),
+            12: (2, {"total_makes": 30, "best_streak": 12, "makes_per_minute": 2.5, "fastest_21_makes": 40.0}),
+            13: (3, {"total_makes": 20, "best_streak": 5, "makes_per_minute": 2.0}),
+            23: (3, {"total_makes": 40, "best_streak": 15, "makes_per_minute": 4.0}),
+            24: (4, {"total_makes": 10, "best_streak": 3, "makes_per_minute": 1.0}),
+            21: (1, {"total_makes": 5, "best_streak": 2, "makes_per_minute": 0.5}),
+        }
+        data_manager._league_standings_cache.pop(1, None)
+
+        with engine.connect() as conn:
+            with conn.begin():
+                _seed_league(conn, players, sessions)
+            for round_id, player_id, session_id in ((1, 1, 11), (1, 2, 12), (1, 3, 13), (2, 3, 23), (2, 4, 24)):
+                with conn.begin():
+                    data_manager.submit_session_to_league_round(round_id, player_id, session_id, conn=conn)
+
+            board = data_manager.get_league_leaderboard(1, conn=conn)
+            # Ann and Ben tie on makes in round 1 and share first place's 3 points; Cat is third with 1.
+            # In round 2 Cat (40) earns 2 and Dan (10) 1, so Ann, Ben and Cat share first place overall.
+            standings = [(entry['name'], entry['total_points'], entry['rounds_played'], entry['rank']) for entry in board['standings']]
+            assert standings == [("Ann", 3, 1, 1), ("Ben", 3, 1, 1), ("Cat", 3, 2, 1), ("Dan", 1, 1, 4)], standings
+            names = lambda metric: [entry['name'] for entry in board[metric]]
+            assert [entry['total_makes'] for entry in board['top_makes']] == [40, 30, 30, 20, 10]
+            assert names('top_makes')[1:3] == ["Ben", "Ann"]  # equal makes: the later session first
+            assert names('top_streaks') == ["Cat", "Ben", "Ann", "Cat", "Dan"]
+            assert names('top_makes_per_minute') == ["Cat", "Ann", "Ben", "Cat", "Dan"]
+            assert names('fastest_21') == ["Ben", "Ann"]  # ascending, sessions without a time are left out
+            assert len(data_manager.get_league_leaderboard(1, limit=2, conn=conn)['top_makes']) == 2
+            print("✅ Boards and points standings, with ties sharing points and rank")
+
+            # Unchanged league: served from the per-league cache
+            version = data_manager.get_resource_version("league_1", conn)
+            assert data_manager.get_league_standings(1, conn=conn) is data_manager.get_league_standings(1, conn=conn)
+            cached = data_manager.get_league_standings(1, conn=conn)
+
+            # A submission bumps the league's version and the next read recomputes
+            data_manager.submit_session_to_league_round(2, 1, 21, conn=conn)
+            conn.commit()
+            assert data_manager.get_resource_version("league_1", conn) == version + 1
+            refreshed = data_manager.get_league_standings(1, conn=conn)
+            assert refreshed is not cached
+            standings = [(entry['name'], entry['total_points'], entry['rank']) for entry in refreshed['standings']]
+            # Round 2 now ranks Cat 3, Dan 2, Ann 1 point
+            assert standings == [("Ann", 4, 1), ("Cat", 4, 1), ("Ben", 3, 3), ("Dan", 2, 4)], standings
+
+            # Each player submits once per round
+            try:
+                data_manager.submit_session_to_league_round(2, 1, 11, conn=conn)
+                raise AssertionError("a second submission to the same round was accepted")
+            except ValueError:
+                conn.rollback()
+        print("✅ Cached per league version, invalidated by a submission")
+        return True
+
+    except Exception as e:
+        print(f"❌ League standings test failed: {e}")
+        traceback.print_exc()
+        return False
+    finally:
+        data_manager._league_standings_cache.pop(1, None)
+
+def test_league_round_submit_route():
+    """Test POST /leagues/rounds/<id>/submit and that it changes the league's cached responses."""
+    print("\n=== Testing League Round Submit Route ===")
+    try:
+        with _api_on_fresh_database('league_route_test.db') as api:
+            if api is None:
+                return True
+            with data_manager.get_db_connection().begin() as conn:
+                _seed_league(conn, [(101, "Ann"), (102, "Ben")], {
+                    111: (101, {"total_makes": 30, "best_streak": 8, "makes_per_minute": 3.0}),
+                    112: (102, {"total_makes": 25, "best_streak": 6, "makes_per_minute": 2.5}),
+                })
+            data_manager._league_standings_cache.pop(1, None)
+            client = api.app.test_client()
+
+            details = client.get('/leagues/1?player_id=101')
+            leaderboard = client.get('/leagues/1/leaderboard?player_id=101').get_json()
+            assert details.status_code == 200 and leaderboard['standings'][0]['total_points'] == 0
+            etag = details.get_etag()[0]
+            assert client.get('/leagues/1?player_id=101', headers={"If-None-Match": f'W/"{etag}"'}).status_code == 304
+
+            for player_id, session_id in ((101, 111), (102, 112)):
+                response = client.post('/leagues/rounds/1/submit', json={"player_id": player_id, "session_id": session_id})
+                assert response.status_code == 200, response.get_json()
+            duplicate = client.post('/leagues/rounds/1/submit', json={"player_id": 101, "session_id": 111})
+            assert duplicate.status_code == 400 and "already submitted" in duplicate.get_json()['error']
+            assert client.post('/leagues/rounds/1/submit', json={"player_id": 101}).status_code == 400
+
+            changed = client.get('/leagues/1?player_id=101', headers={"If-None-Match": f'W/"{etag}"'})
+            assert changed.status_code == 200 and changed.get_etag()[0] != etag
+            standings = client.get('/leagues/1/leaderboard?player_id=101').get_json()['standings']
+            assert [(entry['name'], entry['total_points']) for entry in standings] == [("Ann", 2), ("Ben", 1)]
+        print("✅ Submissions are accepted once and change the league's responses")
+        return True
+
+    except Exception as e:
+        print(f"❌ League round submit route test failed: {e}")
+        traceback.print_exc()
+        return False
+    finally:
+        data_manager._league_standings_cache.pop(1, None)
+
 def test_edge_cases():
     """Test various edge cases and error conditions."""
     print("\n=== Testing Edge Cases ===")
@@ -229,6 +1144,24 @@ def run_full_test_suite():
         test_recalculate_stats,
         test_calibration_functions,
         test_session_reporter,
+        test_session_analytics,
+        test_migrations_and_indexes,
+        test_request_scoped_connection,
+        test_league_listing_query_count,
+        test_batch_session_save,
+        test_scheduler_job_lease,
+        test_response_cache,
+        test_response_cache_replica_lag,
+        test_player_info_cache_bypass,
+        test_read_your_writes_fallback,
+        test_upload_decoding,
+        test_background_jobs,
+        test_packed_putt_lists,
+        test_putt_data_backfill,
+        test_player_search,
+        test_login_route,
+        test_league_standings,
+        test_league_round_submit_route,
         test_edge_cases
     ]
     
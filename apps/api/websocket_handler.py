@@ -3,9 +3,11 @@ WebSocket handler for real-time updates in Proof of Putt.
 Supports real-time session updates, duels, and notifications.
 """
 
+from flask import request
 from flask_socketio import SocketIO, emit, join_room, leave_room
 import json
 import logging
+import os
 
 logger = logging.getLogger(__name__)
 
@@ -15,6 +17,8 @@ class WebSocketHandler:
         self.socketio = SocketIO(
             app,
             cors_allowed_origins="*",
+            # Set to a Redis URL when running several workers so emits reach every worker's clients
+            message_queue=os.environ.get("SOCKETIO_MESSAGE_QUEUE"),
             logger=True,
             engineio_logger=True
         )
@@ -88,6 +92,16 @@ class WebSocketHandler:
             except Exception as e:
                 logger.error(f'Error leaving session: {e}')
         
+        @self.socketio.on('join_player')
+        def handle_join_player(data):
+            """Join the player's personal room for notifications and unread count updates."""
+            player_id = (data or {}).get('player_id')
+            if not player_id:
+                emit('error', {'message': 'Missing player_id'})
+                return
+            join_room(f'player_{player_id}')
+            emit('player_joined_room', {'player_id': player_id, 'room': f'player_{player_id}'})
+
         @self.socketio.on('session_update')
         def handle_session_update(data):
             """Handle session progress updates."""
@@ -159,6 +173,17 @@ class WebSocketHandler:
         except Exception as e:
             logger.error(f'Error sending notification: {e}')
 
+    def push_unread_count(self, player_id, unread_count):
+        """
+        Push a player's new unread notification count so clients can stop polling for it.
+        """
+        try:
+            room = f'player_{player_id}'
+            self.socketio.emit('unread_count', {'player_id': player_id, 'unread_count': unread_count}, room=room)
+
+        except Exception as e:
+            logger.error(f'Error pushing unread count: {e}')
+
 def create_websocket_handler(app):
     """Factory function to create and return WebSocket handler."""
     return WebSocketHandler(app)
\ No newline at end of file
@@ -46,7 +46,9 @@ export const AuthProvider = ({ children }) => {
 
   const login = async (email, password) => {
     try {
-      const data = await apiLogin(email, password);
+      // Login returns identity only; stats and sessions come from the player data endpoint
+      const identity = await apiLogin(email, password);
+      const data = await apiGetPlayerData(identity.player_id);
       localStorage.setItem('playerData', JSON.stringify(data));
       setPlayerData(data);
       const from = location.state?.from?.pathname || '/';
@@ -61,7 +63,8 @@ export const AuthProvider = ({ children }) => {
 
   const register = async (email, password, name) => {
     try {
-      const data = await apiRegister(email, password, name);
+      const identity = await apiRegister(email, password, name);
+      const data = await apiGetPlayerData(identity.player_id);
       localStorage.setItem('playerData', JSON.stringify(data));
       setPlayerData(data);
       navigate('/');